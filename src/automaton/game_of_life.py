@@ -18,11 +18,23 @@
 
 """Game of life example."""
 
+from typing import TextIO
 
-from qmaton import Automaton, MooreNeighborhood, Neighborhood, State
+import numpy as np
+from qmaton import (
+    ArrayAutomaton,
+    LifeLikeRule,
+    MooreNeighborhood,
+    Neighborhood,
+    PatternFormat,
+    PatternSerializer,
+    RuleTable,
+    State,
+    Transition,
+)
 
 
-class GameOfLife(Automaton):
+class GameOfLife(ArrayAutomaton):
     """Game of life example.
 
     See https://en.wikipedia.org/wiki/Conway%27s_Game_of_Life
@@ -32,6 +44,13 @@ class GameOfLife(Automaton):
     """Life state, black"""
     DEATH = State("Death", "#FFF")
     """Death state, white"""
+    RULE_TABLE = RuleTable(
+        ((LIFE,),),
+        (Transition(DEATH, LIFE, (3,)), Transition(LIFE, LIFE, ({2, 3},)), Transition(LIFE, DEATH)),
+    )
+    """Rules of the game of life, applied on the whole grid at once"""
+    RULE = LifeLikeRule.parse("B3/S23")
+    """Rulestring of the game of life, used by the pattern files"""
 
     def __init__(self, length: int = 10, width: int = 10):
         """Create an Automaton, already set up with rules and states.
@@ -42,6 +61,7 @@ class GameOfLife(Automaton):
         super().__init__(length, width, GameOfLife.DEATH)
         self.states: list[State] = [GameOfLife.LIFE, GameOfLife.DEATH]
         self.rule: callable[[int, int], State] = self.main_rule
+        self.rule_table: RuleTable = GameOfLife.RULE_TABLE
         self.neighborhood: Neighborhood = MooreNeighborhood()
 
     def main_rule(self, x: int, y: int) -> State:
@@ -68,3 +88,36 @@ class GameOfLife(Automaton):
         if alive == 2 or alive == 3:
             return GameOfLife.LIFE
         return GameOfLife.DEATH
+
+    # Serialization
+
+    def read_pattern(self, file: TextIO, x: int = 0, y: int = 0, pattern_format: PatternFormat = None) -> None:
+        """Place the pattern read from a RLE, plaintext or Life 1.06 file in the grid, see `paste_pattern()`.
+
+        :param TextIO file: the text file to read
+        :param int x: the line of the grid where to place the top of the pattern
+        :param int y: the column of the grid where to place the left of the pattern
+        :param PatternFormat pattern_format: the format of the file, detected by default
+        :raise ValueError: if the file is not a valid pattern, or if its rule is not the game of life
+        """
+        pattern = PatternSerializer.load(file, pattern_format)
+        self.paste_pattern(pattern["alive"], x, y, pattern["rule"])
+
+    def paste_pattern(self, alive: np.ndarray, x: int = 0, y: int = 0, rule: str = None) -> None:
+        """Place a pattern in the grid, its top left cell at (x, y).
+
+        The dead cells of the pattern are written too, the cells of the pattern out of the grid are ignored.
+        :param np.ndarray alive: the array of booleans telling if each cell of the pattern is alive
+        :param str rule: the rulestring of the pattern, if given
+        :raise ValueError: if the rule of the pattern is not the game of life
+        """
+        if rule and LifeLikeRule.parse(rule) != GameOfLife.RULE:
+            raise ValueError(f"The pattern is not for the game of life: {rule}")
+        life, death = self.state_index(GameOfLife.LIFE), self.state_index(GameOfLife.DEATH)
+        self.paste(np.where(alive, life, death).astype(self.dtype), x, y)
+
+    def write_pattern(self, file: TextIO, pattern_format: PatternFormat = PatternFormat.RLE) -> None:
+        """Write the grid in a RLE, plaintext or Life 1.06 file."""
+        PatternSerializer.dump(
+            self.cells == self.state_index(GameOfLife.LIFE), file, pattern_format, str(GameOfLife.RULE)
+        )
@@ -1,4 +1,4 @@
-from qmaton import Automaton, EdgeRule, State, VonNeumannNeighborhood
+from qmaton import ArrayAutomaton, EdgeRule, RuleTable, State, Transition, VonNeumannNeighborhood
 
 """ ( MODELE :
 
@@ -33,7 +33,7 @@ class GameOfLife:
 """
 
 
-class GameOfFire(Automaton):
+class GameOfFire(ArrayAutomaton):
     FEU = State("Feu ", "#F93913")
     FEU1 = State("Feu1 ", "#d42806")
     FEU2 = State("Feu2 ", "#ad2003")
@@ -44,6 +44,17 @@ class GameOfFire(Automaton):
 
     FIRE_LIST = (FEU, FEU1, FEU2, FEU3)
 
+    RULE_TABLE = RuleTable(
+        (FIRE_LIST,),
+        (
+            Transition(ARBRE, FEU, (lambda burning: burning >= 1,)),
+            Transition(FEU, FEU1),
+            Transition(FEU1, FEU2),
+            Transition(FEU2, FEU3),
+            Transition(FEU3, CENDRE),
+        ),
+    )
+
     def __init__(self, length=10, width=10):
         super().__init__(length, width, GameOfFire.VIDE)
         self.states = [
@@ -56,6 +67,7 @@ class GameOfFire(Automaton):
             GameOfFire.ARBRE,
         ]
         self.rule = self.main_rule
+        self.rule_table = GameOfFire.RULE_TABLE
         self.neighborhood = VonNeumannNeighborhood(EdgeRule.IGNORE_MISSING_NEIGHBORS_OF_EDGE_CELLS, 1)
 
     def main_rule(self, x, y):
@@ -23,20 +23,44 @@
 This module contains all the logic for running a cellular automaton:
 
 - Automaton class is the grid
+- ArrayAutomaton class is a grid held as an array, with a rule applied on the whole grid at once
+- RingHistory class keeps the latest steps of an automaton in a preallocated ring, for runs without end
+- MappedHistory class stores the steps of an automaton in a memory mapped file, for histories larger than memory
+- FrameView class is a read-only view on a step of a history, read without copy
+- TrajectoryRecorder class records a run in an indexed file, TrajectoryReader reads any of its steps and
+  TrajectoryAutomaton replays it
+- CycleDetector class detects when an automaton enters a cycle, so an AutomatonRunner can stop or fast-forward
 - AutomatonRunner class allow to run the automaton multiple times
 - neighborhood is a module with utils functions for neighborhood computation
+- RuleTable class is a rule declared as a table of transitions
+- LifeLikeAutomaton class is a binary automaton configured by a rulestring, stored as a grid of bits
+- PatternSerializer class reads and writes the RLE, plaintext and Life 1.06 patterns of Life-like automatons
+- HashLifeAutomaton class runs a Life-like automaton on an unbounded grid with the HashLife algorithm
 """
 
 
+from .array_automaton import ArrayAutomaton
 from .automaton import Automaton, State
 from .automaton_history import AutomatonHistory
 from .automaton_runner import AutomatonRunner
 from .automaton_serializer import AutomatonSerializer
+from .binary_serializer import BinarySerializer, Compression
+from .cycle_detector import CycleAction, CycleDetector
+from .frame_view import FrameView
+from .hashlife import HashLife, HashLifeAutomaton
+from .life_like import LifeLikeAutomaton, LifeLikeRule
+from .mapped_history import MappedHistory
 from .neighborhood import (
     EdgeRule,
     HexagonalNeighborhood,
     MooreNeighborhood,
     Neighborhood,
+    NeighborhoodKernel,
+    NeighborTable,
     RadialNeighborhood,
     VonNeumannNeighborhood,
 )
+from .pattern_serializer import PatternFormat, PatternSerializer
+from .ring_history import RingHistory
+from .rule_table import RuleTable, Transition
+from .trajectory import TrajectoryAutomaton, TrajectoryReader, TrajectoryRecorder
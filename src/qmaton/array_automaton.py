@@ -0,0 +1,309 @@
+# -*- coding: utf-8 -*-
+
+#    QMaton is a Python/Qt software used to run cellular automatons.
+#    Copyright (C) 2021  Rémi Ducceschi (remileduc) <remi.ducceschi@gmail.com>
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""ArrayAutomaton class, an Automaton which grid is held as an array of state indices."""
+
+from __future__ import annotations
+
+import numpy as np
+
+from .automaton import Automaton, State
+from .frame_view import FrameView
+from .neighborhood import EdgeRule, Neighborhood
+from .rule_table import RuleTable
+
+
+class ArrayAutomaton(Automaton):
+    """Automaton running on an array of state indices.
+
+    The grid is held as a numpy array, `cells`, where each cell contains the index of its State in `states`.
+    If `array_rule` is set, an iteration is calculated with a single call on the whole array instead of calling
+    `rule` once per cell. If `rule_table` is set, it is compiled into a lookup array and evaluated on the whole
+    array. Otherwise, the per cell `rule` is used as for any Automaton.
+
+    The attribute `grid` is still available: it returns the grid of State decoded from `cells`. The returned grid
+    stays the reference (it can be edited in place) until the next iteration or the next access to `cells`.
+
+    As for the grid, the array of cells is double buffered with a rule table: the new states are written in the
+    back buffer, which is then swapped with `cells`. An array given to a snapshot is never written again: it is
+    copied by the next access to `cells`, and it is not reused as a back buffer.
+
+    With a rule table, the cells changed by each iteration are tracked. The next iteration only calculates these
+    cells and their neighbors, the other cells can't change. If too many cells are active, the whole grid is
+    calculated.
+
+    Attributes:
+        cells the array of state indices, of size grid_size
+        array_rule the rule used to calculate an iteration on the whole array of cells
+        rule_table the rule declared as a table, used to calculate an iteration on the whole array of cells
+        neighborhood the type of neighborhood used by the rule table
+        active_threshold the ratio of active cells over which the whole grid is calculated
+    """
+
+    def __init__(self, length: int = 10, width: int = 10, default_value: State = None):
+        """Constructor
+
+        :param int length: the length of the grid
+        :param int width: the width of the grid
+        :param State default_value: value used to fill the grid
+        """
+        # set before calling the parent constructor, which sets the grid
+        self.__shared: bool = False
+        super().__init__(length, width, default_value)
+        self.array_rule: callable[[np.ndarray], np.ndarray] = None
+        self.rule_table: RuleTable = None
+        self.neighborhood: Neighborhood = None
+        self.active_threshold: float = 0.25
+        self.__back_cells: np.ndarray = None
+        self.__changed: np.ndarray = None
+        self.__previous: np.ndarray = None
+        self.__previous_setup: tuple = None
+
+    # Properties
+
+    @property
+    def grid(self) -> list[list[State]]:
+        """Return the grid of State."""
+        if self.__grid is None:
+            self.__grid = self.decode(self.__cells)
+            self.__cells = None
+            self.__shared = False
+        return self.__grid
+
+    @grid.setter
+    def grid(self, grid: list[list[State]]) -> None:
+        self.__grid = grid
+        self.__cells = None
+        self.__shared = False
+        self.__changed = None
+
+    @property
+    def cells(self) -> np.ndarray:
+        """Return the array of state indices, copied first if it was given to a snapshot."""
+        if self.__cells is None:
+            self.__cells = self.encode(self.__grid)
+            self.__grid = None
+        cells = self.__cells
+        if self.__shared:
+            cells = self.__cells = cells.copy()
+            self.__shared = False
+        return cells
+
+    @cells.setter
+    def cells(self, cells: np.ndarray) -> None:
+        self.__cells = cells
+        self.__grid = None
+        self.__shared = False
+        self.__changed = None
+
+    @property
+    def changed_cells(self) -> np.ndarray:
+        """Return the flat indices of the cells changed by the last iteration, None if unknown.
+
+        It is None again once the grid or the cells are set.
+        """
+        return self.__changed
+
+    @property
+    def dtype(self) -> np.dtype:
+        """Return the type used to store the state indices."""
+        return np.min_scalar_type(max(len(self.states) - 1, 0))
+
+    # Grid management
+
+    def random_initialize(self) -> None:
+        """Initialize each cell of the grid with a random State from the list of states."""
+        if self.states:
+            self.cells = np.random.default_rng().integers(len(self.states), size=self.grid_size, dtype=self.dtype)
+
+    def load_frame(self, frame: FrameView | list[list[State]]) -> None:
+        """Set the grid to a step read from a history.
+
+        If the palette of the FrameView starts with `states`, its array is used as `cells` without copy. It stays
+        read-only: it is copied by the next change of the grid, and an iteration writes in another array.
+        :raise ValueError: if a cell contains a state that is not in `states`
+        """
+        if not isinstance(frame, FrameView):
+            self.grid = frame
+            return
+        palette = frame.palette
+        if palette == tuple(self.states[: len(palette)]):
+            cells = frame.cells
+            self.cells = cells if cells.dtype == self.dtype else cells.astype(self.dtype)
+            return
+        indices = {state: i for i, state in enumerate(self.states)}
+        cells = np.array([indices.get(value, -1) for value in palette], dtype=np.intp)[frame.cells]
+        unknown = cells < 0
+        if unknown.any():
+            raise ValueError(f"Unknown state in the grid: {palette[frame.cells[unknown][0]]}")
+        self.cells = cells.astype(self.dtype)
+
+    def snapshot(self) -> FrameView:
+        """Return a read-only view of the grid, which is not changed by the next iterations.
+
+        The array of cells is not copied: the next iterations are written in other arrays, and it is copied by the
+        next access to `cells`.
+        """
+        try:
+            cells = self.__read_cells()
+        except ValueError:  # a cell contains a state that is not in `states`
+            return super().snapshot()
+        self.__shared = True
+        return FrameView(cells, self.states)
+
+    def paste(self, cells: np.ndarray, x: int = 0, y: int = 0) -> None:
+        """Write an array of state indices in the grid, its top left cell at (x, y).
+
+        The part of the array out of the grid is ignored.
+        """
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + cells.shape[0], self.length), min(y + cells.shape[1], self.width)
+        if x0 >= x1 or y0 >= y1:
+            return
+        grid = self.cells
+        if not grid.flags.writeable:
+            grid = grid.copy()
+        grid[x0:x1, y0:y1] = cells[x0 - x : x1 - x, y0 - y : y1 - y]
+        self.cells = grid
+
+    def state_index(self, state: State) -> int:
+        """Return the index of the given state in `states`, as stored in `cells`."""
+        return self.states.index(state)
+
+    def encode(self, grid: list[list[State]]) -> np.ndarray:
+        """Convert a grid of State into an array of state indices.
+
+        :raise ValueError: if a cell contains a state that is not in `states`
+        """
+        indices = {state: i for i, state in enumerate(self.states)}
+        try:
+            return np.array([[indices[cell] for cell in line] for line in grid], dtype=self.dtype).reshape(
+                self.grid_size
+            )
+        except KeyError as e:
+            raise ValueError(f"Unknown state in the grid: {e.args[0]}") from None
+
+    def decode(self, cells: np.ndarray) -> list[list[State]]:
+        """Convert an array of state indices into a grid of State."""
+        palette = np.empty(len(self.states), dtype=object)
+        palette[:] = self.states
+        return palette[cells].tolist()
+
+    # Run automaton
+
+    def apply_rule(self) -> None:
+        """Calculate an iteration of the cellular automaton.
+
+        If set, the array rule or the rule table is applied on the whole array of cells. Otherwise, the setup rule
+        is applied sequencially to each cell.
+        """
+        if self.array_rule is not None:
+            self.__changed = None
+            self.cells = self.array_rule(self.cells)
+        elif self.rule_table is not None:
+            cells = self.__read_cells()
+            active = self.__active_cells(cells)
+            new_cells = self.rule_table.apply(self, cells, active=active, out=self.__get_back_cells(cells))
+            # an array given to a snapshot is not written again
+            self.__back_cells = None if self.__shared else cells
+            self.cells = new_cells
+            self.__track_changes(cells, new_cells, active)
+        else:
+            self.__changed = None
+            super().apply_rule()
+
+    # Neighborhood utils
+
+    def edge_mask(self, radius: int = 1) -> np.ndarray:
+        """Return a boolean array telling, for each cell, if it is on the edge of the grid.
+
+        This is the array version of `is_on_edge()`.
+        :param int radius: the margin for the grid
+        """
+        return Neighborhood.edge_mask(self.grid_size, radius)
+
+    def count_neighbors_array(
+        self, neighborhood: Neighborhood, cells: np.ndarray, states: list[State], active: np.ndarray = None
+    ) -> np.ndarray:
+        """Count, for all the cells at once, the neighbors which state is in `states`.
+
+        This is the array version of `count_neighbors()`.
+        :param Neighborhood neighborhood: the neighborhood to use
+        :param np.ndarray cells: the array of state indices
+        :param list states: the list of states that should be taken in account
+        :param np.ndarray active: the flat indices of the only cells to count, all the cells by default
+        :return: an array of the size of the grid (or of active) with the number of neighbors having a state in states
+        """
+        mask = np.isin(cells, [self.state_index(s) for s in states])
+        return neighborhood.compile(cells.ndim).count(mask, active)
+
+    # Private methods
+
+    def __read_cells(self) -> np.ndarray:
+        """Return `cells` without copying it if it was given to a snapshot, to read it only."""
+        shared, self.__shared = self.__shared, False
+        cells = self.cells
+        self.__shared = shared and cells is self.__cells
+        return cells
+
+    def __active_cells(self, cells: np.ndarray) -> np.ndarray:
+        """Return the flat indices of the cells that may change, None if the whole grid must be calculated."""
+        setup = (self.rule_table, self.neighborhood, tuple(self.states))
+        if self.__changed is None or self.__previous.shape != cells.shape or self.__previous_setup != setup:
+            return None
+        # cells edited since the last iteration
+        edited = np.flatnonzero(cells.reshape(-1) != self.__previous.reshape(-1))
+        changed = np.union1d(self.__changed, edited) if edited.size else self.__changed
+        limit = self.active_threshold * cells.size
+        table = self.neighborhood.compile(cells.ndim).table(cells.shape)
+        if changed.size > limit or not table.symmetric:
+            return None
+        if self.neighborhood.edge_rule == EdgeRule.IGNORE_EDGE_CELLS:
+            # cells on the edge have no neighbors in the table, but they are neighbors of other cells
+            if Neighborhood.edge_mask(cells.shape, self.neighborhood.radius, changed).any():
+                return None
+        active = np.union1d(changed, table.indices[changed][table.valid[changed]])
+        return active if active.size <= limit else None
+
+    def __get_back_cells(self, cells: np.ndarray) -> np.ndarray:
+        """Return the back buffer, allocated only if it can't be reused."""
+        back_cells = self.__back_cells
+        if (
+            back_cells is None
+            or back_cells.shape != cells.shape
+            or back_cells.dtype != cells.dtype
+            or not back_cells.flags.writeable
+            or np.may_share_memory(back_cells, cells)
+        ):
+            back_cells = np.empty_like(cells)
+        return back_cells
+
+    def __track_changes(self, cells: np.ndarray, new_cells: np.ndarray, active: np.ndarray) -> None:
+        if active is None:
+            self.__changed = np.flatnonzero(new_cells.reshape(-1) != cells.reshape(-1))
+        else:
+            self.__changed = active[new_cells.reshape(-1)[active] != cells.reshape(-1)[active]]
+        if (
+            self.__previous is None
+            or self.__previous.shape != new_cells.shape
+            or self.__previous.dtype != new_cells.dtype
+        ):
+            self.__previous = new_cells.copy()
+        else:
+            np.copyto(self.__previous, new_cells)
+        self.__previous_setup = (self.rule_table, self.neighborhood, tuple(self.states))
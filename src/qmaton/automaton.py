@@ -21,9 +21,16 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from typing import TYPE_CHECKING, TextIO
 
+import numpy as np
+
+from .frame_view import FrameView
 from .neighborhood import Neighborhood
 
+if TYPE_CHECKING:
+    from .binary_serializer import Compression
+
 
 @dataclass(frozen=True)
 class State:
@@ -44,7 +51,10 @@ class Automaton:
     each cell, and one rule that makes the cells change their state at
     each iteration.
 
-    An iteration is calculated thanks to the method `apply_rule()`.
+    An iteration is calculated thanks to the method `apply_rule()`. The grid is double buffered: the rule reads the
+    current grid (front buffer) while the new states are written in a back buffer, then both are swapped. The rule
+    must not modify the grid. The previous grid becomes the back buffer, so a grid is only valid until the
+    iteration after the one that replaced it: copy it to keep it longer.
 
     Attributes:
         grid_size the size of the grid
@@ -54,6 +64,9 @@ class Automaton:
         neighborhood the type of neighborhood used
     """
 
+    GRID_ONLY_RULE = True
+    """True if the next step only depends on the grid, so a history can calculate it again from the previous step."""
+
     def __init__(self, length: int = 10, width: int = 10, default_value: State = None):
         """Constructor
 
@@ -65,7 +78,8 @@ class Automaton:
         self.__default_value: State = default_value
         self.states: list[State] = []
         self.rule: callable[[int, int], State] = None
-        self.grid: list[list[State]] = self.__init_grid()
+        self.__back_grid: list[list[State]] = None
+        self.clear_grid()
 
     def __str__(self) -> str:
         """Return a string representing the grid.
@@ -73,12 +87,7 @@ class Automaton:
         The name of the state of all the cells are written, seperated by a space
         for columns and newline for rows.
         """
-        s = ""
-        for line in self.grid:
-            for cell in line:
-                s += cell.name + " "
-            s += "\n"
-        return s
+        return "".join("".join([cell.name + " " for cell in line]) + "\n" for line in self.grid)
 
     def __eq__(self, other: Automaton) -> bool:
         return self.states == other.states and self.grid == other.grid
@@ -114,18 +123,40 @@ class Automaton:
                 [self.states[random.randrange(len(self.states))] for _ in range(self.width)] for _ in range(self.length)
             ]
 
+    def load_frame(self, frame: FrameView | list[list[State]]) -> None:
+        """Set the grid to a step read from a history.
+
+        A FrameView is copied into a new grid, a grid is used as is.
+        """
+        self.grid = frame.copy() if isinstance(frame, FrameView) else frame
+
+    def snapshot(self) -> FrameView:
+        """Return a read-only view of the grid, which is not changed by the next iterations.
+
+        It can be read from another thread while the automaton is running. The grid is copied into the view.
+        """
+        palette = {state: i for i, state in enumerate(self.states)}
+        cells = np.array(
+            [[palette.setdefault(cell, len(palette)) for cell in line] for line in self.grid], dtype=np.intp
+        ).reshape(self.grid_size)
+        return FrameView(cells, list(palette))
+
     # Run automaton
 
     def apply_rule(self) -> None:
         """Calculate an iteration of the cellular automaton.
 
-        The setup rule is applied sequencially to each cell.
+        The setup rule is applied sequencially to each cell. The new states are written in the back buffer, which
+        then becomes the grid.
         """
-        new_grid = self.__init_grid()
+        grid = self.grid
+        new_grid = self.__get_back_grid(grid)
         # apply rules for each cell
-        for i in range(self.length):
+        rule = self.rule
+        for i, line in enumerate(new_grid):
             for j in range(self.width):
-                new_grid[i][j] = self.rule(i, j)
+                line[j] = rule(i, j)
+        self.__back_grid = grid
         self.grid = new_grid
 
     # Neighborhood utils
@@ -156,25 +187,79 @@ class Automaton:
 
     def toJSON(self) -> str:
         """Return a JSON string representation of the automaton."""
-        import json
+        import io
+
+        buffer = io.StringIO()
+        self.writeJSON(buffer)
+        return buffer.getvalue()
+
+    @classmethod
+    def fromJSON(cls, json_str: str) -> Automaton:
+        """Create an automaton from the JSON string, see `readJSON()`."""
+        import io
+
+        return cls.readJSON(io.StringIO(json_str))
+
+    def writeJSON(self, file: TextIO) -> None:
+        """Write the JSON representation of the automaton in a text file, row by row.
 
+        The rows are run-length encoded, see AutomatonSerializer.
+        """
         from qmaton import AutomatonSerializer
 
-        return json.dumps(self, indent=4, cls=AutomatonSerializer)
+        AutomatonSerializer.dump(self, file)
 
     @classmethod
-    def fromJSON(cls, json_str: str) -> Automaton:
-        """Create an automaton from the JSON string."""
-        import json
+    def readJSON(cls, file: TextIO) -> Automaton:
+        """Create an automaton from a JSON text file, the version of the format is detected.
 
+        The rows of the version 2 are loaded as a frame, see `load_frame()`.
+        :raise ValueError: if the file is not a valid automaton
+        """
         from qmaton import AutomatonSerializer
 
-        o = json.loads(json_str, object_hook=AutomatonSerializer.decode)
+        o = AutomatonSerializer.load(file)
         automaton = cls(o["grid_size"][0], o["grid_size"][1])
-        automaton.grid = o["grid"]
+        automaton.load_frame(o["grid"])
+        return automaton
+
+    def toBinary(self, compression: Compression = None) -> bytes:
+        """Return the .qmaton binary representation of the automaton.
+
+        :param Compression compression: the compression of the cells, zlib by default
+        """
+        from qmaton import BinarySerializer, Compression
+
+        return BinarySerializer.dumps(self, Compression.ZLIB if compression is None else compression)
+
+    @classmethod
+    def fromBinary(cls, data: bytes) -> Automaton:
+        """Create an automaton from the .qmaton binary representation.
+
+        The cells are loaded as a frame, see `load_frame()`: an ArrayAutomaton uses them without creating a State
+        per cell.
+        :raise ValueError: if the data is not a valid .qmaton file
+        """
+        from qmaton import BinarySerializer
+
+        o = BinarySerializer.loads(data)
+        automaton = cls(o["grid_size"][0], o["grid_size"][1])
+        automaton.load_frame(FrameView(o["cells"], o["states"]))
         return automaton
 
     # Private methods
 
     def __init_grid(self) -> list[list[State]]:
         return [[self.__default_value for _ in range(self.width)] for _ in range(self.length)]
+
+    def __get_back_grid(self, grid: list[list[State]]) -> list[list[State]]:
+        """Return the back buffer, allocated only if it can't be reused."""
+        back_grid = self.__back_grid
+        if (
+            back_grid is None
+            or back_grid is grid
+            or len(back_grid) != self.length
+            or any(len(line) != self.width or line is other for line, other in zip(back_grid, grid))
+        ):
+            back_grid = self.__init_grid()
+        return back_grid
@@ -18,41 +18,214 @@
 
 """AutomatonHistory class, holds the different calculated steps of an automaton."""
 
+from __future__ import annotations
+
+import bisect
+import hashlib
+from collections import deque
 from copy import deepcopy
-from typing import List
+from dataclasses import dataclass
+from typing import Any, List, Optional
+
+import numpy as np
 
+from .array_automaton import ArrayAutomaton
 from .automaton import Automaton, State
+from .frame_view import FrameView
 
 Grid = List[List[State]]
 """The grid of an automaton."""
 
+RECENT_STEPS = 256
+"""The number of latest steps compared to an appended step, to detect periodic grids."""
+
+
+@dataclass
+class KeyFrame:
+    """Step of the history stored as a full array of palette indices.
+
+    `digest` is the hash of the content of the array: keyframes with the same content share the same array.
+    This is an internal class of AutomatonHistory.
+    """
+
+    cells: np.ndarray
+    digest: bytes
+
+
+@dataclass
+class DeltaFrame:
+    """Step of the history stored as the changes from the previous step.
+
+    `indices` are the flat indices of the changed cells, `values` their new palette indices.
+    This is an internal class of AutomatonHistory.
+    """
+
+    indices: np.ndarray
+    values: np.ndarray
+
+
+class EvictedFrame:
+    """Step of the history which was evicted to respect the memory budget, it is calculated again when needed.
+
+    This is an internal class of AutomatonHistory, use the EVICTED instance.
+    """
+
+
+EVICTED = EvictedFrame()
+"""The frame of all the evicted steps"""
+
+
+@dataclass
+class ObjectFrame:
+    """Step of the history which is not a grid, stored as a deep copy.
+
+    This is an internal class of AutomatonHistory.
+    """
+
+    obj: Any
+
+
+class Palette:
+    """Palette of the values of the cells of the grids stored in a history.
+
+    A grid is encoded as an array of indices in the palette, of the smallest type able to hold them.
+    This is an internal class of AutomatonHistory and RingHistory.
+    """
+
+    def __init__(self):
+        """Constructor"""
+        self.values: list[Any] = []
+        self.__indices: dict[tuple[type, Any], int] = {}
+        self.__array: np.ndarray = None
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    @property
+    def dtype(self) -> np.dtype:
+        """Return the type used to store the palette indices."""
+        return np.min_scalar_type(max(len(self.values) - 1, 0))
+
+    def index(self, value: Any) -> int:
+        """Return the index of the value in the palette, the value is added if needed."""
+        key = (type(value), value)
+        index = self.__indices.get(key)
+        if index is None:
+            index = self.__indices[key] = len(self.values)
+            self.values.append(value)
+        return index
+
+    def encode(self, grid: Grid) -> Optional[np.ndarray]:
+        """Return the array of palette indices of the grid, None if it is not a rectangular grid of hashable values."""
+        if not isinstance(grid, list) or not grid or not all(isinstance(line, list) for line in grid):
+            return None
+        width = len(grid[0])
+        if any(len(line) != width for line in grid):
+            return None
+        try:
+            indices = [self.index(cell) for line in grid for cell in line]
+        except TypeError:  # unhashable value
+            return None
+        return np.array(indices, dtype=self.dtype).reshape(len(grid), width)
+
+    def encode_automaton(self, automaton: Automaton) -> Optional[np.ndarray]:
+        """Return the array of palette indices of the grid of the automaton."""
+        if isinstance(automaton, ArrayAutomaton):
+            # the cells are already encoded, only the states need to be mapped into the palette
+            states = np.array([self.index(s) for s in automaton.states], dtype=np.intp)
+            return states[automaton.cells].astype(self.dtype)
+        return self.encode(automaton.grid)
+
+    def decode(self, cells: np.ndarray) -> Grid:
+        """Return the grid of values of the array of palette indices."""
+        if self.__array is None or len(self.__array) != len(self.values):
+            self.__array = np.empty(len(self.values), dtype=object)
+            self.__array[:] = self.values
+        return self.__array[cells].tolist()
+
+    def clear(self) -> None:
+        """Remove all the values of the palette."""
+        self.values.clear()
+        self.__indices.clear()
+        self.__array = None
+
 
 class AutomatonHistory:
     """History for Cellular Automatons.
 
     This class holds grids of automatons, so you can go back to a previously calculated step easily.
-    AutomatonHistory automatically stores deep copies of the provided grid.
     It is best used with an AutomatonRunner.
+
+    Grids are encoded as arrays of indices in a palette of the values of their cells. A full array (keyframe) is
+    stored every `keyframe_interval` steps, and the steps in between only store the cells that changed since the
+    previous step. Any step is rebuilt from the closest keyframe before it. The last rebuilt step is cached, so
+    moving forward only applies one change list. Objects that are not grids are stored as deep copies.
+
+    The steps are hashed on append. A step identical to a keyframe is stored as a keyframe sharing its array, and a
+    step identical to a recent step is stored as a keyframe, so a settled or periodic automaton costs almost nothing
+    per step.
+
+    With a memory budget (`max_bytes`), the oldest steps are evicted when the budget is exceeded: first the change
+    lists between keyframes, then one keyframe out of two, so the remaining keyframes are sparse checkpoints. An
+    evicted step is calculated again by running the rule of the automaton from the closest step before it. Only the
+    steps appended with `append_automaton_state(automaton, iteration=True)`, which are one iteration of the automaton
+    after the previous step, can be evicted, and only if the next step of the automaton only depends on its grid
+    (`Automaton.GRID_ONLY_RULE`). The automaton is copied to calculate the evicted steps when a step is first evicted.
     """
 
-    def __init__(self, history_size: int = 10000):
+    def __init__(self, history_size: Optional[int] = 10000, keyframe_interval: int = 32, max_bytes: int = None):
         """Constructor
 
-        :param int history_size: the size of the history. Over this, it won't be possible to store more steps
+        :param int history_size: the size of the history. Over this, it won't be possible to store more steps.
+            None for no limit
+        :param int keyframe_interval: the maximum number of steps between two full copies of the grid
+        :param int max_bytes: the memory budget of the history in bytes, None for no budget
         """
-        self.__history_size: int = history_size
-        self.__history: list[Grid] = []
+        self.__history_size: Optional[int] = history_size
+        self.__keyframe_interval: int = keyframe_interval
+        self.__max_bytes: Optional[int] = max_bytes
+        self.__history: list[KeyFrame | DeltaFrame | EvictedFrame | ObjectFrame] = []
+        # tell for each step if it is one iteration of the automaton after the previous step
+        self.__iterations: list[bool] = []
+        self.__nbytes: int = 0
+        # the arrays of the keyframes by hash of their content, with the number of keyframes sharing them
+        self.__shared: dict[bytes, list] = {}
+        # the hashes of the latest appended steps
+        self.__recent: deque[bytes] = deque(maxlen=RECENT_STEPS)
+        # the indices of the keyframes, and the ones of the keyframes followed by change lists not evicted yet
+        self.__keyframes: list[int] = []
+        self.__pending: deque[int] = deque()
         self.__current: int = -1
+        self.__palette: Palette = Palette()
+        # the last rebuilt step: (index, array of palette indices)
+        self.__cache: Optional[tuple[int, np.ndarray]] = None
+        # the copy of the automaton used to calculate evicted steps, and the last step it calculated
+        self.__automaton: Automaton = None
+        self.__simulator: Automaton = None
+        self.__simulated: np.ndarray = None
 
     # List style
 
     def __getitem__(self, idx: int) -> Grid:
         """Return the grid at the given position in the history."""
-        return deepcopy(self.__history[idx])
+        idx = self.__check_index(idx)
+        frame = self.__history[idx]
+        if isinstance(frame, ObjectFrame):
+            return deepcopy(frame.obj)
+        return self.__palette.decode(self.__rebuild(idx))
 
     def __setitem__(self, idx: int, grid: Grid):
         """Creates a deep copy of the given grid and stores it at the given position."""
-        self.__history[idx] = deepcopy(grid)
+        idx = self.__check_index(idx)
+        # the next step is stored relatively to this one
+        if idx + 1 < len(self.__history) and isinstance(self.__history[idx + 1], (DeltaFrame, EvictedFrame)):
+            self.__set_frame(idx + 1, self.__key_frame(self.__rebuild(idx + 1)))
+            self.__iterations[idx + 1] = False
+        self.__cache = None
+        cells = self.__palette.encode(grid)
+        self.__set_frame(idx, ObjectFrame(deepcopy(grid)) if cells is None else self.__key_frame(cells))
+        self.__iterations[idx] = False
+        self.__index_keyframes()
 
     def __len__(self) -> int:
         return len(self.__history)
@@ -63,10 +236,20 @@ class AutomatonHistory:
     # Properties
 
     @property
-    def history_size(self) -> int:
+    def history_size(self) -> Optional[int]:
         """Return the maximum size the history can take."""
         return self.__history_size
 
+    @property
+    def max_bytes(self) -> Optional[int]:
+        """Return the memory budget of the history in bytes."""
+        return self.__max_bytes
+
+    @property
+    def keyframe_interval(self) -> int:
+        """Return the maximum number of steps between two full copies of the grid."""
+        return self.__keyframe_interval
+
     @property
     def current_index(self) -> int:
         """Return the current index in the history."""
@@ -79,6 +262,11 @@ class AutomatonHistory:
         """
         return len(self.__history) - self.__current - 1
 
+    @property
+    def nbytes(self) -> int:
+        """Return the number of bytes used by the arrays of the history (objects stored as deep copies excluded)."""
+        return self.__nbytes
+
     # List management
 
     def get(self) -> Grid:
@@ -93,26 +281,45 @@ class AutomatonHistory:
 
         :param grid: the grid to add in the history
         """
-        if self.remaining_steps > 0:
-            self.clear_after()
-        if len(self.__history) >= self.__history_size:
-            raise IndexError(f"Maximum history size, can't store more steps: {self.__history_size}.")
-        self.__history.append(deepcopy(grid))
-        self.__current += 1
+        self.__append_cells(self.__palette.encode(grid), grid)
 
-    def append_automaton_state(self, automaton: Automaton) -> None:
+    def append_automaton_state(self, automaton: Automaton, iteration: bool = False) -> None:
         """Creates a deep copy of the grid of the given automaton and append it to the history.
 
         This method can safely be used as callback for an AutomatonRunner.
         :param Automaton automaton: the automaton from which extract the grid and save its state
+        :param bool iteration: True if the grid was calculated with `apply_rule()` from the previous step, so the
+            step can be evicted and calculated again if needed
         :return: the deep copy of the automaton's grid
         """
-        self.append(automaton.grid)
+        cells = self.__palette.encode_automaton(automaton)
+        if cells is None:
+            self.__append_cells(None, automaton.grid)
+            return
+        if iteration and automaton.GRID_ONLY_RULE and self.__automaton is None:
+            self.__automaton = automaton
+        # the step is appended after the current one, the steps after it are cleared
+        iteration = (
+            iteration
+            and automaton is self.__automaton
+            and self.__current >= 0
+            and not isinstance(self.__history[self.__current], ObjectFrame)
+        )
+        self.__append_cells(cells, iteration=iteration)
 
     def clear(self) -> None:
         """Clear the history."""
         self.__history.clear()
+        self.__iterations.clear()
+        self.__keyframes.clear()
+        self.__pending.clear()
+        self.__nbytes = 0
+        self.__shared.clear()
+        self.__recent.clear()
         self.__current = -1
+        self.__cache = None
+        self.__palette.clear()
+        self.__automaton = self.__simulator = self.__simulated = None
 
     def clear_after(self, idx: int = -1) -> None:
         """Clear the history after the given index.
@@ -124,32 +331,222 @@ class AutomatonHistory:
             idx = self.__current
         if idx >= len(self.__history) - 1:
             return
-        self.__history[:] = self.__history[: idx + 1]
+        self.__nbytes -= sum(self.__release(frame) for frame in self.__history[idx + 1 :])
+        del self.__history[idx + 1 :]
+        del self.__iterations[idx + 1 :]
+        del self.__keyframes[bisect.bisect_right(self.__keyframes, idx) :]
+        self.__pending = deque(k for k in self.__pending if k <= idx)
+        if self.__keyframes and self.__pending and self.__pending[-1] == self.__keyframes[-1]:
+            # the last keyframe may be followed by new change lists
+            self.__pending.pop()
         if self.__current > idx:
             self.__current = idx
+        if self.__cache is not None and self.__cache[0] > idx:
+            self.__cache = None
 
     # Navigation
 
-    def move_backward(self, step: int = 1) -> Grid:
+    def view(self, idx: int) -> FrameView:
+        """Return a read-only view on the grid at the given position in the history, without copy.
+
+        Steps which are not grids are returned as deep copies.
+        """
+        idx = self.__check_index(idx)
+        frame = self.__history[idx]
+        if isinstance(frame, ObjectFrame):
+            return deepcopy(frame.obj)
+        return FrameView(self.__rebuild(idx), self.__palette.values)
+
+    def move_backward(self, step: int = 1, view: bool = False) -> Grid | FrameView:
         """Move current_index of X steps back.
 
+        :param bool view: return a read-only view instead of a copy, see `view()`
         :return: the saved state at the new current_index.
         """
         self.__current -= step
-        return self[self.__current]
+        return self.view(self.__current) if view else self[self.__current]
 
-    def move_forward(self, step: int = 1) -> Grid:
+    def move_forward(self, step: int = 1, view: bool = False) -> Grid | FrameView:
         """Move current_index of X steps forward.
 
+        :param bool view: return a read-only view instead of a copy, see `view()`
         :return: the saved state at the new current_index.
         """
         self.__current += step
-        return self[self.__current]
+        return self.view(self.__current) if view else self[self.__current]
 
-    def move_to(self, idx: int) -> Grid:
+    def move_to(self, idx: int, view: bool = False) -> Grid | FrameView:
         """Move current_index to idx.
 
+        :param bool view: return a read-only view instead of a copy, see `view()`
         :return: the saved state at the new current_index.
         """
         self.__current = idx
-        return self[self.__current]
+        return self.view(self.__current) if view else self[self.__current]
+
+    # Private methods
+
+    def __check_index(self, idx: int) -> int:
+        if idx < 0:
+            idx += len(self.__history)
+        if not 0 <= idx < len(self.__history):
+            raise IndexError("History index out of range")
+        return idx
+
+    def __append_cells(self, cells: Optional[np.ndarray], grid: Grid = None, iteration: bool = False) -> None:
+        if self.remaining_steps > 0:
+            self.clear_after()
+        if self.__history_size is not None and len(self.__history) >= self.__history_size:
+            raise IndexError(f"Maximum history size, can't store more steps: {self.__history_size}.")
+        idx = len(self.__history)
+        frame = ObjectFrame(deepcopy(grid)) if cells is None else self.__make_frame(idx, cells)
+        if isinstance(frame, KeyFrame):
+            if self.__keyframes:
+                self.__pending.append(self.__keyframes[-1])
+            self.__keyframes.append(idx)
+        self.__history.append(frame)
+        self.__iterations.append(iteration)
+        self.__nbytes += self.__acquire(frame)
+        if cells is not None:
+            self.__cache = (idx, cells)
+        self.__current += 1
+        self.__enforce_budget()
+
+    def __set_frame(self, idx: int, frame: KeyFrame | DeltaFrame | EvictedFrame | ObjectFrame) -> None:
+        self.__nbytes += self.__acquire(frame) - self.__release(self.__history[idx])
+        self.__history[idx] = frame
+
+    def __index_keyframes(self) -> None:
+        """Find the keyframes again, after the history was edited."""
+        self.__keyframes = [i for i, frame in enumerate(self.__history) if isinstance(frame, KeyFrame)]
+        self.__pending = deque(
+            k
+            for k, end in zip(self.__keyframes, self.__keyframes[1:])
+            if any(isinstance(frame, DeltaFrame) for frame in self.__history[k + 1 : end])
+        )
+
+    def __enforce_budget(self) -> None:
+        """Evict steps until the memory budget is respected."""
+        if self.__max_bytes is None or self.__nbytes <= self.__max_bytes:
+            return
+        if self.__simulator is None and self.__automaton is not None:
+            # the rule and the setup of the automaton are needed to calculate the evicted steps
+            self.__simulator = deepcopy(self.__automaton)
+        while self.__nbytes > self.__max_bytes:
+            if self.__pending:
+                # evict the change lists following the oldest keyframe
+                keyframe = self.__pending.popleft()
+                end = self.__keyframes[bisect.bisect_right(self.__keyframes, keyframe)]
+                if all(self.__iterations[keyframe + 1 : end]):
+                    for idx in range(keyframe + 1, end):
+                        self.__set_frame(idx, EVICTED)
+            elif not self.__evict_keyframes():
+                break
+
+    def __evict_keyframes(self) -> bool:
+        """Evict one keyframe out of two, the first and the last one excluded. Return False if none was evicted."""
+        evicted = set()
+        for keyframe, end in zip(self.__keyframes[1:-1:2], self.__keyframes[2::2]):
+            if all(self.__iterations[keyframe:end]):
+                for idx in range(keyframe, end):
+                    self.__set_frame(idx, EVICTED)
+                evicted.add(keyframe)
+        self.__keyframes = [k for k in self.__keyframes if k not in evicted]
+        return bool(evicted)
+
+    def __make_frame(self, idx: int, cells: np.ndarray) -> KeyFrame | DeltaFrame:
+        """Return the frame storing the cells at the given index, a change list if possible.
+
+        If a keyframe or a recent step has the same content, a keyframe is returned, so the next identical steps
+        share its array.
+        """
+        keyframe = self.__key_frame(cells)
+        recent = keyframe.digest in self.__recent
+        self.__recent.append(keyframe.digest)
+        if recent or keyframe.digest in self.__shared:
+            return keyframe
+        last_keyframe = self.__last_keyframe(idx - 1)
+        if last_keyframe is None or idx - last_keyframe >= self.__keyframe_interval:
+            return keyframe
+        previous = self.__rebuild(idx - 1)
+        if previous.shape != cells.shape:
+            return keyframe
+        indices = np.flatnonzero(previous != cells)
+        delta = DeltaFrame(indices.astype(np.min_scalar_type(cells.size)), cells.reshape(-1)[indices])
+        return delta if delta.indices.nbytes + delta.values.nbytes < cells.nbytes else keyframe
+
+    def __key_frame(self, cells: np.ndarray) -> KeyFrame:
+        """Return the keyframe of the cells, sharing the array of a keyframe with the same content if any."""
+        digest = hashlib.blake2b(f"{cells.shape}{cells.dtype.str}".encode(), digest_size=16)
+        cells = np.ascontiguousarray(cells)
+        digest.update(cells)
+        digest = digest.digest()
+        shared = self.__shared.get(digest)
+        return KeyFrame(cells if shared is None else shared[0], digest)
+
+    def __last_keyframe(self, idx: int) -> Optional[int]:
+        """Return the index of the keyframe used to rebuild the step idx, None if it is not a grid."""
+        while idx >= 0 and isinstance(self.__history[idx], DeltaFrame):
+            idx -= 1
+        return idx if idx >= 0 and isinstance(self.__history[idx], KeyFrame) else None
+
+    def __rebuild(self, idx: int) -> np.ndarray:
+        """Return the array of palette indices of the step idx. It must not be modified."""
+        # find the closest step before idx which is cached or stored as keyframe
+        cached = self.__cache[0] if self.__cache is not None and self.__cache[0] <= idx else -1
+        start = idx
+        while start != cached and not isinstance(self.__history[start], KeyFrame):
+            start -= 1
+        cells = self.__cache[1] if start == cached else self.__history[start].cells
+        owned = False
+        for frame in self.__history[start + 1 : idx + 1]:
+            if isinstance(frame, DeltaFrame):
+                if not owned:
+                    cells, owned = cells.astype(self.__palette.dtype), True
+                cells.reshape(-1)[frame.indices] = frame.values
+                self.__simulated = None
+            else:
+                cells, owned = self.__simulate(cells), True
+        self.__cache = (idx, cells)
+        return cells
+
+    def __simulate(self, cells: np.ndarray) -> np.ndarray:
+        """Return the step after the given one, calculated with the automaton."""
+        if cells is not self.__simulated:
+            self.__load_simulator(cells)
+        self.__simulator.apply_rule()
+        self.__simulated = self.__palette.encode_automaton(self.__simulator)
+        return self.__simulated
+
+    def __load_simulator(self, cells: np.ndarray) -> None:
+        simulator = self.__simulator
+        if isinstance(simulator, ArrayAutomaton):
+            indices = {(type(s), s): i for i, s in enumerate(simulator.states)}
+            states = np.array([indices.get((type(v), v), -1) for v in self.__palette.values], dtype=np.intp)[cells]
+            if (states >= 0).all():
+                simulator.cells = states.astype(simulator.dtype)
+                return
+        simulator.grid = self.__palette.decode(cells)
+
+    def __acquire(self, frame: KeyFrame | DeltaFrame | EvictedFrame | ObjectFrame) -> int:
+        """Register the frame being stored, return the number of bytes it adds."""
+        if isinstance(frame, KeyFrame):
+            shared = self.__shared.setdefault(frame.digest, [frame.cells, 0])
+            shared[1] += 1
+            return frame.cells.nbytes if shared[1] == 1 else 0
+        if isinstance(frame, DeltaFrame):
+            return frame.indices.nbytes + frame.values.nbytes
+        return 0
+
+    def __release(self, frame: KeyFrame | DeltaFrame | EvictedFrame | ObjectFrame) -> int:
+        """Unregister the frame being removed, return the number of bytes it frees."""
+        if isinstance(frame, KeyFrame):
+            shared = self.__shared[frame.digest]
+            shared[1] -= 1
+            if shared[1]:
+                return 0
+            del self.__shared[frame.digest]
+            return frame.cells.nbytes
+        if isinstance(frame, DeltaFrame):
+            return frame.indices.nbytes + frame.values.nbytes
+        return 0
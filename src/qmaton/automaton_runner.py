@@ -22,9 +22,16 @@
 from __future__ import annotations
 
 from time import sleep, time
+from typing import Union
 
 from .automaton import Automaton
 from .automaton_history import AutomatonHistory
+from .cycle_detector import CycleAction, CycleDetector
+from .mapped_history import MappedHistory
+from .ring_history import RingHistory
+
+History = Union[AutomatonHistory, RingHistory, MappedHistory]
+"""The history managers an AutomatonRunner can update."""
 
 
 class AutomatonRunner:
@@ -36,25 +43,43 @@ class AutomatonRunner:
     Attributes:
         sleep_time the number of ms between each iteration
         nb_iter the number of iterations to do. If negative, will run infinitely
-        history the history manager to update
+        history the history manager to update, an AutomatonHistory, a RingHistory or a MappedHistory
+        cycle_detector the detector of the cycles of the automaton, reset at each launch
+        on_cycle what to do when the automaton enters a cycle
     """
 
-    def __init__(self, nb_iter: int = 100, iter_per_second: int = 10, history: AutomatonHistory = None):
+    def __init__(
+        self,
+        nb_iter: int = 100,
+        iter_per_second: int = 10,
+        history: History = None,
+        cycle_detector: CycleDetector = None,
+        on_cycle: CycleAction = CycleAction.STOP,
+    ):
         """Constructor
 
         :param int nb_iter: the number of iterations to realize
         :param float iter_per_second: number of iterations per second (can't be 0)
+        :param History history: the history manager to update
+        :param CycleDetector cycle_detector: the detector of the cycles of the automaton, None to not detect them
+        :param CycleAction on_cycle: what to do when the automaton enters a cycle. With FAST_FORWARD, the automaton
+            is left in the state of the last iteration, but only the remaining iterations modulo the period of the
+            cycle are calculated (and added to the history). For a run without end, it stops the runner
         """
         self.sleep_time: float = 1 / iter_per_second
         self.nb_iter: int = nb_iter
-        self.history: AutomatonHistory = history
+        self.history: History = history
+        self.cycle_detector: CycleDetector = cycle_detector
+        self.on_cycle: CycleAction = on_cycle
         self.__stop: bool = False
 
     def stop(self) -> None:
         """Stop the runner."""
         self.__stop = True
 
-    def launch(self, automaton: Automaton, callback: callable[[Automaton], None] = None) -> None:
+    def launch(
+        self, automaton: Automaton, callback: callable[[Automaton], None] = None, finished: callable[[], None] = None
+    ) -> None:
         """Start the runner.
 
         The time this function will run should be nb_iter * sleep_time seconds
@@ -65,23 +90,47 @@ class AutomatonRunner:
 
         :param Automaton automaton: the automaton to run on
         :param Callable callback: a callable object called each time an iteration is finished
+        :param Callable finished: a callable object called once the runner is finished or stopped, e.g. to flush
+            a FileVisualizer
         """
         self.__stop = False
+        if self.cycle_detector is not None:
+            self.cycle_detector.reset()
+            self.cycle_detector.update(automaton)
         i = 0
-        while not self.__stop and (self.nb_iter < 0 or i < self.nb_iter):
-            time_before = time()
-            if self.history is not None and not self.history:  # history is empty
-                self.history.append_automaton_state(automaton)
-
-            automaton.apply_rule()
-            if self.history is not None:
-                self.history.append_automaton_state(automaton)
-            if callback is not None:
-                callback(automaton)
-
-            to_sleep = self.sleep_time - time() + time_before
-            if to_sleep > 0:
-                sleep(self.sleep_time)
-            else:
-                print("Iteration took too long: {} s".format(self.sleep_time - to_sleep))
-            i += 1
+        try:
+            while not self.__stop and (self.nb_iter < 0 or i < self.nb_iter):
+                time_before = time()
+                if self.history is not None and not self.history:  # history is empty
+                    self.history.append_automaton_state(automaton)
+
+                self.__iterate(automaton, callback)
+                if (
+                    self.cycle_detector is not None
+                    and self.cycle_detector.update(automaton)
+                    and self.on_cycle != CycleAction.CONTINUE
+                ):
+                    if self.on_cycle == CycleAction.FAST_FORWARD and self.nb_iter >= 0:
+                        # the state of the last iteration is the one of the same step of the cycle
+                        for _ in range((self.nb_iter - i - 1) % self.cycle_detector.period):
+                            self.__iterate(automaton, callback)
+                    break
+
+                to_sleep = self.sleep_time - time() + time_before
+                if to_sleep > 0:
+                    sleep(self.sleep_time)
+                else:
+                    print("Iteration took too long: {} s".format(self.sleep_time - to_sleep))
+                i += 1
+        finally:
+            if finished is not None:
+                finished()
+
+    # Private methods
+
+    def __iterate(self, automaton: Automaton, callback: callable[[Automaton], None]) -> None:
+        automaton.apply_rule()
+        if self.history is not None:
+            self.history.append_automaton_state(automaton, iteration=True)
+        if callback is not None:
+            callback(automaton)
@@ -18,15 +18,42 @@
 
 """Automaton serializer, export / import automaton state from / to JSON."""
 
+from __future__ import annotations
 
+import json
+import re
 from json import JSONEncoder
+from typing import TextIO
 
+import numpy as np
+
+from .array_automaton import ArrayAutomaton
 from .automaton import Automaton, State
+from .automaton_history import Palette
+from .frame_view import FrameView
+
+JSON_VERSION = 2
+"""The version of the JSON format written by AutomatonSerializer.dump()."""
+
+CHUNK_SIZE = 1 << 16
+"""The number of characters read at once when loading a JSON file."""
+
+ROWS_KEY = re.compile(r'"rows"\s*:\s*\[')
+SEPARATORS = re.compile(r"[\s,]*")
 
 
 class AutomatonSerializer(JSONEncoder):
     """Class used to serialize an automaton to JSON.
 
+    Two formats are supported. The version 1 is a JSON object with the "states", the "grid_size" and the "grid",
+    the name of the state of each cell. It is written by json.dumps(automaton, cls=AutomatonSerializer).
+
+    The version 2 is written by `dump()`. It starts with the "version", the "grid_size" and the "states", then
+    come the "rows", one line per row of the grid. Each row is run-length encoded as a flat list of pairs: the
+    number of consecutive cells and the index of their state in "states". For example, [3,0,1,1] is 3 cells of
+    the first state followed by 1 cell of the second one. The rows are written and read one by one: the whole
+    document is never held in memory. `load()` reads both versions.
+
     This is an internal class and shouldn't be used directly. Prefer the methods Automaton.toJSON()
     and Automaton.fromJSON().
     """
@@ -49,7 +76,7 @@ class AutomatonSerializer(JSONEncoder):
 
     @staticmethod
     def decode(o: object) -> dict:
-        """Method used to deserialize an Automaton from a JSON string.
+        """Method used to deserialize an Automaton from a JSON string, with the version 1 of the format.
 
         To use it, you first need to know the type of the automaton. It is easier to use
         Automaton.fromJSON(str_json, object_hook=AutomatonSerializer.decode)
@@ -65,3 +92,99 @@ class AutomatonSerializer(JSONEncoder):
         if "grid" in o:
             grid = [[states[s] for s in line] for line in o["grid"]]
         return {"grid_size": grid_size, "grid": grid}
+
+    @staticmethod
+    def dump(automaton: Automaton, file: TextIO) -> None:
+        """Write the automaton in the file, with the version 2 of the format.
+
+        :raise ValueError: if a cell is not a State
+        """
+        palette = Palette()
+        for state in automaton.states:
+            palette.index(state)
+        if isinstance(automaton, ArrayAutomaton):
+            rows = automaton.cells
+        else:
+            rows = automaton.grid
+            for line in rows:
+                for cell in line:
+                    palette.index(cell)
+            if not all(isinstance(state, State) for state in palette.values):
+                raise ValueError("The cells of the automaton must be States.")
+        states = [[state.name, state.color] for state in palette.values]
+        header = {"version": JSON_VERSION, "grid_size": list(automaton.grid_size), "states": states}
+        file.write(json.dumps(header)[:-1] + ', "rows": [')
+        indices = {state: i for i, state in enumerate(palette.values)}
+        for x, row in enumerate(rows):
+            if not isinstance(row, np.ndarray):
+                row = np.array([indices[cell] for cell in row], dtype=palette.dtype)
+            file.write(("\n" if x == 0 else ",\n") + AutomatonSerializer.__encode_row(row))
+        file.write("\n]}\n")
+
+    @staticmethod
+    def load(file: TextIO) -> dict:
+        """Read an automaton from the file, the version of the format is detected.
+
+        The version 2 is read row by row into an array of state indices.
+        :return: a dictionary with the "version", the "grid_size" and the "grid": a FrameView for the version 2, a
+            list of lists of State for the version 1
+        :raise ValueError: if the file is not a valid automaton
+        """
+        text = ""
+        match = None
+        while match is None:
+            chunk = file.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            start = max(len(text) - 16, 0)
+            text += chunk
+            match = ROWS_KEY.search(text, start)
+        if match is None:
+            o = json.loads(text, object_hook=AutomatonSerializer.decode)
+            return {"version": 1, **o}
+        header = json.loads(text[: match.start()].rstrip().rstrip(",") + "}")
+        if header.get("version") != JSON_VERSION:
+            raise ValueError(f"Unsupported version of the QMaton JSON format: {header.get('version')}")
+        try:
+            length, width = (int(n) for n in header["grid_size"])
+            states = [State(*s) for s in header["states"]]
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Corrupted QMaton JSON file: {e}") from None
+        cells = np.empty((length, width), dtype=np.min_scalar_type(max(len(states) - 1, 0)))
+        decoder = json.JSONDecoder()
+        pos = match.end()
+        for x in range(length):
+            while True:
+                pos = SEPARATORS.match(text, pos).end()
+                try:
+                    row, pos = decoder.raw_decode(text, pos)
+                    break
+                except json.JSONDecodeError:
+                    # the row is not complete, read more (at least as much as is left, for very long rows)
+                    chunk = file.read(max(CHUNK_SIZE, len(text) - pos))
+                    if not chunk:
+                        raise ValueError(f"Corrupted QMaton JSON file: row {x} is missing.") from None
+                    text = text[pos:] + chunk
+                    pos = 0
+            cells[x] = AutomatonSerializer.__decode_row(row, x, width, len(states))
+        return {"version": JSON_VERSION, "grid_size": (length, width), "grid": FrameView(cells, states)}
+
+    # Private methods
+
+    @staticmethod
+    def __encode_row(row: np.ndarray) -> str:
+        if not row.size:
+            return "[]"
+        starts = np.concatenate(([0], np.flatnonzero(row[1:] != row[:-1]) + 1))
+        counts = np.diff(np.append(starts, row.size))
+        return "[" + ",".join(map(str, np.column_stack((counts, row[starts])).reshape(-1).tolist())) + "]"
+
+    @staticmethod
+    def __decode_row(row: object, x: int, width: int, nb_states: int) -> np.ndarray:
+        try:
+            runs = np.array(row, dtype=np.int64).reshape(-1, 2)
+        except (TypeError, ValueError):
+            runs = None
+        if runs is None or (runs < 0).any() or runs[:, 0].sum() != width or (runs[:, 1] >= nb_states).any():
+            raise ValueError(f"Corrupted QMaton JSON file: wrong row {x}.")
+        return np.repeat(runs[:, 1], runs[:, 0])
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+
+#    QMaton is a Python/Qt software used to run cellular automatons.
+#    Copyright (C) 2021  Rémi Ducceschi (remileduc) <remi.ducceschi@gmail.com>
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Binary serializer, export / import automaton state from / to the .qmaton binary format."""
+
+from __future__ import annotations
+
+import lzma
+import struct
+import zlib
+from enum import Enum
+
+import numpy as np
+
+from .array_automaton import ArrayAutomaton
+from .automaton import Automaton, State
+from .automaton_history import Palette
+
+MAGIC = b"QMATON"
+"""The first bytes of a .qmaton file."""
+
+VERSION = 1
+"""The version of the .qmaton format."""
+
+
+class Compression(Enum):
+    """Compression of the cells in a .qmaton file."""
+
+    NONE = 0
+    ZLIB = 1
+    LZMA = 2
+
+
+class BinarySerializer:
+    """Class used to serialize an automaton to the .qmaton binary format.
+
+    The file starts with a header: the magic bytes "QMATON", the version of the format, the compression, the number
+    of bits per cell, the size of the grid and the number of states. Then comes the palette: the name and the color
+    of each state, as UTF-8 strings preceded by their length. Then the cells: the index of their state in the
+    palette, packed on 1, 2, 4, 8 or 16 bits, line by line and compressed with zlib or lzma.
+
+    This is an internal class and shouldn't be used directly. Prefer the methods Automaton.toBinary()
+    and Automaton.fromBinary().
+    """
+
+    HEADER = struct.Struct("<6sBBBxIIH")
+    """Magic bytes, version, compression, bits per cell, length, width, number of states."""
+
+    @staticmethod
+    def dumps(automaton: Automaton, compression: Compression = Compression.ZLIB) -> bytes:
+        """Return the .qmaton representation of the automaton.
+
+        :raise ValueError: if a cell is not a State, or if there are more than 65536 states
+        """
+        palette = Palette()
+        for state in automaton.states:
+            palette.index(state)
+        if isinstance(automaton, ArrayAutomaton):
+            cells = automaton.cells
+        else:
+            cells = palette.encode(automaton.grid)
+            if cells is None or not all(isinstance(state, State) for state in palette.values):
+                raise ValueError("The cells of the automaton must be States.")
+        states = palette.values
+        if len(states) > 1 << 16:
+            raise ValueError(f"Too many states to be saved: {len(states)}")
+        bits = BinarySerializer.__bits_per_cell(len(states))
+        header = BinarySerializer.HEADER.pack(
+            MAGIC, VERSION, compression.value, bits, automaton.length, automaton.width, len(states)
+        )
+        strings = b"".join(BinarySerializer.__pack_string(s) for state in states for s in (state.name, state.color))
+        data = BinarySerializer.__pack_cells(cells.reshape(-1), bits)
+        if compression == Compression.ZLIB:
+            data = zlib.compress(data)
+        elif compression == Compression.LZMA:
+            data = lzma.compress(data)
+        return header + strings + data
+
+    @staticmethod
+    def loads(data: bytes) -> dict:
+        """Read a .qmaton representation of an automaton.
+
+        :return: a dictionary with the "grid_size", the "states" of the palette and the "cells", the array of the
+            indices of the states of the cells
+        :raise ValueError: if the data is not a valid .qmaton file
+        """
+        header = BinarySerializer.HEADER
+        if len(data) < header.size or data[: len(MAGIC)] != MAGIC:
+            raise ValueError("Not a QMaton binary file.")
+        _, version, compression, bits, length, width, nb_states = header.unpack_from(data)
+        if version > VERSION:
+            raise ValueError(f"Unsupported version of the QMaton binary format: {version}")
+        offset = header.size
+        states = []
+        try:
+            for _ in range(nb_states):
+                name, offset = BinarySerializer.__unpack_string(data, offset)
+                color, offset = BinarySerializer.__unpack_string(data, offset)
+                states.append(State(name, color))
+            data = data[offset:]
+            compression = Compression(compression)
+            if compression == Compression.ZLIB:
+                data = zlib.decompress(data)
+            elif compression == Compression.LZMA:
+                data = lzma.decompress(data)
+            cells = BinarySerializer.__unpack_cells(data, bits, length * width)
+        except (struct.error, zlib.error, lzma.LZMAError) as e:
+            raise ValueError(f"Corrupted QMaton binary file: {e}") from None
+        if cells.size and cells.max() >= nb_states:
+            raise ValueError("Corrupted QMaton binary file: unknown state.")
+        return {"grid_size": (length, width), "states": states, "cells": cells.reshape(length, width)}
+
+    # Private methods
+
+    @staticmethod
+    def __bits_per_cell(nb_states: int) -> int:
+        needed = max(int(nb_states - 1).bit_length(), 1)
+        return next(bits for bits in (1, 2, 4, 8, 16) if needed <= bits)
+
+    @staticmethod
+    def __pack_string(string: str) -> bytes:
+        encoded = string.encode("utf-8")
+        return struct.pack("<H", len(encoded)) + encoded
+
+    @staticmethod
+    def __unpack_string(data: bytes, offset: int) -> tuple[str, int]:
+        (size,) = struct.unpack_from("<H", data, offset)
+        offset += 2
+        if offset + size > len(data):
+            raise struct.error("string out of the data")
+        return data[offset : offset + size].decode("utf-8"), offset + size
+
+    @staticmethod
+    def __pack_cells(cells: np.ndarray, bits: int) -> bytes:
+        if bits == 16:
+            return cells.astype("<u2").tobytes()
+        cells = cells.astype(np.uint8)
+        if bits == 8:
+            return cells.tobytes()
+        # each byte holds 8 / bits cells, the first one in the most significant bits
+        per_byte = 8 // bits
+        cells = np.concatenate((cells, np.zeros(-cells.size % per_byte, dtype=np.uint8))).reshape(-1, per_byte)
+        packed = np.zeros(len(cells), dtype=np.uint8)
+        for i, shift in enumerate(range(8 - bits, -1, -bits)):
+            packed |= cells[:, i] << np.uint8(shift)
+        return packed.tobytes()
+
+    @staticmethod
+    def __unpack_cells(data: bytes, bits: int, size: int) -> np.ndarray:
+        if bits not in (1, 2, 4, 8, 16) or len(data) != (size * bits + 7) // 8:
+            raise struct.error("wrong size of the cells")
+        if bits == 16:
+            return np.frombuffer(data, dtype="<u2").astype(np.uint16)
+        packed = np.frombuffer(data, dtype=np.uint8)
+        if bits == 8:
+            return packed
+        shifts = np.arange(8 - bits, -1, -bits, dtype=np.uint8)
+        cells = (packed[:, np.newaxis] >> shifts) & np.uint8((1 << bits) - 1)
+        return cells.reshape(-1)[:size]
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+
+#    QMaton is a Python/Qt software used to run cellular automatons.
+#    Copyright (C) 2021  Rémi Ducceschi (remileduc) <remi.ducceschi@gmail.com>
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""CycleDetector class, detects when the grid of an automaton goes back to a previous state."""
+
+from __future__ import annotations
+
+from collections import deque
+from enum import Enum
+from typing import Optional
+
+import numpy as np
+
+from .array_automaton import ArrayAutomaton
+from .automaton import Automaton
+from .automaton_history import Palette
+
+
+class CycleAction(Enum):
+    """What an AutomatonRunner does when the automaton enters a cycle."""
+
+    CONTINUE = 0
+    """Keep calculating the iterations, the cycle is only reported by the CycleDetector"""
+    STOP = 1
+    """Stop the runner"""
+    FAST_FORWARD = 2
+    """Go to the last iteration: only the remaining iterations modulo the period are calculated"""
+
+
+class CycleDetector:
+    """Detects when the grid of an automaton goes back to a previous state.
+
+    The grid is hashed at each step with a Zobrist hash: the XOR of a random key per cell and state. The keys are
+    derived from the position and the state of the cells with a mixing function, so no table of keys is stored.
+    The hash is updated from the cells which changed since the previous step only: the ones given by
+    `ArrayAutomaton.changed_cells` if known, otherwise the ones found by comparing the grid with the previous step.
+
+    When a hash is found again, the automaton entered a cycle: the grid of any later step is the grid of the same
+    step of the cycle, see `equivalent_step()`. The next state of the automaton must only depend on its grid (no
+    randomness), and the grid must only change by iterations between two calls to `update()`: call `reset()`
+    otherwise. Only the cycles of up to `max_period` steps are detected.
+    """
+
+    def __init__(self, max_period: int = 1000):
+        """Constructor
+
+        :param int max_period: the number of previous steps compared to the current one
+        """
+        self.max_period: int = max_period
+        self.__palette: Palette = Palette()
+        self.__previous: np.ndarray = None
+        self.__hash: np.uint64 = np.uint64(0)
+        # the step of each hash of the max_period previous steps
+        self.__steps: dict[int, int] = {}
+        self.__hashes: deque[int] = deque()
+        self.__step: int = -1
+        self.__start: Optional[int] = None
+        self.__period: Optional[int] = None
+
+    # Properties
+
+    @property
+    def step(self) -> int:
+        """Return the number of the last step given to `update()`, the first one is 0."""
+        return self.__step
+
+    @property
+    def hash(self) -> int:
+        """Return the hash of the grid of the last step."""
+        return int(self.__hash)
+
+    @property
+    def start(self) -> Optional[int]:
+        """Return the first step of the cycle, None if no cycle was found."""
+        return self.__start
+
+    @property
+    def period(self) -> Optional[int]:
+        """Return the number of steps of the cycle, 1 for a fixed point, None if no cycle was found."""
+        return self.__period
+
+    # Detection
+
+    def reset(self) -> None:
+        """Forget the previous steps."""
+        self.__palette.clear()
+        self.__previous = None
+        self.__steps.clear()
+        self.__hashes.clear()
+        self.__step = -1
+        self.__start = self.__period = None
+
+    def update(self, automaton: Automaton) -> bool:
+        """Hash the grid of the automaton as the next step.
+
+        :param Automaton automaton: the automaton, one iteration after the previous call
+        :return: True if the automaton is in a cycle
+        """
+        self.__step += 1
+        cells = self.__encode(automaton)
+        previous = self.__previous
+        if previous is None or previous.shape != cells.shape or previous.dtype != cells.dtype:
+            self.__hash = np.bitwise_xor.reduce(self.__keys(np.arange(cells.size), cells.reshape(-1)))
+            self.__previous = cells.copy()
+        else:
+            flat, new = previous.reshape(-1), cells.reshape(-1)
+            changed = automaton.changed_cells if isinstance(automaton, ArrayAutomaton) else None
+            if changed is None:
+                changed = np.flatnonzero(flat != new)
+            if changed.size:
+                self.__hash ^= np.bitwise_xor.reduce(self.__keys(changed, flat[changed]))
+                self.__hash ^= np.bitwise_xor.reduce(self.__keys(changed, new[changed]))
+                flat[changed] = new[changed]
+        if self.__period is None:
+            self.__find_cycle(int(self.__hash))
+        return self.__period is not None
+
+    def equivalent_step(self, step: int) -> int:
+        """Return the first step which grid is the same as the grid of the given step.
+
+        For a step in the cycle, this is the step of the first occurrence of the cycle given by modular arithmetic.
+        """
+        if self.__period is None or step < self.__start:
+            return step
+        return self.__start + (step - self.__start) % self.__period
+
+    # Private methods
+
+    def __find_cycle(self, value: int) -> None:
+        start = self.__steps.get(value)
+        if start is not None:
+            self.__start, self.__period = start, self.__step - start
+            return
+        self.__steps[value] = self.__step
+        self.__hashes.append(value)
+        if len(self.__hashes) > self.max_period:
+            del self.__steps[self.__hashes.popleft()]
+
+    def __encode(self, automaton: Automaton) -> np.ndarray:
+        """Return the array of the state indices of the cells."""
+        if isinstance(automaton, ArrayAutomaton):
+            return automaton.cells
+        cells = self.__palette.encode(automaton.grid)
+        if cells is None:
+            raise ValueError("The grid of the automaton can't be hashed.")
+        # the palette may grow, the type is fixed to compare with the previous step
+        return cells.astype(np.uint32)
+
+    @staticmethod
+    def __keys(indices: np.ndarray, states: np.ndarray) -> np.ndarray:
+        """Return the keys of the cells at the given flat indices in the given states (splitmix64)."""
+        x = (indices.astype(np.uint64) << np.uint64(32)) | states.astype(np.uint64)
+        x += np.uint64(0x9E3779B97F4A7C15)
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return x ^ (x >> np.uint64(31))
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+
+#    QMaton is a Python/Qt software used to run cellular automatons.
+#    Copyright (C) 2021  Rémi Ducceschi (remileduc) <remi.ducceschi@gmail.com>
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""FrameView class, a read-only view on a grid stored in a history."""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+from typing import Any
+
+import numpy as np
+
+
+class FrameView(Sequence):
+    """Read-only view on a grid stored in a history.
+
+    The grid is held as the array of indices of its values in a palette, as stored by the history, so reading a step
+    doesn't copy it. It can be read as a grid, `view[x][y]` or `view[x, y]`, without creating the lines of values.
+    `copy()` returns a grid that can be modified. An automaton can be set to the view with `Automaton.load_frame()`.
+    """
+
+    def __init__(self, cells: np.ndarray, palette: Sequence[Any]):
+        """Constructor
+
+        :param np.ndarray cells: the array of palette indices, it must not be modified afterward
+        :param list palette: the values of the cells
+        """
+        self.__cells: np.ndarray = cells.view()
+        self.__cells.flags.writeable = False
+        self.__palette: np.ndarray = np.empty(len(palette), dtype=object)
+        self.__palette[:] = palette
+
+    def __getitem__(self, idx: int | tuple[int, int]) -> FrameRow | Any:
+        """Return a line of the grid, or a cell if idx is a tuple (x, y)."""
+        if isinstance(idx, tuple):
+            return self.__palette[self.__cells[idx]]
+        if isinstance(idx, slice):
+            return [FrameRow(cells, self.__palette) for cells in self.__cells[idx]]
+        return FrameRow(self.__cells[idx], self.__palette)
+
+    def __len__(self) -> int:
+        return len(self.__cells)
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, FrameView):
+            return self.shape == other.shape and self.copy() == other.copy()
+        return self.copy() == other
+
+    __hash__ = None
+
+    # Properties
+
+    @property
+    def cells(self) -> np.ndarray:
+        """Return the read-only array of palette indices."""
+        return self.__cells
+
+    @property
+    def palette(self) -> tuple[Any, ...]:
+        """Return the values of the cells, indexed by the values of `cells`."""
+        return tuple(self.__palette)
+
+    @property
+    def shape(self) -> tuple[int, ...]:
+        """Return the shape of the grid."""
+        return self.__cells.shape
+
+    # Copy
+
+    def copy(self) -> list[list[Any]]:
+        """Return the grid as a list of lines, which can be modified."""
+        return self.__palette[self.__cells].tolist()
+
+
+class FrameRow(Sequence):
+    """Read-only line of a FrameView.
+
+    This is an internal class of FrameView.
+    """
+
+    def __init__(self, cells: np.ndarray, palette: np.ndarray):
+        self.__cells: np.ndarray = cells
+        self.__palette: np.ndarray = palette
+
+    def __getitem__(self, idx: int | slice) -> Any:
+        if isinstance(idx, slice):
+            return self.__palette[self.__cells[idx]].tolist()
+        return self.__palette[self.__cells[idx]]
+
+    def __len__(self) -> int:
+        return len(self.__cells)
+
+    def __eq__(self, other: Any) -> bool:
+        return self.__palette[self.__cells].tolist() == (list(other) if isinstance(other, FrameRow) else other)
+
+    __hash__ = None
@@ -0,0 +1,577 @@
+# -*- coding: utf-8 -*-
+
+#    QMaton is a Python/Qt software used to run cellular automatons.
+#    Copyright (C) 2021  Rémi Ducceschi (remileduc) <remi.ducceschi@gmail.com>
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""HashLife engine, to run Life-like automatons on an unbounded grid for a very large number of generations."""
+
+from __future__ import annotations
+
+import numpy as np
+
+from .life_like import LifeLikeAutomaton, LifeLikeRule
+
+LEAF_LEVEL = 3
+"""Level of the leaves of the macrocell format, 8x8 blocks"""
+
+
+class Node:
+    """Node of the quadtree used by HashLife.
+
+    A node of level k is a square of 2^k x 2^k cells, made of 4 nodes of level k - 1 (nw, ne, sw, se). The nodes
+    of level 0 are the cells. Nodes are unique (hash-consed) in a HashLife universe, so they are compared by
+    identity and the next generations of a node are calculated only once.
+
+    This is an internal class, nodes are created by HashLife.
+    """
+
+    __slots__ = ("level", "nw", "ne", "sw", "se", "population", "results")
+
+    def __init__(self, level: int, nw: Node = None, ne: Node = None, sw: Node = None, se: Node = None, population=0):
+        self.level: int = level
+        self.nw: Node = nw
+        self.ne: Node = ne
+        self.sw: Node = sw
+        self.se: Node = se
+        self.population: int = (
+            population if level == 0 else nw.population + ne.population + sw.population + se.population
+        )
+        self.results: dict[int, Node] = {}
+
+
+class HashLife:
+    """Unbounded universe of a Life-like automaton, calculated with the HashLife algorithm.
+
+    The universe is a quadtree of unique nodes, and the center of each node advanced by 2^j generations is memoized.
+    Repeated patterns, in space and in time, are thus calculated only once, which allows to jump very far in time.
+
+    The root of the tree is always centered on the cell (0, 0): it covers the cells from -2^(k-1) to 2^(k-1) - 1 on
+    both axis, k being its level. The tree grows as needed when the pattern grows. Coordinates are (x, y), as in the
+    grid of an Automaton: x is the line and y the column.
+
+    The nodes no longer used are collected when there are more than `max_nodes` nodes, between two steps: only the
+    nodes of the current universe are kept, and their memoized generations are forgotten.
+
+    Attributes:
+        root the root node of the universe
+        generation the number of generations calculated since the creation of the universe
+        max_nodes the number of nodes above which the nodes no longer used are collected
+    """
+
+    MAX_NODES = 1 << 18
+    """Default number of nodes above which the nodes no longer used are collected"""
+
+    def __init__(self, rule: LifeLikeRule, max_nodes: int = MAX_NODES):
+        """Constructor
+
+        :param LifeLikeRule rule: the rule of the universe
+        :param int max_nodes: the number of nodes above which the nodes no longer used are collected
+        :raise ValueError: if the rule makes cells born without neighbors (B0), which can't be run on an infinite grid
+        """
+        self.max_nodes: int = max_nodes
+        self.__collect_threshold: int = max_nodes
+        self.__nodes: dict[tuple[Node, Node, Node, Node], Node] = {}
+        self.__empty: list[Node] = [Node(0)]
+        self.__alive: Node = Node(0, population=1)
+        self.__bounding_boxes: dict[Node, tuple[int, int, int, int]] = {}
+        self.rule = rule
+        self.root: Node = self.empty(LEAF_LEVEL)
+        self.generation: int = 0
+
+    # Properties
+
+    @property
+    def rule(self) -> LifeLikeRule:
+        """Return the rule of the universe."""
+        return self.__rule
+
+    @rule.setter
+    def rule(self, rule: LifeLikeRule) -> None:
+        if 0 in rule.births:
+            raise ValueError(f"Rule {rule} can't be run on an unbounded grid")
+        self.__rule = rule
+        for node in self.__nodes.values():
+            node.results.clear()
+
+    @property
+    def population(self) -> int:
+        """Return the number of living cells."""
+        return self.root.population
+
+    @property
+    def nb_nodes(self) -> int:
+        """Return the number of nodes stored in the universe."""
+        return len(self.__nodes)
+
+    # Nodes
+
+    def node(self, nw: Node, ne: Node, sw: Node, se: Node) -> Node:
+        """Return the unique node made of the 4 given nodes."""
+        key = (nw, ne, sw, se)
+        node = self.__nodes.get(key)
+        if node is None:
+            node = self.__nodes[key] = Node(nw.level + 1, nw, ne, sw, se)
+        return node
+
+    def empty(self, level: int) -> Node:
+        """Return the empty node of the given level."""
+        while len(self.__empty) <= level:
+            e = self.__empty[-1]
+            self.__empty.append(self.node(e, e, e, e))
+        return self.__empty[level]
+
+    # Cells
+
+    def get_cell(self, x: int, y: int) -> bool:
+        """Tell if the cell (x, y) is alive."""
+        node, half = self.root, 1 << (self.root.level - 1)
+        if not (-half <= x < half and -half <= y < half):
+            return False
+        nx, ny = -half, -half
+        while node.level > 0 and node.population:
+            half = 1 << (node.level - 1)
+            south, east = x >= nx + half, y >= ny + half
+            node = (node.se if east else node.sw) if south else (node.ne if east else node.nw)
+            nx, ny = nx + half * south, ny + half * east
+        return node.population == 1
+
+    def set_region(self, x: int, y: int, alive: np.ndarray) -> None:
+        """Replace the cells of a region of the universe.
+
+        :param int x: the coordinate x of the top left cell of the region
+        :param int y: the coordinate y of the top left cell of the region
+        :param np.ndarray alive: a boolean array telling for each cell of the region if it is alive
+        """
+        length, width = alive.shape
+        while not self.__contains(x, y) or not self.__contains(x + length - 1, y + width - 1):
+            self.root = self.__expand(self.root)
+        half = 1 << (self.root.level - 1)
+        self.root = self.__paste(self.root, -half, -half, x, y, alive)
+
+    def get_region(self, x: int, y: int, length: int, width: int) -> np.ndarray:
+        """Return a boolean array telling for each cell of the region if it is alive.
+
+        :param int x: the coordinate x of the top left cell of the region
+        :param int y: the coordinate y of the top left cell of the region
+        :param int length: the length of the region
+        :param int width: the width of the region
+        """
+        alive = np.zeros((length, width), dtype=bool)
+        half = 1 << (self.root.level - 1)
+        self.__fill(alive, self.root, -half - x, -half - y)
+        return alive
+
+    def bounding_box(self) -> tuple[int, int, int, int]:
+        """Return the smallest region containing all the living cells, as (x, y, length, width).
+
+        :raise ValueError: if the universe is empty
+        """
+        if not self.population:
+            raise ValueError("The universe is empty")
+        half = 1 << (self.root.level - 1)
+        x0, y0, x1, y1 = self.__bounding_box(self.root)
+        return x0 - half, y0 - half, x1 - x0, y1 - y0
+
+    # Run universe
+
+    def advance(self, nb_generations: int) -> None:
+        """Calculate the given number of generations.
+
+        The number of generations is split in powers of 2, each of them being calculated in a single step.
+        :raise ValueError: if the number of generations is negative
+        """
+        if nb_generations < 0:
+            raise ValueError("Can't go back in time")
+        self.generation += nb_generations
+        j = 0
+        while nb_generations:
+            if nb_generations & 1:
+                self.__step(j)
+                if len(self.__nodes) > self.__collect_threshold:
+                    self.__collect()
+            nb_generations >>= 1
+            j += 1
+
+    # Serialization
+
+    def to_macrocell(self) -> str:
+        """Return the universe in the macrocell format used by Golly."""
+        lines = ["[M2] (QMaton)", f"#R {self.rule}"]
+        if self.generation:
+            lines.append(f"#G {self.generation}")
+        indices: dict[Node, int] = {}
+        root = self.root
+        while root.level < LEAF_LEVEL:
+            root = self.__expand(root)
+        self.__write_macrocell(root, lines, indices)
+        if not indices:
+            lines.append("$")
+        return "\n".join(lines) + "\n"
+
+    @classmethod
+    def from_macrocell(cls, text: str, rule: LifeLikeRule = None) -> HashLife:
+        """Create a universe from a string in the macrocell format.
+
+        :param str text: the content of the macrocell file
+        :param LifeLikeRule rule: the rule to use if the file doesn't give one, B3/S23 by default
+        :raise ValueError: if the text is not in the macrocell format
+        """
+        generation = 0
+        nodes: list[Node] = []
+        universe = None
+        for line in text.splitlines():
+            line = line.strip()
+            if not line or line.startswith("["):
+                continue
+            if line.startswith("#"):
+                if line.startswith("#R"):
+                    rule = LifeLikeRule.parse(line[2:])
+                elif line.startswith("#G"):
+                    generation = int(line[2:])
+                continue
+            if universe is None:
+                universe = cls(rule or LifeLikeRule.parse("B3/S23"))
+            nodes.append(universe.__read_macrocell_line(line, nodes))
+        if universe is None:
+            raise ValueError("No node in macrocell")
+        universe.root = nodes[-1]
+        universe.generation = generation
+        return universe
+
+    # Private methods
+
+    def __contains(self, x: int, y: int) -> bool:
+        half = 1 << (self.root.level - 1)
+        return -half <= x < half and -half <= y < half
+
+    def __expand(self, node: Node) -> Node:
+        """Return a node of the upper level, with the given node at its center."""
+        e = self.empty(node.level - 1)
+        return self.node(
+            self.node(e, e, e, node.nw),
+            self.node(e, e, node.ne, e),
+            self.node(e, node.sw, e, e),
+            self.node(node.se, e, e, e),
+        )
+
+    def __center(self, node: Node) -> Node:
+        """Return the node of the lower level at the center of the given node."""
+        return self.node(node.nw.se, node.ne.sw, node.sw.ne, node.se.nw)
+
+    def __step(self, j: int) -> None:
+        """Advance the universe by 2^j generations."""
+        # the pattern must stay in the center of the root: it can't go further than 2^j cells in 2^j generations
+        root = self.root
+        while root.level < j + 3 or self.__inner_population(root) != root.population:
+            root = self.__expand(root)
+        root = self.__successor(root, j)
+        while root.level > LEAF_LEVEL and self.__center(root).population == root.population:
+            root = self.__center(root)
+        self.root = root
+
+    def __collect(self) -> None:
+        """Keep only the nodes of the current universe, and forget their memoized generations."""
+        kept: dict[tuple[Node, Node, Node, Node], Node] = {}
+        stack = [self.root] + self.__empty[1:]
+        while stack:
+            node = stack.pop()
+            key = (node.nw, node.ne, node.sw, node.se)
+            if node.level == 0 or key in kept:
+                continue
+            kept[key] = node
+            # the results may be nodes which are no longer unique
+            node.results.clear()
+            stack.extend(key)
+        self.__nodes = kept
+        self.__bounding_boxes.clear()
+        # don't collect at each step if the universe itself is big
+        self.__collect_threshold = max(self.max_nodes, 2 * len(kept))
+
+    @staticmethod
+    def __inner_population(node: Node) -> int:
+        """Return the number of living cells in the square at the center of the node, a quarter of its size."""
+        return node.nw.se.se.population + node.ne.sw.sw.population + node.sw.ne.ne.population + node.se.nw.nw.population
+
+    def __successor(self, node: Node, j: int) -> Node:
+        """Return the center of the node (lower level) advanced by 2^j generations, with j <= level - 2."""
+        if not node.population:
+            return node.nw
+        result = node.results.get(j)
+        if result is not None:
+            return result
+        if node.level == 2:
+            result = self.__successor_4x4(node)
+        else:
+            nw, ne, sw, se = node.nw, node.ne, node.sw, node.se
+            # the 9 overlapping nodes of the lower level
+            n00, n01, n02 = nw, self.node(nw.ne, ne.nw, nw.se, ne.sw), ne
+            n10, n11, n12 = (
+                self.node(nw.sw, nw.se, sw.nw, sw.ne),
+                self.node(nw.se, ne.sw, sw.ne, se.nw),
+                self.node(ne.sw, ne.se, se.nw, se.ne),
+            )
+            n20, n21, n22 = sw, self.node(sw.ne, se.nw, sw.se, se.sw), se
+            if j < node.level - 2:
+                # advance once by 2^j and keep the centers
+                c = [self.__successor(n, j) for n in (n00, n01, n02, n10, n11, n12, n20, n21, n22)]
+                result = self.node(
+                    self.node(c[0].se, c[1].sw, c[3].ne, c[4].nw),
+                    self.node(c[1].se, c[2].sw, c[4].ne, c[5].nw),
+                    self.node(c[3].se, c[4].sw, c[6].ne, c[7].nw),
+                    self.node(c[4].se, c[5].sw, c[7].ne, c[8].nw),
+                )
+            else:
+                # advance twice by 2^(j-1)
+                c = [self.__successor(n, j - 1) for n in (n00, n01, n02, n10, n11, n12, n20, n21, n22)]
+                result = self.node(
+                    self.__successor(self.node(c[0], c[1], c[3], c[4]), j - 1),
+                    self.__successor(self.node(c[1], c[2], c[4], c[5]), j - 1),
+                    self.__successor(self.node(c[3], c[4], c[6], c[7]), j - 1),
+                    self.__successor(self.node(c[4], c[5], c[7], c[8]), j - 1),
+                )
+        node.results[j] = result
+        return result
+
+    def __successor_4x4(self, node: Node) -> Node:
+        """Return the center 2x2 of a 4x4 node advanced by one generation."""
+        cells = [[False] * 4 for _ in range(4)]
+        for (dx, dy), quarter in zip(((0, 0), (0, 2), (2, 0), (2, 2)), (node.nw, node.ne, node.sw, node.se)):
+            for (ex, ey), cell in zip(
+                ((0, 0), (0, 1), (1, 0), (1, 1)), (quarter.nw, quarter.ne, quarter.sw, quarter.se)
+            ):
+                cells[dx + ex][dy + ey] = cell.population == 1
+        new_cells = []
+        for x, y in ((1, 1), (1, 2), (2, 1), (2, 2)):
+            count = sum(cells[i][k] for i in range(x - 1, x + 2) for k in range(y - 1, y + 2)) - cells[x][y]
+            alive = count in self.__rule.survivals if cells[x][y] else count in self.__rule.births
+            new_cells.append(self.__alive if alive else self.empty(0))
+        return self.node(*new_cells)
+
+    def __paste(self, node: Node, nx: int, ny: int, x: int, y: int, alive: np.ndarray) -> Node:
+        size = 1 << node.level
+        length, width = alive.shape
+        if nx >= x + length or nx + size <= x or ny >= y + width or ny + size <= y:
+            return node
+        if x <= nx and nx + size <= x + length and y <= ny and ny + size <= y + width:
+            return self.__from_array(alive[nx - x : nx - x + size, ny - y : ny - y + size])
+        half = size // 2
+        return self.node(
+            self.__paste(node.nw, nx, ny, x, y, alive),
+            self.__paste(node.ne, nx, ny + half, x, y, alive),
+            self.__paste(node.sw, nx + half, ny, x, y, alive),
+            self.__paste(node.se, nx + half, ny + half, x, y, alive),
+        )
+
+    def __from_array(self, alive: np.ndarray) -> Node:
+        level = alive.shape[0].bit_length() - 1
+        if not alive.any():
+            return self.empty(level)
+        if level == 0:
+            return self.__alive
+        half = alive.shape[0] // 2
+        return self.node(
+            self.__from_array(alive[:half, :half]),
+            self.__from_array(alive[:half, half:]),
+            self.__from_array(alive[half:, :half]),
+            self.__from_array(alive[half:, half:]),
+        )
+
+    def __fill(self, alive: np.ndarray, node: Node, nx: int, ny: int) -> None:
+        """Set the living cells of the node, which top left cell is at (nx, ny) in the array."""
+        size = 1 << node.level
+        if not node.population or nx >= alive.shape[0] or ny >= alive.shape[1] or nx + size <= 0 or ny + size <= 0:
+            return
+        if node.level == 0:
+            alive[nx, ny] = True
+            return
+        half = size // 2
+        self.__fill(alive, node.nw, nx, ny)
+        self.__fill(alive, node.ne, nx, ny + half)
+        self.__fill(alive, node.sw, nx + half, ny)
+        self.__fill(alive, node.se, nx + half, ny + half)
+
+    def __bounding_box(self, node: Node) -> tuple[int, int, int, int]:
+        """Return the bounding box (x0, y0, x1, y1) of a non empty node, relative to its top left cell."""
+        if node.level == 0:
+            return 0, 0, 1, 1
+        box = self.__bounding_boxes.get(node)
+        if box is None:
+            half = 1 << (node.level - 1)
+            boxes = [
+                (bx0 + dx, by0 + dy, bx1 + dx, by1 + dy)
+                for child, dx, dy in ((node.nw, 0, 0), (node.ne, 0, half), (node.sw, half, 0), (node.se, half, half))
+                if child.population
+                for bx0, by0, bx1, by1 in (self.__bounding_box(child),)
+            ]
+            box = self.__bounding_boxes[node] = (
+                min(b[0] for b in boxes),
+                min(b[1] for b in boxes),
+                max(b[2] for b in boxes),
+                max(b[3] for b in boxes),
+            )
+        return box
+
+    def __write_macrocell(self, node: Node, lines: list[str], indices: dict[Node, int]) -> int:
+        """Write the node and its children, return the index of the node (0 for an empty node)."""
+        if not node.population:
+            return 0
+        if node not in indices:
+            if node.level == LEAF_LEVEL:
+                rows = ["".join("*" if cell else "." for cell in row).rstrip(".") for row in self.__get_block(node)]
+                lines.append("$".join(rows).rstrip("$") + "$")
+            else:
+                children = [self.__write_macrocell(c, lines, indices) for c in (node.nw, node.ne, node.sw, node.se)]
+                lines.append(" ".join(map(str, [node.level] + children)))
+            indices[node] = len(indices) + 1
+        return indices[node]
+
+    def __read_macrocell_line(self, line: str, nodes: list[Node]) -> Node:
+        if line[0] in ".*$":
+            alive = np.zeros((8, 8), dtype=bool)
+            for x, row in enumerate(line.split("$")[:8]):
+                alive[x, : len(row)] = [c == "*" for c in row[:8]]
+            return self.__from_array(alive)
+        try:
+            level, *children = map(int, line.split())
+            if len(children) != 4 or level <= LEAF_LEVEL:
+                raise ValueError
+            return self.node(*(nodes[i - 1] if i else self.empty(level - 1) for i in children))
+        except (ValueError, IndexError):
+            raise ValueError(f"Invalid macrocell line: {line!r}") from None
+
+    def __get_block(self, node: Node) -> np.ndarray:
+        alive = np.zeros((1 << node.level,) * 2, dtype=bool)
+        self.__fill(alive, node, 0, 0)
+        return alive
+
+
+class HashLifeAutomaton(LifeLikeAutomaton):
+    """Life-like automaton running on an unbounded grid with the HashLife algorithm.
+
+    The grid of the automaton is a window on the universe, which top left cell is `origin`. The cells outside of the
+    window keep living, so the EdgeRule of the neighborhood is not used. The grid can be edited as for any
+    automaton, the changes are written in the universe at the next iteration.
+
+    Each call to `apply_rule()` calculates `step` generations, and `advance_to()` jumps directly to any generation.
+
+    Attributes:
+        step the number of generations calculated by an iteration
+        universe the HashLife universe
+    """
+
+    GRID_ONLY_RULE = False
+    """The next step depends on the universe around the grid, not only on the grid."""
+
+    def __init__(self, length: int = 10, width: int = 10, rulestring: str = "B3/S23"):
+        """Create an Automaton, already set up with rules and states.
+
+        :param int length: the length of the grid of the automaton
+        :param int width: the width of the grid of the automaton
+        :param str rulestring: the rule of the automaton, e.g. B3/S23 for the game of life
+        """
+        # set before calling the parent constructor, which clears the grid
+        self.__universe: HashLife = None
+        self.__view: np.ndarray = None
+        self.__origin: tuple[int, int] = (0, 0)
+        super().__init__(length, width, rulestring)
+        self.step: int = 1
+
+    # Properties
+
+    @property
+    def universe(self) -> HashLife:
+        """Return the HashLife universe, with the rule of the automaton."""
+        if self.__universe is None:
+            self.__universe = HashLife(self.life_rule)
+        elif self.__universe.rule != self.life_rule:
+            self.__universe.rule = self.life_rule
+        return self.__universe
+
+    @property
+    def generation(self) -> int:
+        """Return the current generation."""
+        return self.universe.generation
+
+    @property
+    def origin(self) -> tuple[int, int]:
+        """Return the coordinates in the universe of the top left cell of the grid."""
+        return self.__origin
+
+    @origin.setter
+    def origin(self, origin: tuple[int, int]) -> None:
+        self.__write_view()
+        self.__origin = tuple(origin)
+        self.__read_view()
+
+    # Grid management
+
+    def clear_grid(self) -> None:
+        """Reset the universe with dead cells only."""
+        super().clear_grid()
+        self.__universe = None
+        self.__view = None
+
+    # Run automaton
+
+    def apply_rule(self) -> None:
+        """Calculate `step` generations of the cellular automaton."""
+        self.__advance(self.step)
+
+    def advance_to(self, generation: int) -> None:
+        """Calculate the state of the automaton at the given generation.
+
+        :raise ValueError: if the generation is already passed
+        """
+        self.__advance(generation - self.generation)
+
+    # Serialization
+
+    def to_macrocell(self) -> str:
+        """Return the universe in the macrocell format used by Golly."""
+        self.__write_view()
+        return self.universe.to_macrocell()
+
+    def read_macrocell(self, text: str) -> None:
+        """Replace the universe with the one in the macrocell string.
+
+        The rule of the automaton is the one of the file, if given. The grid is moved on the top left of the pattern.
+        """
+        self.__universe = HashLife.from_macrocell(text, self.life_rule)
+        self.life_rule = self.__universe.rule
+        self.__view = None
+        self.__origin = self.__universe.bounding_box()[:2] if self.__universe.population else (0, 0)
+        self.__read_view()
+
+    # Private methods
+
+    def __advance(self, nb_generations: int) -> None:
+        self.__write_view()
+        self.universe.advance(nb_generations)
+        self.__read_view()
+
+    def __write_view(self) -> None:
+        """Write the grid in the universe if it changed."""
+        bits = self.bits
+        if self.__view is None or not np.array_equal(bits, self.__view):
+            self.universe.set_region(*self.__origin, self.unpack(bits) == self.state_index(LifeLikeAutomaton.LIFE))
+            self.__view = bits.copy()
+
+    def __read_view(self) -> None:
+        """Read the grid from the universe."""
+        alive = self.universe.get_region(*self.__origin, *self.grid_size)
+        life, death = self.state_index(LifeLikeAutomaton.LIFE), self.state_index(LifeLikeAutomaton.DEATH)
+        self.bits = self.pack(np.where(alive, life, death))
+        self.__view = self.bits.copy()
@@ -0,0 +1,360 @@
+# -*- coding: utf-8 -*-
+
+#    QMaton is a Python/Qt software used to run cellular automatons.
+#    Copyright (C) 2021  Rémi Ducceschi (remileduc) <remi.ducceschi@gmail.com>
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""LifeLikeAutomaton class, a binary automaton configured by a rulestring and stored as a grid of bits."""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import TextIO
+
+import numpy as np
+
+from .array_automaton import ArrayAutomaton
+from .automaton import State
+from .frame_view import FrameView
+from .neighborhood import EdgeRule, MooreNeighborhood, Neighborhood
+from .pattern_serializer import PatternFormat, PatternSerializer
+from .rule_table import RuleTable, Transition
+
+WORD_SIZE = 64
+"""Number of cells stored in a word of the grid of bits"""
+
+
+@dataclass(frozen=True)
+class LifeLikeRule:
+    """Rule of a Life-like automaton.
+
+    A dead cell is born if its number of living neighbors is in `births`, a living cell survives if its number
+    of living neighbors is in `survivals`. The neighborhood is the Moore neighborhood of radius 1.
+    """
+
+    births: frozenset[int]
+    survivals: frozenset[int]
+
+    def __post_init__(self):
+        for counts in (self.births, self.survivals):
+            if any(not 0 <= n <= 8 for n in counts):
+                raise ValueError(f"Invalid number of neighbors in Life-like rule: {sorted(counts)}")
+
+    def __str__(self) -> str:
+        """Return the rulestring in the B/S notation, e.g. B3/S23."""
+        return "B" + "".join(map(str, sorted(self.births))) + "/S" + "".join(map(str, sorted(self.survivals)))
+
+    @classmethod
+    def parse(cls, rulestring: str) -> LifeLikeRule:
+        """Create a rule from a rulestring.
+
+        Both the B/S notation (B3/S23, b3s23) and the S/B notation (23/3) are accepted.
+        :raise ValueError: if the rulestring is not valid
+        """
+        rulestring = rulestring.strip()
+        match = re.fullmatch(r"[Bb]([0-8]*)/?[Ss]([0-8]*)", rulestring)
+        if match is not None:
+            births, survivals = match.groups()
+        else:
+            match = re.fullmatch(r"([0-8]*)/([0-8]*)", rulestring)
+            if match is None:
+                raise ValueError(f"Invalid Life-like rulestring: {rulestring!r}")
+            survivals, births = match.groups()
+        return cls(frozenset(map(int, births)), frozenset(map(int, survivals)))
+
+    def rule_table(self, life: State, death: State) -> RuleTable:
+        """Return the RuleTable equivalent to this rule, for the given states."""
+        return RuleTable(
+            ((life,),),
+            (Transition(death, life, (self.births,)), Transition(life, death, (frozenset(range(9)) - self.survivals,))),
+        )
+
+
+class LifeLikeAutomaton(ArrayAutomaton):
+    """Life-like automaton, a binary automaton which rule is given by a rulestring such as B3/S23.
+
+    The grid is held as bits packed into 64 bits words: `bits` is an array of shape (length, ceil(width / 64)) and
+    the cell (x, y) is the bit y % 64 of the word bits[x][y // 64]. An iteration counts the neighbors of 64 cells
+    at once with bitwise adders, so a grid only costs one bit per cell.
+
+    The attributes `grid` and `cells` are still available, they are decoded from `bits` when accessed. Only the
+    Moore neighborhood of radius 1 runs on the bits, any other neighborhood falls back to the rule table.
+
+    Attributes:
+        bits the grid of bits, a bit is set for each living cell
+        life_rule the rule of the automaton, it can be set with a rulestring
+    """
+
+    LIFE = State("Life ", "#000")
+    """Life state, black"""
+    DEATH = State("Death", "#FFF")
+    """Death state, white"""
+
+    def __init__(self, length: int = 10, width: int = 10, rulestring: str = "B3/S23"):
+        """Create an Automaton, already set up with rules and states.
+
+        :param int length: the length of the grid of the automaton
+        :param int width: the width of the grid of the automaton
+        :param str rulestring: the rule of the automaton, e.g. B3/S23 for the game of life
+        """
+        super().__init__(length, width, LifeLikeAutomaton.DEATH)
+        self.states: list[State] = [LifeLikeAutomaton.LIFE, LifeLikeAutomaton.DEATH]
+        self.rule: callable[[int, int], State] = self.main_rule
+        self.neighborhood: Neighborhood = MooreNeighborhood()
+        self.life_rule = rulestring
+
+    # Properties
+
+    @property
+    def life_rule(self) -> LifeLikeRule:
+        """Return the rule of the automaton."""
+        return self.__life_rule
+
+    @life_rule.setter
+    def life_rule(self, rule: LifeLikeRule | str) -> None:
+        self.__life_rule = LifeLikeRule.parse(rule) if isinstance(rule, str) else rule
+        self.rule_table = self.__life_rule.rule_table(LifeLikeAutomaton.LIFE, LifeLikeAutomaton.DEATH)
+        self.__transitions = self.__compile_transitions(self.__life_rule)
+
+    @property
+    def grid(self) -> list[list[State]]:
+        """Return the grid of State."""
+        self.__unpack()
+        return ArrayAutomaton.grid.fget(self)
+
+    @grid.setter
+    def grid(self, grid: list[list[State]]) -> None:
+        self.__bits = None
+        ArrayAutomaton.grid.fset(self, grid)
+
+    @property
+    def cells(self) -> np.ndarray:
+        """Return the array of state indices."""
+        self.__unpack()
+        return ArrayAutomaton.cells.fget(self)
+
+    @cells.setter
+    def cells(self, cells: np.ndarray) -> None:
+        self.__bits = None
+        ArrayAutomaton.cells.fset(self, cells)
+
+    @property
+    def bits(self) -> np.ndarray:
+        """Return the grid of bits."""
+        if self.__bits is None:
+            self.__bits = self.pack(self.cells)
+            ArrayAutomaton.cells.fset(self, None)
+        return self.__bits
+
+    @bits.setter
+    def bits(self, bits: np.ndarray) -> None:
+        self.__bits = bits
+        ArrayAutomaton.cells.fset(self, None)
+
+    @property
+    def nb_words(self) -> int:
+        """Return the number of words used to store a line of the grid."""
+        return -(-self.width // WORD_SIZE)
+
+    # Grid management
+
+    def clear_grid(self) -> None:
+        """Reset the grid with dead cells only."""
+        self.bits = np.zeros((self.length, self.nb_words), dtype=np.uint64)
+
+    def random_initialize(self) -> None:
+        """Initialize each cell of the grid with a random State from the list of states."""
+        bits = np.random.default_rng().integers(0, 2**64, size=(self.length, self.nb_words), dtype=np.uint64)
+        bits[:, -1] &= self.__last_word_mask()
+        self.bits = bits
+
+    def snapshot(self) -> FrameView:
+        """Return a read-only view of the grid, which is not changed by the next iterations.
+
+        The grid of bits is decoded into the view, it stays the storage of the automaton.
+        """
+        if self.__bits is None:
+            return super().snapshot()
+        return FrameView(self.unpack(self.__bits), self.states)
+
+    def pack(self, cells: np.ndarray) -> np.ndarray:
+        """Convert an array of state indices into a grid of bits."""
+        packed = np.zeros((self.length, self.nb_words * 8), dtype=np.uint8)
+        packed[:, : -(-self.width // 8)] = np.packbits(
+            cells == self.state_index(LifeLikeAutomaton.LIFE), axis=1, bitorder="little"
+        )
+        return packed.view("<u8").astype(np.uint64, copy=False)
+
+    def unpack(self, bits: np.ndarray) -> np.ndarray:
+        """Convert a grid of bits into an array of state indices."""
+        alive = np.unpackbits(
+            bits.astype("<u8", copy=False).view(np.uint8), axis=1, count=self.width, bitorder="little"
+        )
+        life, death = self.state_index(LifeLikeAutomaton.LIFE), self.state_index(LifeLikeAutomaton.DEATH)
+        return np.where(alive, life, death).astype(self.dtype)
+
+    # Run automaton
+
+    def main_rule(self, x: int, y: int) -> State:
+        return self.rule_table.next_state(self, x, y)
+
+    def apply_rule(self) -> None:
+        """Calculate an iteration of the cellular automaton.
+
+        With a Moore neighborhood of radius 1, the iteration is calculated on the grid of bits. Otherwise, the rule
+        table is used.
+        """
+        if self.array_rule is None and type(self.neighborhood) is MooreNeighborhood and self.neighborhood.radius == 1:
+            self.bits = self.step_bits(self.bits, self.neighborhood.edge_rule)
+        else:
+            super().apply_rule()
+
+    def step_bits(self, bits: np.ndarray, edge_rule: EdgeRule = EdgeRule.IGNORE_EDGE_CELLS) -> np.ndarray:
+        """Calculate an iteration on a grid of bits.
+
+        Each line is first summed with its left and right neighbors (2 bits numbers), then the sums of 3 lines are
+        added to get the number of living cells among the 9 cells around each cell (4 bits numbers, the cell
+        included). All the additions are done with bitwise operations, 64 cells at a time.
+        :param np.ndarray bits: the grid of bits
+        :param EdgeRule edge_rule: the rule used to handle the cells on the edge of the grid
+        :return: the new grid of bits
+        """
+        wrap = edge_rule == EdgeRule.FIRST_AND_LAST_CELL_OF_DIMENSION_ARE_NEIGHBORS
+        # sum of each cell with its left and right neighbors
+        left, right = self.__shift_columns(bits, wrap)
+        h0, h1 = self.__full_adder(left, bits, right)
+        # sum of the 3 lines
+        t0, c1 = self.__full_adder(self.__shift_lines(h0, 1, wrap), h0, self.__shift_lines(h0, -1, wrap))
+        s1, c2 = self.__full_adder(self.__shift_lines(h1, 1, wrap), h1, self.__shift_lines(h1, -1, wrap))
+        t1, c3 = s1 ^ c1, s1 & c1
+        t2, t3 = c2 ^ c3, c2 & c3
+        # the total includes the cell itself: a living cell with n neighbors has a total of n + 1
+        new_bits = np.zeros_like(bits)
+        for total, condition in self.__transitions:
+            mask = self.__equals(total, (t0, t1, t2, t3))
+            if condition is not None:
+                mask &= bits if condition else ~bits
+            new_bits |= mask
+        new_bits[:, -1] &= self.__last_word_mask()
+        if edge_rule == EdgeRule.IGNORE_EDGE_CELLS:
+            edge = self.__edge_bits()
+            new_bits = (new_bits & ~edge) | (bits & edge)
+        return new_bits
+
+    # Serialization
+
+    def read_pattern(self, file: TextIO, x: int = 0, y: int = 0, pattern_format: PatternFormat = None) -> None:
+        """Place the pattern read from a RLE, plaintext or Life 1.06 file in the grid, see `paste_pattern()`.
+
+        :param TextIO file: the text file to read
+        :param int x: the line of the grid where to place the top of the pattern
+        :param int y: the column of the grid where to place the left of the pattern
+        :param PatternFormat pattern_format: the format of the file, detected by default
+        :raise ValueError: if the file is not a valid pattern
+        """
+        pattern = PatternSerializer.load(file, pattern_format)
+        self.paste_pattern(pattern["alive"], x, y, pattern["rule"])
+
+    def paste_pattern(self, alive: np.ndarray, x: int = 0, y: int = 0, rule: str = None) -> None:
+        """Place a pattern in the grid, its top left cell at (x, y).
+
+        The dead cells of the pattern are written too, the cells of the pattern out of the grid are ignored.
+        :param np.ndarray alive: the array of booleans telling if each cell of the pattern is alive
+        :param str rule: the rulestring of the pattern, if given it becomes the rule of the automaton
+        :raise ValueError: if the rulestring is not valid
+        """
+        if rule:
+            self.life_rule = rule
+        life, death = self.state_index(LifeLikeAutomaton.LIFE), self.state_index(LifeLikeAutomaton.DEATH)
+        self.paste(np.where(alive, life, death).astype(self.dtype), x, y)
+
+    def write_pattern(self, file: TextIO, pattern_format: PatternFormat = PatternFormat.RLE) -> None:
+        """Write the grid in a RLE, plaintext or Life 1.06 file."""
+        alive = self.cells == self.state_index(LifeLikeAutomaton.LIFE)
+        PatternSerializer.dump(alive, file, pattern_format, str(self.life_rule))
+
+    # Private methods
+
+    def __unpack(self) -> None:
+        if self.__bits is not None:
+            ArrayAutomaton.cells.fset(self, self.unpack(self.__bits))
+            self.__bits = None
+
+    def __last_word_mask(self) -> np.uint64:
+        return np.uint64((1 << (self.width - (self.nb_words - 1) * WORD_SIZE)) - 1)
+
+    def __edge_bits(self) -> np.ndarray:
+        """Return the grid of bits of the cells on the edge of the grid."""
+        edge = np.zeros((self.length, self.nb_words), dtype=np.uint64)
+        edge[[0, -1]] = ~np.uint64(0)
+        edge[:, 0] |= np.uint64(1)
+        edge[:, -1] |= np.uint64(1 << (self.width - 1) % WORD_SIZE)
+        edge[:, -1] &= self.__last_word_mask()
+        return edge
+
+    def __shift_columns(self, bits: np.ndarray, wrap: bool) -> tuple[np.ndarray, np.ndarray]:
+        """Return the grids of bits of the left and the right neighbors of each cell."""
+        one, last = np.uint64(1), np.uint64(WORD_SIZE - 1)
+        left = bits << one
+        left[:, 1:] |= bits[:, :-1] >> last
+        right = bits >> one
+        right[:, :-1] |= bits[:, 1:] << last
+        if wrap:
+            last_bit = np.uint64((self.width - 1) % WORD_SIZE)
+            left[:, 0] |= (bits[:, -1] >> last_bit) & one
+            right[:, -1] |= (bits[:, 0] & one) << last_bit
+        left[:, -1] &= self.__last_word_mask()
+        return left, right
+
+    @staticmethod
+    def __shift_lines(bits: np.ndarray, step: int, wrap: bool) -> np.ndarray:
+        """Return the grid of bits of the line at -step of each line."""
+        if wrap:
+            return np.roll(bits, step, axis=0)
+        shifted = np.zeros_like(bits)
+        if step > 0:
+            shifted[step:] = bits[:-step]
+        else:
+            shifted[:step] = bits[-step:]
+        return shifted
+
+    @staticmethod
+    def __full_adder(a: np.ndarray, b: np.ndarray, c: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Add 3 grids of bits, return the sum and the carry."""
+        ab = a ^ b
+        return ab ^ c, (a & b) | (ab & c)
+
+    @staticmethod
+    def __equals(value: int, digits: tuple[np.ndarray, ...]) -> np.ndarray:
+        """Return the grid of bits telling where the number written with the given binary digits equals value."""
+        mask = None
+        for i, digit in enumerate(digits):
+            bit = digit if value >> i & 1 else ~digit
+            mask = bit if mask is None else mask & bit
+        return mask
+
+    @staticmethod
+    def __compile_transitions(rule: LifeLikeRule) -> list[tuple[int, bool]]:
+        """Return, for each total of the 9 cells leading to a living cell, if the cell must be alive or dead.
+
+        None means the cell is born or survives regardless of its state.
+        """
+        transitions = []
+        for total in range(10):
+            birth, survival = total in rule.births, total - 1 in rule.survivals
+            if birth or survival:
+                transitions.append((total, None if birth and survival else survival))
+        return transitions
@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+
+#    QMaton is a Python/Qt software used to run cellular automatons.
+#    Copyright (C) 2021  Rémi Ducceschi (remileduc) <remi.ducceschi@gmail.com>
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""MappedHistory class, holds the calculated steps of an automaton in a memory mapped file."""
+
+from __future__ import annotations
+
+import mmap
+import tempfile
+from copy import deepcopy
+from typing import Any, Optional
+
+import numpy as np
+
+from .automaton import Automaton
+from .automaton_history import Grid, Palette
+from .frame_view import FrameView
+
+
+class MappedHistory:
+    """History for Cellular Automatons stored on disk.
+
+    This class has the same interface as AutomatonHistory, for runs which history doesn't fit in memory. Grids are
+    encoded as arrays of indices in a palette of the values of their cells, of the smallest type able to hold them,
+    and appended to a file. An index keeps the offset of each step in the file, which is memory mapped to read the
+    steps: reading a step doesn't load the file, the memory used is managed by the page cache of the system.
+
+    Objects that are not grids are stored in memory as deep copies. The file holds no palette, it can't be opened
+    again once the history is closed.
+    """
+
+    def __init__(self, path: str = None, history_size: Optional[int] = None):
+        """Constructor
+
+        :param str path: the file where to store the steps, it is overwritten. By default, a temporary file is used
+        :param int history_size: the size of the history. Over this, it won't be possible to store more steps.
+            None for no limit
+        """
+        self.__path: Optional[str] = path
+        self.__file = open(path, "w+b", buffering=0) if path else tempfile.TemporaryFile(buffering=0)
+        self.__mmap: Optional[mmap.mmap] = None
+        self.__history_size: Optional[int] = history_size
+        self.__palette: Palette = Palette()
+        # index of the steps: offset in the file, shape and size of a cell in bytes (0 for objects)
+        self.__offsets: np.ndarray = np.zeros(1024, dtype=np.int64)
+        self.__shapes: np.ndarray = np.zeros((1024, 2), dtype=np.int64)
+        self.__itemsizes: np.ndarray = np.zeros(1024, dtype=np.uint8)
+        self.__objects: dict[int, Any] = {}
+        self.__size: int = 0
+        self.__end: int = 0
+        self.__current: int = -1
+
+    # List style
+
+    def __getitem__(self, idx: int) -> Grid:
+        """Return the grid at the given position in the history."""
+        idx = self.__check_index(idx)
+        if not self.__itemsizes[idx]:
+            return deepcopy(self.__objects[idx])
+        return self.__palette.decode(self.__read(idx))
+
+    def __setitem__(self, idx: int, grid: Grid):
+        """Creates a deep copy of the given grid and stores it at the given position.
+
+        The step is written over the previous one in the file if it fits, at the end of the file otherwise.
+        """
+        self.__store(self.__check_index(idx), self.__palette.encode(grid), grid)
+
+    def __len__(self) -> int:
+        return self.__size
+
+    def __bool__(self) -> bool:
+        return self.__size > 0
+
+    # Properties
+
+    @property
+    def path(self) -> Optional[str]:
+        """Return the path of the file holding the steps, None for a temporary file."""
+        return self.__path
+
+    @property
+    def history_size(self) -> Optional[int]:
+        """Return the maximum size the history can take."""
+        return self.__history_size
+
+    @property
+    def current_index(self) -> int:
+        """Return the current index in the history."""
+        return self.__current
+
+    @property
+    def remaining_steps(self) -> int:
+        """Return the number of steps remaining to arrive to latest.
+        Number of time you can safely call move_forward(1).
+        """
+        return self.__size - self.__current - 1
+
+    @property
+    def nbytes(self) -> int:
+        """Return the number of bytes used by the file (objects stored as deep copies excluded)."""
+        return self.__end
+
+    # List management
+
+    def get(self) -> Grid:
+        """Return last saved state.
+
+        Use operator [i] to access specific step.
+        """
+        return self[self.__current]
+
+    def append(self, grid: Grid) -> None:
+        """Creates a deep copy of the grid and append it to the history.
+
+        :param grid: the grid to add in the history
+        """
+        self.__append(self.__palette.encode(grid), grid)
+
+    def append_automaton_state(self, automaton: Automaton, iteration: bool = False) -> None:
+        """Creates a deep copy of the grid of the given automaton and append it to the history.
+
+        This method can safely be used as callback for an AutomatonRunner.
+        :param Automaton automaton: the automaton from which extract the grid and save its state
+        :param bool iteration: unused, for compatibility with AutomatonHistory
+        """
+        cells = self.__palette.encode_automaton(automaton)
+        self.__append(cells, None if cells is not None else automaton.grid)
+
+    def clear(self) -> None:
+        """Clear the history, the file is emptied."""
+        self.__truncate(0)
+        self.__objects.clear()
+        self.__palette.clear()
+        self.__size = 0
+        self.__current = -1
+
+    def clear_after(self, idx: int = -1) -> None:
+        """Clear the history after the given index.
+
+        The given index is kept: mappedHistory[idx] is still valid after the call.
+        :param int idx: the index from which remove the history, default is current_index
+        """
+        if idx < 0:
+            idx = self.__current
+        if idx >= self.__size - 1:
+            return
+        sizes = self.__shapes[: idx + 1].prod(axis=1) * self.__itemsizes[: idx + 1]
+        self.__truncate(int((self.__offsets[: idx + 1] + sizes).max()))
+        for i in range(idx + 1, self.__size):
+            self.__objects.pop(i, None)
+        self.__size = idx + 1
+        if self.__current > idx:
+            self.__current = idx
+
+    def close(self) -> None:
+        """Close the file, the history can't be used anymore. A temporary file is deleted."""
+        self.__unmap()
+        self.__file.close()
+
+    # Navigation
+
+    def view(self, idx: int) -> FrameView:
+        """Return a read-only view on the grid at the given position in the history.
+
+        The cells are copied out of the file, which can be written over, but they are not decoded. Steps which are not
+        grids are returned as deep copies.
+        """
+        idx = self.__check_index(idx)
+        if not self.__itemsizes[idx]:
+            return deepcopy(self.__objects[idx])
+        return FrameView(self.__read(idx).copy(), self.__palette.values)
+
+    def move_backward(self, step: int = 1, view: bool = False) -> Grid | FrameView:
+        """Move current_index of X steps back.
+
+        :param bool view: return a read-only view instead of a copy, see `view()`
+        :return: the saved state at the new current_index.
+        """
+        self.__current -= step
+        return self.view(self.__current) if view else self[self.__current]
+
+    def move_forward(self, step: int = 1, view: bool = False) -> Grid | FrameView:
+        """Move current_index of X steps forward.
+
+        :param bool view: return a read-only view instead of a copy, see `view()`
+        :return: the saved state at the new current_index.
+        """
+        self.__current += step
+        return self.view(self.__current) if view else self[self.__current]
+
+    def move_to(self, idx: int, view: bool = False) -> Grid | FrameView:
+        """Move current_index to idx.
+
+        :param bool view: return a read-only view instead of a copy, see `view()`
+        :return: the saved state at the new current_index.
+        """
+        self.__current = idx
+        return self.view(self.__current) if view else self[self.__current]
+
+    # Private methods
+
+    def __check_index(self, idx: int) -> int:
+        if idx < 0:
+            idx += self.__size
+        if not 0 <= idx < self.__size:
+            raise IndexError("History index out of range")
+        return idx
+
+    def __append(self, cells: Optional[np.ndarray], grid: Grid) -> None:
+        if self.remaining_steps > 0:
+            self.clear_after()
+        if self.__history_size is not None and self.__size >= self.__history_size:
+            raise IndexError(f"Maximum history size, can't store more steps: {self.__history_size}.")
+        if self.__size == len(self.__offsets):
+            # grow the index
+            self.__offsets = np.resize(self.__offsets, 2 * self.__size)
+            self.__shapes = np.resize(self.__shapes, (2 * self.__size, 2))
+            self.__itemsizes = np.resize(self.__itemsizes, 2 * self.__size)
+        self.__itemsizes[self.__size] = 0
+        self.__size += 1
+        self.__current += 1
+        self.__store(self.__size - 1, cells, grid)
+
+    def __store(self, idx: int, cells: Optional[np.ndarray], grid: Grid) -> None:
+        """Write the step at the given index, in the file if it is a grid."""
+        if cells is None or cells.ndim != 2 or not cells.size:
+            self.__itemsizes[idx] = 0
+            self.__objects[idx] = deepcopy(grid)
+            return
+        self.__objects.pop(idx, None)
+        old_nbytes = int(self.__shapes[idx].prod() * self.__itemsizes[idx])
+        if 0 < cells.nbytes <= old_nbytes:
+            offset = int(self.__offsets[idx])
+        else:
+            offset = self.__end
+            self.__end += cells.nbytes
+        self.__file.seek(offset)
+        self.__file.write(np.ascontiguousarray(cells).data)
+        self.__offsets[idx] = offset
+        self.__shapes[idx] = cells.shape
+        self.__itemsizes[idx] = cells.itemsize
+
+    def __read(self, idx: int) -> np.ndarray:
+        """Return the array of palette indices of the step, as a view on the mapped file."""
+        offset = int(self.__offsets[idx])
+        shape = tuple(self.__shapes[idx])
+        dtype = np.dtype(f"u{self.__itemsizes[idx]}")
+        count = shape[0] * shape[1]
+        if self.__mmap is None or offset + count * dtype.itemsize > len(self.__mmap):
+            # the file grew since it was mapped
+            self.__unmap()
+            self.__mmap = mmap.mmap(self.__file.fileno(), self.__end, access=mmap.ACCESS_READ)
+        return np.frombuffer(self.__mmap, dtype=dtype, count=count, offset=offset).reshape(shape)
+
+    def __truncate(self, end: int) -> None:
+        self.__unmap()
+        self.__file.truncate(end)
+        self.__end = end
+
+    def __unmap(self) -> None:
+        if self.__mmap is not None:
+            self.__mmap.close()
+            self.__mmap = None
@@ -27,10 +27,13 @@ Utils functions and class to deal with neighborhood of a cell.
 """
 
 import enum
+import functools
 import itertools
 import math
 import operator
-from typing import Iterator, Tuple
+from typing import Iterator, Sequence, Tuple
+
+import numpy as np
 
 Coordinate = Tuple[int, int]
 """The grid of an automaton."""
@@ -47,6 +50,205 @@ class EdgeRule(enum.Enum):
     """Cells on the edge act as if they were connected to the other side of the grid."""
 
 
+class NeighborTable:
+    """Neighbors of all the cells of a grid, as flat indices.
+
+    `indices[i, k]` is the flat index (as given by numpy.ravel) of the k-th neighbor of the cell of flat index i, and
+    `valid[i, k]` tells if this neighbor exists: it is False for the neighbors outside of the grid and for the cells
+    ignored because of the EdgeRule. Invalid neighbors point to the cell itself.
+
+    The cells of the interior of the grid have all their neighbors inside the grid, so they can be processed without
+    any bound check: only the cells of the `border` ring need the EdgeRule logic stored in the table. The rows of the
+    border cells are built with the table, the full table is built only when `indices` or `valid` is first used.
+
+    The table is `symmetric` if a cell is always a neighbor of its neighbors. Then, the cells whose neighborhood
+    contains a given cell are the neighbors of that cell.
+
+    Tables are built once per neighborhood and grid size, and shared: use `NeighborTable.get()`.
+    """
+
+    @staticmethod
+    @functools.lru_cache(maxsize=8)
+    def get(
+        rel_neighbors: Tuple[Tuple[Coordinate, ...], ...], edge_rule: EdgeRule, radius: int, grid_size: Coordinate
+    ) -> "NeighborTable":
+        """Return the table for the given neighborhood and grid size, building it only once.
+
+        :param tuple rel_neighbors: the relative coordinates of the neighbors, one tuple per column parity
+        :param EdgeRule edge_rule: the rule to handle the edge of the grid
+        :param int radius: the radius of the neighborhood, used to find the cells on the edge
+        :param tuple grid_size: the size of the grid
+        """
+        return NeighborTable(rel_neighbors, edge_rule, radius, grid_size)
+
+    def __init__(
+        self, rel_neighbors: Sequence[Sequence[Coordinate]], edge_rule: EdgeRule, radius: int, grid_size: Coordinate
+    ):
+        """Constructor, prefer `NeighborTable.get()` to share the tables."""
+        self.grid_size: Coordinate = tuple(grid_size)
+        margin = max((abs(ni) for rel_n in rel_neighbors for n in rel_n for ni in n), default=0)
+        self.margin: int = max(margin, radius) if edge_rule == EdgeRule.IGNORE_EDGE_CELLS else margin
+        self.interior: tuple[slice, ...] = tuple(slice(self.margin, di - self.margin) for di in self.grid_size)
+        self.__rel_neighbors = rel_neighbors
+        self.__edge_rule: EdgeRule = edge_rule
+        self.__radius: int = radius
+        self.__dtype: type = np.int32 if np.prod(self.grid_size) < np.iinfo(np.int32).max else np.intp
+        self.__indices: np.ndarray = None
+        self.__valid: np.ndarray = None
+        self.border: np.ndarray = np.flatnonzero(Neighborhood.edge_mask(self.grid_size, self.margin)).astype(
+            self.__dtype
+        )
+        self.border_indices, self.border_valid = self.__build(self.border)
+        self.symmetric: bool = self.__is_symmetric(rel_neighbors, edge_rule)
+
+    # Properties
+
+    @property
+    def indices(self) -> np.ndarray:
+        """Return the flat indices of the neighbors of all the cells, building the full table on first use."""
+        if self.__indices is None:
+            self.__indices, self.__valid = self.__build(np.arange(np.prod(self.grid_size), dtype=self.__dtype))
+        return self.__indices
+
+    @property
+    def valid(self) -> np.ndarray:
+        """Return, for the neighbors of all the cells, if they exist, building the full table on first use."""
+        if self.__valid is None:
+            self.indices
+        return self.__valid
+
+    @property
+    def has_interior(self) -> bool:
+        """Tell if there is at least one cell in the interior of the grid."""
+        return all(di > 2 * self.margin for di in self.grid_size)
+
+    # Private methods
+
+    def __is_symmetric(self, rel_neighbors, edge_rule: EdgeRule) -> bool:
+        step = len(rel_neighbors)
+        wrap = edge_rule == EdgeRule.FIRST_AND_LAST_CELL_OF_DIMENSION_ARE_NEIGHBORS
+        if step > 1 and wrap and self.grid_size[1] % step:
+            # the parity of the columns is broken by the wrap
+            return False
+        neighbor_sets = [set(map(tuple, rel_n)) for rel_n in rel_neighbors]
+        return all(
+            tuple(-ni for ni in n) in neighbor_sets[(parity + n[1]) % step if step > 1 else 0]
+            for parity, rel_n in enumerate(rel_neighbors)
+            for n in rel_n
+        )
+
+    def __build(self, cells: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Return the rows of the table (indices and valid) for the given flat indices of cells."""
+        rel_neighbors, edge_rule = self.__rel_neighbors, self.__edge_rule
+        nb_neighbors = max(len(rel_n) for rel_n in rel_neighbors)
+        coordinates = [ci.astype(self.__dtype) for ci in np.unravel_index(cells, self.grid_size)]
+        indices = np.empty((len(cells), nb_neighbors), dtype=self.__dtype)
+        valid = np.empty((len(cells), nb_neighbors), dtype=bool)
+        parity = coordinates[1] % len(rel_neighbors) if len(rel_neighbors) > 1 else 0
+        ignored = np.zeros(len(cells), dtype=bool)
+        if edge_rule == EdgeRule.IGNORE_EDGE_CELLS:
+            ignored = Neighborhood.edge_mask(self.grid_size, self.__radius, cells)
+        for k in range(nb_neighbors):
+            # relative coordinate of the k-th neighbor of each cell
+            offset = np.array(
+                [rel_n[k] if k < len(rel_n) else (0,) * len(self.grid_size) for rel_n in rel_neighbors],
+                dtype=self.__dtype,
+            )
+            exists = np.array([k < len(rel_n) for rel_n in rel_neighbors])[parity] & ~ignored
+            neighbor = [ci + offset[parity, i] for i, ci in enumerate(coordinates)]
+            if edge_rule == EdgeRule.FIRST_AND_LAST_CELL_OF_DIMENSION_ARE_NEIGHBORS:
+                neighbor = [ni % di for ni, di in zip(neighbor, self.grid_size)]
+            else:
+                for ni, di in zip(neighbor, self.grid_size):
+                    exists = exists & (ni >= 0) & (ni < di)
+            valid[:, k] = exists
+            indices[:, k] = np.where(exists, np.ravel_multi_index(neighbor, self.grid_size, mode="clip"), cells)
+        return indices, valid
+
+
+class NeighborhoodKernel:
+    """Compiled form of a Neighborhood, used to count the neighbors of all the cells of a grid in one pass.
+
+    The neighborhood is stored as an array of relative coordinates (offsets) and as a kernel: an array of size
+    (2 * margin + 1) in each dimension, with 1 where the relative coordinate is a neighbor.
+
+    Some neighborhoods (like the HexagonalNeighborhood) depend on the parity of the column of the cell. In that case,
+    there is one set of offsets per parity, and `offsets[coordinate[1] % len(offsets)]` is used for each cell.
+
+    The EdgeRule is mapped to the boundary of the grid:
+
+    - IGNORE_EDGE_CELLS: cells on the edge have no neighbors (no-op border)
+    - IGNORE_MISSING_NEIGHBORS_OF_EDGE_CELLS: cells outside of the grid are never counted (zero padding)
+    - FIRST_AND_LAST_CELL_OF_DIMENSION_ARE_NEIGHBORS: the grid is a torus (toroidal wrap)
+    """
+
+    def __init__(self, rel_neighbors: Sequence[Sequence[Coordinate]], edge_rule: EdgeRule, radius: int):
+        """Constructor
+
+        :param list rel_neighbors: the relative coordinates of the neighbors, one list per column parity
+        :param EdgeRule edge_rule: the rule to handle the edge of the grid
+        :param int radius: the radius of the neighborhood, used to find the cells on the edge
+        """
+        self.__rel_neighbors: tuple = tuple(tuple(tuple(n) for n in rel_n) for rel_n in rel_neighbors)
+        self.offsets: tuple[np.ndarray, ...] = tuple(np.array(rel_n, dtype=np.intp) for rel_n in rel_neighbors)
+        self.edge_rule: EdgeRule = edge_rule
+        self.radius: int = radius
+        self.margin: int = max(int(np.abs(o).max(initial=0)) for o in self.offsets)
+        self.kernels: tuple[np.ndarray, ...] = tuple(self.__build_kernel(o) for o in self.offsets)
+        self.dtype: np.dtype = np.min_scalar_type(max(len(o) for o in self.offsets))
+
+    @property
+    def kernel(self) -> np.ndarray:
+        """Return the kernel of the neighborhood (for even columns if it depends on the parity)."""
+        return self.kernels[0]
+
+    def table(self, grid_size: Coordinate) -> NeighborTable:
+        """Return the (shared) table of the neighbors of all the cells of a grid of the given size."""
+        return NeighborTable.get(self.__rel_neighbors, self.edge_rule, self.radius, tuple(grid_size))
+
+    def count(self, mask: np.ndarray, cells: np.ndarray = None) -> np.ndarray:
+        """Count, for each cell of the grid, the number of neighbors set in mask.
+
+        The interior of the grid is processed with the kernel, without any bound check. Only the cells of the border
+        ring are processed with the neighbor table, which holds the EdgeRule logic.
+        If `cells` is given, only these cells are counted, with the neighbor table.
+        :param np.ndarray mask: a boolean array of the size of the grid, True for the cells to count
+        :param np.ndarray cells: the flat indices of the cells to count, all the cells by default
+        :return: an array of the size of the grid with the number of neighbors set in mask, or of the size of cells
+        """
+        mask = np.asarray(mask, dtype=bool)
+        table = self.table(mask.shape)
+        if cells is not None:
+            return np.sum(mask.reshape(-1)[table.indices[cells]] & table.valid[cells], axis=1, dtype=self.dtype)
+        counts = np.zeros(mask.shape, dtype=self.dtype)
+        if table.has_interior:
+            step = len(self.offsets)
+            for parity, offsets in enumerate(self.offsets):
+                cells = self.__window(table, (0,) * mask.ndim, parity, step)
+                for rel_n in offsets:
+                    counts[cells] += mask[self.__window(table, rel_n, parity, step)]
+        counts.reshape(-1)[table.border] = np.sum(
+            mask.reshape(-1)[table.border_indices] & table.border_valid, axis=1, dtype=self.dtype
+        )
+        return counts
+
+    # Private methods
+
+    def __build_kernel(self, offsets: np.ndarray) -> np.ndarray:
+        kernel = np.zeros((2 * self.margin + 1,) * offsets.shape[1], dtype=np.uint8)
+        kernel[tuple((offsets + self.margin).T)] = 1
+        return kernel
+
+    @staticmethod
+    def __window(table: NeighborTable, rel_n: Sequence[int], parity: int, step: int) -> tuple:
+        # slices of the grid containing the neighbor rel_n of each cell of the interior with the given column parity
+        window = [slice(s.start + ni, s.stop + ni) for s, ni in zip(table.interior, rel_n)]
+        if step > 1:
+            start = table.interior[1].start + (parity - table.interior[1].start) % step
+            window[1] = slice(start + rel_n[1], table.interior[1].stop + rel_n[1], step)
+        return tuple(window)
+
+
 class Neighborhood:
     """
     Calculate the neighborhood of a cell.
@@ -64,6 +266,22 @@ class Neighborhood:
         """
         return any(not (radius - 1 < ci < di - radius) for ci, di in zip(coordinate, grid_size))
 
+    @staticmethod
+    def edge_mask(grid_size: Coordinate, radius: int, cells: np.ndarray = None) -> np.ndarray:
+        """Return a boolean array telling, for each cell of the grid, if it is on the edge of the grid.
+
+        This is the array version of `is_on_edge()`.
+        :param tuple grid_size: the size of the grid (length, width)
+        :param int radius: the margin for the grid
+        :param np.ndarray cells: the flat indices of the only cells to test, all the cells by default
+        """
+        if cells is not None:
+            coordinates = np.unravel_index(cells, grid_size)
+            return np.logical_or.reduce([(ci < radius) | (ci >= di - radius) for ci, di in zip(coordinates, grid_size)])
+        mask = np.ones(grid_size, dtype=bool)
+        mask[tuple(slice(radius, di - radius) for di in grid_size)] = False
+        return mask
+
     def __init__(self, edge_rule: EdgeRule = EdgeRule.IGNORE_EDGE_CELLS, radius: int = 1):
         """General class for all Neighborhoods.
         :param edge_rule:   Rule to define, how cells on the edge of the grid will be handled.
@@ -74,6 +292,36 @@ class Neighborhood:
         self._grid_size: Coordinate = ()
         self._radius: int = radius
         self.__edge_rule: EdgeRule = edge_rule
+        self.__kernels: dict[int, NeighborhoodKernel] = {}
+
+    @property
+    def edge_rule(self) -> EdgeRule:
+        """Return the rule used to handle the cells on the edge of the grid."""
+        return self.__edge_rule
+
+    @property
+    def radius(self) -> int:
+        return self._radius
+
+    def get_relative_neighbors(self, dimension: int = 2) -> Tuple[Coordinate, ...]:
+        """Get the coordinates of the neighbors relative to the cell of interest.
+
+        :param int dimension: the number of dimensions of the grid
+        :return: tuple of relative coordinates, e.g. (-1, 0) for the cell just above the cell of interest
+        """
+        return tuple(self.__neighborhood_generator(dimension))
+
+    def compile(self, dimension: int = 2) -> NeighborhoodKernel:
+        """Get the compiled form of the neighborhood, used to count neighbors on a whole grid at once.
+
+        The compiled form is calculated once per dimension.
+        :param int dimension: the number of dimensions of the grid
+        """
+        if dimension not in self.__kernels:
+            self.__kernels[dimension] = NeighborhoodKernel(
+                self._compile_relative_neighbors(dimension), self.__edge_rule, self._radius
+            )
+        return self.__kernels[dimension]
 
     def get_neighbors_coordinates(self, coordinate: Coordinate, grid_size: Coordinate) -> Iterator[Coordinate]:
         """Get a list of absolute coordinates for the cell neighbors.
@@ -96,9 +344,13 @@ class Neighborhood:
         """
         return True
 
-    def __neighborhood_generator(self) -> Iterator[Coordinate]:
-        for coordinate in itertools.product(range(-self._radius, self._radius + 1), repeat=len(self._grid_size)):
-            if coordinate != (0,) * len(self._grid_size) and self._neighbor_rule(coordinate):
+    def _compile_relative_neighbors(self, dimension: int) -> list[tuple[Coordinate, ...]]:
+        """Return the relative neighbors used to compile the neighborhood, one tuple per column parity."""
+        return [self.get_relative_neighbors(dimension)]
+
+    def __neighborhood_generator(self, dimension: int) -> Iterator[Coordinate]:
+        for coordinate in itertools.product(range(-self._radius, self._radius + 1), repeat=dimension):
+            if coordinate != (0,) * dimension and self._neighbor_rule(coordinate):
                 yield tuple(reversed(coordinate))
 
     def __neighbors_generator(self, coordinate: Coordinate) -> Iterator[Coordinate]:
@@ -118,7 +370,7 @@ class Neighborhood:
     def __lazy_initialize_relative_neighborhood(self, grid_size: Coordinate) -> None:
         self._grid_size = grid_size
         if self._rel_neighbors is None:
-            self._rel_neighbors = tuple(self.__neighborhood_generator())
+            self._rel_neighbors = tuple(self.__neighborhood_generator(len(grid_size)))
 
 
 class MooreNeighborhood(Neighborhood):
@@ -229,6 +481,17 @@ class HexagonalNeighborhood(Neighborhood):
         super().__init__(radius=radius, *args, **kwargs)
         self.__calculate_hexagonal_neighborhood(radius)
 
+    def get_relative_neighbors(self, dimension: int = 2, parity: int = 0) -> Tuple[Coordinate, ...]:
+        """Get the coordinates of the neighbors relative to the cell of interest.
+
+        :param int dimension: the number of dimensions of the grid, only 2 is supported
+        :param int parity: the parity of the column of the cell of interest (coordinate[1] % 2)
+        """
+        return tuple(self._neighbor_lists[parity])
+
+    def _compile_relative_neighbors(self, dimension: int) -> list[tuple[Coordinate, ...]]:
+        return [self.get_relative_neighbors(dimension, parity) for parity in range(2)]
+
     def get_neighbors_coordinates(self, coordinate: Coordinate, grid_size: Coordinate):
         self._rel_neighbors = self._neighbor_lists[coordinate[1] % 2]
         return super().get_neighbors_coordinates(coordinate, grid_size)
@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+
+#    QMaton is a Python/Qt software used to run cellular automatons.
+#    Copyright (C) 2021  Rémi Ducceschi (remileduc) <remi.ducceschi@gmail.com>
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Pattern serializer, export / import patterns of Life-like automatons from / to RLE, plaintext and Life 1.06."""
+
+from __future__ import annotations
+
+import itertools
+import os
+import re
+import warnings
+from enum import Enum
+from typing import Iterator, Optional, TextIO
+
+import numpy as np
+
+LINE_LENGTH = 70
+"""The maximum length of the lines of a RLE file."""
+
+CHUNK_SIZE = 1 << 16
+"""The number of characters of a RLE file decoded at once."""
+
+RLE_HEADER = re.compile(r"x\s*=\s*(\d+)\s*,\s*y\s*=\s*(\d+)(?:\s*,\s*rule\s*=\s*([^\s:]*))?", re.IGNORECASE)
+
+
+class PatternFormat(Enum):
+    """Format of a pattern file."""
+
+    RLE = ".rle"
+    """Run length encoded, the format used by Golly and most pattern collections"""
+    PLAINTEXT = ".cells"
+    """Plaintext, one line per row with . for dead cells and O for living cells"""
+    LIFE_106 = ".lif"
+    """Life 1.06, the coordinates of the living cells, one per line"""
+
+    @classmethod
+    def from_filename(cls, filename: str) -> Optional[PatternFormat]:
+        """Return the format of the file given by its extension, None if it is not a pattern file."""
+        extension = os.path.splitext(filename)[1].lower()
+        if extension == ".life":
+            return cls.LIFE_106
+        return next((f for f in cls if f.value == extension), None)
+
+
+class PatternSerializer:
+    """Class used to serialize a pattern of a Life-like automaton.
+
+    A pattern is an array of booleans, of shape (length, width), telling for each cell if it is alive. The files are
+    written and parsed line by line, so a large pattern never exists as a whole string. The rows of the pattern are
+    the lines of the files: in RLE and Life 1.06, the coordinate x of the files is the column of the pattern.
+
+    This is an internal class and shouldn't be used directly. Prefer the methods GameOfLife.read_pattern() and
+    LifeLikeAutomaton.read_pattern().
+    """
+
+    @staticmethod
+    def dump(alive: np.ndarray, file: TextIO, pattern_format: PatternFormat = PatternFormat.RLE, rule: str = None):
+        """Write the pattern in the file.
+
+        :param np.ndarray alive: the array of booleans telling if each cell is alive
+        :param TextIO file: the text file where to write
+        :param PatternFormat pattern_format: the format of the file
+        :param str rule: the rulestring written in the RLE header, if given
+        """
+        alive = np.asarray(alive, dtype=bool)
+        if pattern_format == PatternFormat.RLE:
+            PatternSerializer.__dump_rle(alive, file, rule)
+        elif pattern_format == PatternFormat.PLAINTEXT:
+            characters = np.frombuffer(b".O", dtype=np.uint8)
+            for row in alive:
+                file.write(characters[row.view(np.uint8)].tobytes().decode("ascii") + "\n")
+        else:
+            file.write("#Life 1.06\n")
+            for x, row in enumerate(alive):
+                file.write("".join(f"{y} {x}\n" for y in np.flatnonzero(row).tolist()))
+
+    @staticmethod
+    def load(file: TextIO, pattern_format: PatternFormat = None) -> dict:
+        """Read a pattern from the file.
+
+        :param TextIO file: the text file to read
+        :param PatternFormat pattern_format: the format of the file, detected from its first line by default
+        :return: a dictionary with "alive", the array of booleans telling if each cell is alive, and the "rule"
+            given by the file, None if it doesn't give one
+        :raise ValueError: if the file is not a valid pattern
+        """
+        lines = iter(file)
+        if pattern_format is None:
+            first_line = next((line for line in lines if line.strip()), "")
+            pattern_format = PatternSerializer.__detect_format(first_line)
+            lines = itertools.chain((first_line,), lines)
+        if pattern_format == PatternFormat.RLE:
+            return PatternSerializer.__load_rle(lines)
+        if pattern_format == PatternFormat.PLAINTEXT:
+            return PatternSerializer.__load_plaintext(lines)
+        return PatternSerializer.__load_life_106(lines)
+
+    # Private methods
+
+    @staticmethod
+    def __detect_format(line: str) -> PatternFormat:
+        line = line.strip()
+        if line.startswith("#Life 1.06"):
+            return PatternFormat.LIFE_106
+        if line.startswith("!") or not line.strip(".O*"):
+            return PatternFormat.PLAINTEXT
+        if line.startswith("#") or RLE_HEADER.match(line):
+            return PatternFormat.RLE
+        raise ValueError(f"Unknown pattern format: {line[:20]!r}")
+
+    @staticmethod
+    def __dump_rle(alive: np.ndarray, file: TextIO, rule: Optional[str]) -> None:
+        length, width = alive.shape
+        file.write(f"x = {width}, y = {length}" + (f", rule = {rule}" if rule else "") + "\n")
+        line = ""
+        pending_rows = 0  # end of rows not written yet, they are merged with the next living cell
+        for row in alive:
+            if row.any():
+                tokens = [f"{pending_rows}$" if pending_rows > 1 else "$"] if pending_rows else []
+                starts = np.concatenate(([0], np.flatnonzero(row[1:] != row[:-1]) + 1))
+                counts = np.diff(np.append(starts, width))
+                tokens += [(str(n) if n > 1 else "") + "bo"[a] for n, a in zip(counts.tolist(), row[starts].tolist())]
+                if not row[-1]:
+                    tokens.pop()  # the dead cells at the end of the row are implicit
+                for token in tokens:
+                    if len(line) + len(token) > LINE_LENGTH:
+                        file.write(line + "\n")
+                        line = ""
+                    line += token
+                pending_rows = 0
+            pending_rows += 1
+        file.write(line + "!\n")
+
+    @staticmethod
+    def __load_rle(lines: Iterator[str]) -> dict:
+        alive = None
+        rule = None
+        for line in lines:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                if line.startswith("#r"):
+                    rule = line[2:].strip()
+                continue
+            header = RLE_HEADER.match(line)
+            if header is None:
+                raise ValueError(f"Missing RLE header: {line[:20]!r}")
+            alive = np.zeros((int(header.group(2)), int(header.group(1))), dtype=bool)
+            rule = header.group(3) or rule
+            break
+        if alive is None:
+            raise ValueError("Missing RLE header")
+        # the lines are decoded by batches, the runs of a batch are decoded at once
+        x, y, ended = 0, 0, False
+        batch, size = [], 0
+        for line in lines:
+            batch.append(line)
+            size += len(line)
+            if size >= CHUNK_SIZE or "!" in line:
+                text = "".join(batch)
+                # a number at the end of the batch is the count of a run of the next batch
+                runs = text.rstrip("0123456789 \t\r\n")
+                x, y, ended = PatternSerializer.__read_runs(runs, alive, x, y)
+                batch, size = [text[len(runs) :]], 0
+                if ended:
+                    break
+        if not ended:
+            PatternSerializer.__read_runs("".join(batch), alive, x, y)
+        return {"alive": alive, "rule": rule}
+
+    @staticmethod
+    def __read_runs(text: str, alive: np.ndarray, x: int, y: int) -> tuple[int, int, bool]:
+        """Set the living cells of the runs of the text, starting at the cell (x, y).
+
+        :return: the cell following the last run, and if the end of the pattern was reached
+        """
+        try:
+            characters = np.frombuffer(text.encode("ascii"), dtype=np.uint8)
+        except UnicodeEncodeError:
+            raise ValueError("Invalid character in RLE pattern") from None
+        characters = characters[characters > ord(" ")]
+        digits = (characters >= ord("0")) & (characters <= ord("9"))
+        positions = np.flatnonzero(~digits)
+        tags = characters[positions]
+        end = np.flatnonzero(tags == ord("!"))
+        if end.size:
+            # the end of the runs is the tag before the !, its count is ignored
+            cut = positions[end[0] - 1] + 1 if end[0] else 0
+            characters, digits, positions, tags = characters[:cut], digits[:cut], positions[: end[0]], tags[: end[0]]
+        elif digits.size and digits[-1]:
+            raise ValueError("Missing tag at the end of RLE pattern")
+        if not tags.size:
+            return x, y, bool(end.size)
+        # count of each run: its digits are before its tag, each digit is weighted by its position in the number
+        run = (np.cumsum(~digits) - ~digits)[digits]
+        powers = 10 ** (positions[run] - np.flatnonzero(digits) - 1).astype(np.int64)
+        counts = np.bincount(run, (characters[digits] - ord("0")) * powers, minlength=tags.size).astype(np.int64)
+        counts[np.bincount(run, minlength=tags.size) == 0] = 1
+        newline = tags == ord("$")
+        # line of each run, and column where it ends: the columns restart from 0 after each $
+        line_counts = np.where(newline, counts, 0)
+        rows = x + np.cumsum(line_counts) - line_counts
+        cell_counts = np.where(newline, 0, counts)
+        ends = np.cumsum(cell_counts)
+        last_newline = np.maximum.accumulate(np.where(newline, np.arange(len(tags)), -1))
+        ends += np.where(last_newline >= 0, -ends[np.maximum(last_newline, 0)], y)
+        if (~newline & ((ends > alive.shape[1]) | (rows >= alive.shape[0]))).any():
+            raise ValueError(f"Cells out of the RLE pattern at line {rows[-1]}")
+        live = ~newline & (tags != ord("b")) & (tags != ord("."))
+        lengths = cell_counts[live]
+        starts = rows[live] * alive.shape[1] + ends[live] - lengths
+        # flat indices of all the living cells of the runs
+        indices = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        alive.reshape(-1)[indices] = True
+        return x + int(line_counts.sum()), int(ends[-1]), bool(end.size)
+
+    @staticmethod
+    def __load_plaintext(lines: Iterator[str]) -> dict:
+        rows = []
+        for line in lines:
+            line = line.rstrip()
+            if line.startswith("!"):
+                continue
+            characters = np.frombuffer(line.encode("utf-8"), dtype=np.uint8)
+            row = (characters == ord("O")) | (characters == ord("*"))
+            if not (row | (characters == ord("."))).all():
+                raise ValueError(f"Invalid character in plaintext pattern at line {len(rows)}")
+            rows.append(row)
+        alive = np.zeros((len(rows), max((len(row) for row in rows), default=0)), dtype=bool)
+        for x, row in enumerate(rows):
+            alive[x, : len(row)] = row
+        return {"alive": alive, "rule": None}
+
+    @staticmethod
+    def __load_life_106(lines: Iterator[str]) -> dict:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")  # empty pattern
+            coordinates = np.loadtxt(lines, dtype=np.int64, comments="#", ndmin=2)
+        if not coordinates.size:
+            return {"alive": np.zeros((0, 0), dtype=bool), "rule": None}
+        if coordinates.shape[1] != 2:
+            raise ValueError("Invalid coordinates in Life 1.06 pattern")
+        ys, xs = (coordinates - coordinates.min(axis=0)).T
+        alive = np.zeros((xs.max() + 1, ys.max() + 1), dtype=bool)
+        alive[xs, ys] = True
+        return {"alive": alive, "rule": None}
@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+
+#    QMaton is a Python/Qt software used to run cellular automatons.
+#    Copyright (C) 2021  Rémi Ducceschi (remileduc) <remi.ducceschi@gmail.com>
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""RingHistory class, holds the latest calculated steps of an automaton in a preallocated ring."""
+
+from __future__ import annotations
+
+from copy import deepcopy
+from typing import Any, Optional
+
+import numpy as np
+
+from .automaton import Automaton
+from .automaton_history import Grid, Palette
+from .frame_view import FrameView
+
+
+class RingHistory:
+    """Sliding window history for Cellular Automatons.
+
+    This class holds the `history_size` latest grids of an automaton, so it can be used for runs without end. It has
+    the same interface as AutomatonHistory. When the history is full, appending a step drops the oldest one: the
+    indices are always relative to the oldest step kept, and `first_step` tells how many steps were dropped.
+
+    Grids are encoded as arrays of indices in a palette of the values of their cells, and written in a ring of
+    `history_size` arrays allocated with the first grid. Objects that are not grids of the size of the ring are
+    stored as deep copies. If the size of the grids changes, the ring is allocated again for the new size.
+    """
+
+    def __init__(self, history_size: int = 1000):
+        """Constructor
+
+        :param int history_size: the number of steps kept in the history
+        """
+        if history_size < 1:
+            raise ValueError(f"The size of the history must be positive: {history_size}")
+        self.__history_size: int = history_size
+        self.__palette: Palette = Palette()
+        self.__ring: np.ndarray = None
+        # steps which are not stored in the ring, and their deep copies
+        self.__is_object: np.ndarray = np.zeros(history_size, dtype=bool)
+        self.__objects: list[Any] = [None] * history_size
+        # slot of the oldest step, number of steps, number of dropped steps
+        self.__start: int = 0
+        self.__size: int = 0
+        self.__first_step: int = 0
+        self.__current: int = -1
+
+    # List style
+
+    def __getitem__(self, idx: int) -> Grid:
+        """Return the grid at the given position in the history."""
+        slot = self.__slot(idx)
+        if self.__is_object[slot]:
+            return deepcopy(self.__objects[slot])
+        return self.__palette.decode(self.__ring[slot])
+
+    def __setitem__(self, idx: int, grid: Grid):
+        """Creates a deep copy of the given grid and stores it at the given position."""
+        self.__store(self.__slot(idx), self.__palette.encode(grid), grid)
+
+    def __len__(self) -> int:
+        return self.__size
+
+    def __bool__(self) -> bool:
+        return self.__size > 0
+
+    # Properties
+
+    @property
+    def history_size(self) -> int:
+        """Return the number of steps kept in the history."""
+        return self.__history_size
+
+    @property
+    def first_step(self) -> int:
+        """Return the number of steps dropped from the history, which is the step number of the index 0."""
+        return self.__first_step
+
+    @property
+    def current_index(self) -> int:
+        """Return the current index in the history."""
+        return self.__current
+
+    @property
+    def remaining_steps(self) -> int:
+        """Return the number of steps remaining to arrive to latest.
+        Number of time you can safely call move_forward(1).
+        """
+        return self.__size - self.__current - 1
+
+    @property
+    def nbytes(self) -> int:
+        """Return the number of bytes used by the ring (objects stored as deep copies excluded)."""
+        return 0 if self.__ring is None else self.__ring.nbytes
+
+    # List management
+
+    def get(self) -> Grid:
+        """Return last saved state.
+
+        Use operator [i] to access specific step.
+        """
+        return self[self.__current]
+
+    def append(self, grid: Grid) -> None:
+        """Creates a deep copy of the grid and append it to the history.
+
+        If the history is full, the oldest step is dropped.
+        :param grid: the grid to add in the history
+        """
+        self.__append(self.__palette.encode(grid), grid)
+
+    def append_automaton_state(self, automaton: Automaton, iteration: bool = False) -> None:
+        """Creates a deep copy of the grid of the given automaton and append it to the history.
+
+        This method can safely be used as callback for an AutomatonRunner.
+        :param Automaton automaton: the automaton from which extract the grid and save its state
+        :param bool iteration: unused, for compatibility with AutomatonHistory
+        """
+        cells = self.__palette.encode_automaton(automaton)
+        self.__append(cells, None if cells is not None else automaton.grid)
+
+    def clear(self) -> None:
+        """Clear the history.
+
+        The ring is kept to be reused.
+        """
+        self.__is_object[:] = False
+        self.__objects[:] = [None] * self.__history_size
+        self.__palette.clear()
+        self.__start = self.__size = self.__first_step = 0
+        self.__current = -1
+
+    def clear_after(self, idx: int = -1) -> None:
+        """Clear the history after the given index.
+
+        The given index is kept: ringHistory[idx] is still valid after the call.
+        :param int idx: the index from which remove the history, default is current_index
+        """
+        if idx < 0:
+            idx = self.__current
+        if idx >= self.__size - 1:
+            return
+        for i in range(idx + 1, self.__size):
+            slot = (self.__start + i) % self.__history_size
+            self.__is_object[slot] = False
+            self.__objects[slot] = None
+        self.__size = idx + 1
+        if self.__current > idx:
+            self.__current = idx
+
+    # Navigation
+
+    def view(self, idx: int) -> FrameView:
+        """Return a read-only view on the grid at the given position in the history.
+
+        The cells are copied out of the ring, which can be written over, but they are not decoded. Steps which are not
+        grids are returned as deep copies.
+        """
+        slot = self.__slot(idx)
+        if self.__is_object[slot]:
+            return deepcopy(self.__objects[slot])
+        return FrameView(self.__ring[slot].copy(), self.__palette.values)
+
+    def move_backward(self, step: int = 1, view: bool = False) -> Grid | FrameView:
+        """Move current_index of X steps back.
+
+        :param bool view: return a read-only view instead of a copy, see `view()`
+        :return: the saved state at the new current_index.
+        """
+        self.__current -= step
+        return self.view(self.__current) if view else self[self.__current]
+
+    def move_forward(self, step: int = 1, view: bool = False) -> Grid | FrameView:
+        """Move current_index of X steps forward.
+
+        :param bool view: return a read-only view instead of a copy, see `view()`
+        :return: the saved state at the new current_index.
+        """
+        self.__current += step
+        return self.view(self.__current) if view else self[self.__current]
+
+    def move_to(self, idx: int, view: bool = False) -> Grid | FrameView:
+        """Move current_index to idx.
+
+        :param bool view: return a read-only view instead of a copy, see `view()`
+        :return: the saved state at the new current_index.
+        """
+        self.__current = idx
+        return self.view(self.__current) if view else self[self.__current]
+
+    # Private methods
+
+    def __slot(self, idx: int) -> int:
+        """Return the slot in the ring of the given index."""
+        if idx < 0:
+            idx += self.__size
+        if not 0 <= idx < self.__size:
+            raise IndexError("History index out of range")
+        return (self.__start + idx) % self.__history_size
+
+    def __append(self, cells: Optional[np.ndarray], grid: Grid) -> None:
+        if self.remaining_steps > 0:
+            self.clear_after()
+        if self.__size == self.__history_size:
+            # drop the oldest step, its slot is reused
+            self.__start = (self.__start + 1) % self.__history_size
+            self.__first_step += 1
+        else:
+            self.__size += 1
+            self.__current += 1
+        self.__store((self.__start + self.__size - 1) % self.__history_size, cells, grid)
+
+    def __store(self, slot: int, cells: Optional[np.ndarray], grid: Grid) -> None:
+        """Store the step in the given slot, in the ring if possible."""
+        if cells is not None:
+            self.__prepare_ring(cells)
+        if cells is None or cells.shape != self.__ring.shape[1:]:
+            self.__is_object[slot] = True
+            self.__objects[slot] = deepcopy(grid)
+        else:
+            self.__is_object[slot] = False
+            self.__objects[slot] = None
+            self.__ring[slot] = cells
+
+    def __prepare_ring(self, cells: np.ndarray) -> None:
+        """Allocate the ring for the size of the cells, and widen its type for the palette if needed."""
+        if self.__ring is not None and self.__ring.shape[1:] != cells.shape:
+            # the steps of the previous size are kept as deep copies
+            for i in range(self.__size):
+                slot = (self.__start + i) % self.__history_size
+                if not self.__is_object[slot]:
+                    self.__is_object[slot] = True
+                    self.__objects[slot] = self.__palette.decode(self.__ring[slot])
+            self.__ring = None
+        if self.__ring is None:
+            self.__ring = np.zeros((self.__history_size,) + cells.shape, dtype=self.__palette.dtype)
+        elif self.__ring.dtype != self.__palette.dtype:
+            self.__ring = self.__ring.astype(self.__palette.dtype)
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+
+#    QMaton is a Python/Qt software used to run cellular automatons.
+#    Copyright (C) 2021  Rémi Ducceschi (remileduc) <remi.ducceschi@gmail.com>
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""RuleTable class, a rule declared as a table of transitions and compiled into a lookup array."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Callable, Iterable, Optional, Sequence, Union
+
+import numpy as np
+
+from .automaton import Automaton, State
+from .neighborhood import EdgeRule, Neighborhood
+
+Counts = Optional[Union[int, Iterable[int], Callable[[int], bool]]]
+"""Accepted numbers of neighbors: None for any number, a number, a collection of numbers or a predicate."""
+
+
+@dataclass(frozen=True)
+class Transition:
+    """Transition of a RuleTable.
+
+    A cell in the state `state` goes to the state `next_state` if the number of its neighbors in each class of
+    neighbor states of the RuleTable is accepted by `counts` (one element per class, None accepts any number).
+    """
+
+    state: State
+    next_state: State
+    counts: tuple[Counts, ...] = ()
+
+    def accepts(self, counts: Sequence[int]) -> bool:
+        """Tell if the given numbers of neighbors (one per class of neighbor states) are accepted."""
+        return all(self.accepts_count(i, count) for i, count in enumerate(counts))
+
+    def accepts_count(self, neighbor_class: int, count: int) -> bool:
+        """Tell if the given number of neighbors in the given class of neighbor states is accepted."""
+        expected = self.counts[neighbor_class] if neighbor_class < len(self.counts) else None
+        if expected is None:
+            return True
+        if callable(expected):
+            return bool(expected(count))
+        if isinstance(expected, int):
+            return count == expected
+        return count in expected
+
+
+class RuleTable:
+    """Rule of an automaton declared as a table.
+
+    The next state of a cell only depends on its current state and on the number of its neighbors in each class of
+    neighbor states. The transitions are tested in order and the first matching one is used. If there is none, the
+    cell keeps its state. With the EdgeRule IGNORE_EDGE_CELLS, the cells on the edge never change.
+
+    With an ArrayAutomaton, the table is compiled into a lookup array indexed by the state index and the numbers of
+    neighbors, so an iteration is evaluated for the whole grid at once.
+
+    Example, the game of life:
+        RuleTable(((LIFE,),), (Transition(DEATH, LIFE, (3,)), Transition(LIFE, DEATH, (lambda n: n not in (2, 3),))))
+    """
+
+    def __init__(self, neighbor_classes: Sequence[Sequence[State]], transitions: Sequence[Transition]):
+        """Constructor
+
+        :param list neighbor_classes: the classes of neighbor states to count, e.g. ((LIFE,),)
+        :param list transitions: the transitions of the rule, in priority order
+        """
+        self.neighbor_classes: tuple[tuple[State, ...], ...] = tuple(tuple(c) for c in neighbor_classes)
+        self.transitions: tuple[Transition, ...] = tuple(transitions)
+        self.__lookups: dict[tuple, np.ndarray] = {}
+
+    def next_state(self, automaton: Automaton, x: int, y: int, neighborhood: Neighborhood = None) -> State:
+        """Calculate the next state of a single cell.
+
+        This can be used as the `rule` of any Automaton.
+        :param Automaton automaton: the automaton containing the cell
+        :param int x: the coordinate x of the cell
+        :param int y: the coordinate y of the cell
+        :param Neighborhood neighborhood: the neighborhood to use, default is the one of the automaton
+        """
+        neighborhood = neighborhood or automaton.neighborhood
+        state = automaton.grid[x][y]
+        if neighborhood.edge_rule == EdgeRule.IGNORE_EDGE_CELLS and automaton.is_on_edge(x, y, neighborhood.radius):
+            return state
+        counts = None
+        for transition in self.transitions:
+            if transition.state != state:
+                continue
+            if counts is None:
+                counts = [automaton.count_neighbors(neighborhood, x, y, c) for c in self.neighbor_classes]
+            if transition.accepts(counts):
+                return transition.next_state
+        return state
+
+    def compile(self, states: Sequence[State], nb_neighbors: int) -> np.ndarray:
+        """Compile the table into a lookup array.
+
+        The lookup array is indexed by the index of the state of the cell, then by the number of its neighbors in
+        each class of neighbor states. It contains the index of the next state. The result is cached.
+        :param list states: the states of the automaton
+        :param int nb_neighbors: the maximum number of neighbors of a cell
+        """
+        key = (tuple(states), nb_neighbors)
+        if key not in self.__lookups:
+            self.__lookups[key] = self.__compile(states, nb_neighbors)
+        return self.__lookups[key]
+
+    def apply(
+        self,
+        automaton: Automaton,
+        cells: np.ndarray,
+        neighborhood: Neighborhood = None,
+        active: np.ndarray = None,
+        out: np.ndarray = None,
+    ) -> np.ndarray:
+        """Calculate the next state of all the cells at once.
+
+        :param ArrayAutomaton automaton: the automaton
+        :param np.ndarray cells: the array of state indices
+        :param Neighborhood neighborhood: the neighborhood to use, default is the one of the automaton
+        :param np.ndarray active: the flat indices of the only cells to calculate, the others keep their state
+        :param np.ndarray out: the array where to write the new state indices (it can't be cells), allocated if None
+        :return: the new array of state indices
+        """
+        neighborhood = neighborhood or automaton.neighborhood
+        kernel = neighborhood.compile(cells.ndim)
+        lookup = self.compile(automaton.states, max(len(o) for o in kernel.offsets))
+        counts = [automaton.count_neighbors_array(neighborhood, cells, c, active) for c in self.neighbor_classes]
+        if out is None:
+            out = np.empty_like(cells)
+        if active is not None:
+            np.copyto(out, cells)
+            states = cells.reshape(-1)[active]
+            new_states = lookup.reshape(-1)[self.__lookup_index(lookup, states, counts)]
+            if neighborhood.edge_rule == EdgeRule.IGNORE_EDGE_CELLS:
+                edge = Neighborhood.edge_mask(cells.shape, neighborhood.radius, active)
+                new_states[edge] = states[edge]
+            out.reshape(-1)[active] = new_states
+            return out
+        np.take(lookup.reshape(-1), self.__lookup_index(lookup, cells, counts), out=out)
+        if neighborhood.edge_rule == EdgeRule.IGNORE_EDGE_CELLS:
+            edge = Neighborhood.edge_mask(cells.shape, neighborhood.radius)
+            out[edge] = cells[edge]
+        return out
+
+    # Private methods
+
+    @staticmethod
+    def __lookup_index(lookup: np.ndarray, states: np.ndarray, counts: Sequence[np.ndarray]) -> np.ndarray:
+        """Return the flat indices in the lookup array, faster than indexing it with a tuple of arrays."""
+        index = states.astype(np.intp)
+        for dimension, count in zip(lookup.shape[1:], counts):
+            index *= dimension
+            index += count
+        return index
+
+    def __compile(self, states: Sequence[State], nb_neighbors: int) -> np.ndarray:
+        nb_classes = len(self.neighbor_classes)
+        dtype = np.min_scalar_type(max(len(states) - 1, 0))
+        lookup = np.empty((len(states),) + (nb_neighbors + 1,) * nb_classes, dtype=dtype)
+        for index, state in enumerate(states):
+            lookup[index] = index
+            done = np.zeros(lookup.shape[1:], dtype=bool)
+            for transition in self.transitions:
+                if transition.state != state:
+                    continue
+                accepted = np.ones(lookup.shape[1:], dtype=bool)
+                for i in range(nb_classes):
+                    axis = np.array([transition.accepts_count(i, n) for n in range(nb_neighbors + 1)])
+                    accepted &= axis.reshape((-1,) + (1,) * (nb_classes - i - 1))
+                lookup[index][accepted & ~done] = states.index(transition.next_state)
+                done |= accepted
+        return lookup
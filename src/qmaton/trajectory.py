@@ -0,0 +1,395 @@
+# -*- coding: utf-8 -*-
+
+#    QMaton is a Python/Qt software used to run cellular automatons.
+#    Copyright (C) 2021  Rémi Ducceschi (remileduc) <remi.ducceschi@gmail.com>
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Trajectory classes, record the steps of a run in an indexed file and replay them."""
+
+from __future__ import annotations
+
+import os
+import struct
+import zlib
+from array import array
+from typing import BinaryIO, Optional
+
+import numpy as np
+
+from .array_automaton import ArrayAutomaton
+from .automaton import Automaton, State
+from .automaton_history import Palette
+from .frame_view import FrameView
+
+MAGIC = b"QMTRAJ"
+"""The first and last bytes of a trajectory file."""
+
+VERSION = 1
+"""The version of the trajectory format."""
+
+
+class TrajectoryFormat:
+    """Layout of a trajectory file.
+
+    The file starts with a header, followed by records: a header (kind, size of a cell, size of the data) and the
+    data. The index written on close ends the file: the offset of each step, a flag telling if it is a key frame,
+    the palette and a footer.
+    This is an internal class of TrajectoryRecorder and TrajectoryReader.
+    """
+
+    HEADER = struct.Struct("<6sBxII")
+    """Magic bytes, version, length and width of the grid."""
+    RECORD = struct.Struct("<BBI")
+    """Kind of the record, size of a cell in bytes, size of the data of the record."""
+    FOOTER = struct.Struct("<QQI6s")
+    """Offset of the index, number of steps, number of states, magic bytes."""
+
+    KEY_FRAME = 0
+    """Record of all the cells of a step."""
+    DELTA_FRAME = 1
+    """Record of the cells changed since the previous step."""
+    NEW_STATE = 2
+    """Record of a state added to the palette."""
+
+    @staticmethod
+    def index_type(size: int) -> np.dtype:
+        """Return the type of the indices of the cells stored in a delta frame, for a grid of the given size."""
+        return np.dtype("<u4" if size <= 1 << 32 else "<u8")
+
+    @staticmethod
+    def pack_state(state: State) -> bytes:
+        """Return the bytes of a state: its name and its color, as UTF-8 strings preceded by their length."""
+        strings = [s.encode("utf-8") for s in (state.name, state.color)]
+        return b"".join(struct.pack("<H", len(s)) + s for s in strings)
+
+    @staticmethod
+    def unpack_state(data: bytes, offset: int) -> tuple[State, int]:
+        """Read a state at the given offset, return it with the offset of its end."""
+        strings = []
+        for _ in range(2):
+            (size,) = struct.unpack_from("<H", data, offset)
+            strings.append(data[offset + 2 : offset + 2 + size].decode("utf-8"))
+            offset += 2 + size
+        return State(*strings), offset
+
+
+class TrajectoryRecorder:
+    """Recorder of the steps of a run in a trajectory file.
+
+    The steps are appended to the file as zlib compressed frames of palette indices: a key frame holds all the
+    cells, a delta frame only the indices and the values of the cells changed since the previous step. A key frame
+    is written every `keyframe_interval` steps, or when it is smaller than the delta. The states are appended to the
+    file when they first appear.
+
+    On close, the offset of each step and the palette are written at the end of the file, so a TrajectoryReader
+    finds any step without reading the file. A file that was not closed can still be read, its index is rebuilt.
+
+    The method `record()` can be used as callback for an AutomatonRunner. Call it once before launching the runner
+    to record the initial state.
+    """
+
+    def __init__(self, path: str, keyframe_interval: int = 32, compression_level: int = 1):
+        """Constructor
+
+        :param str path: the file where to record the steps, it is overwritten
+        :param int keyframe_interval: the maximum number of delta frames between 2 key frames, reading a step
+            applies at most this number of delta frames
+        :param int compression_level: the zlib compression level, from 0 (none) to 9 (smallest file)
+        """
+        self.__path: str = path
+        self.__file: BinaryIO = open(path, "wb")
+        self.__keyframe_interval: int = max(keyframe_interval, 1)
+        self.__compression_level: int = compression_level
+        self.__palette: Palette = Palette()
+        self.__nb_states: int = 0
+        self.__offsets: array = array("Q")
+        self.__keyframes: array = array("B")
+        self.__previous: Optional[np.ndarray] = None
+        self.__since_keyframe: int = 0
+
+    def __len__(self) -> int:
+        return len(self.__offsets)
+
+    # Properties
+
+    @property
+    def path(self) -> str:
+        """Return the path of the trajectory file."""
+        return self.__path
+
+    @property
+    def keyframe_interval(self) -> int:
+        """Return the maximum number of delta frames between 2 key frames."""
+        return self.__keyframe_interval
+
+    @property
+    def nbytes(self) -> int:
+        """Return the number of bytes written in the file."""
+        return self.__file.tell() if not self.__file.closed else os.path.getsize(self.__path)
+
+    # Recording
+
+    def record(self, automaton: Automaton) -> None:
+        """Append the current step of the automaton to the trajectory.
+
+        :raise ValueError: if a cell is not a State, if the size of the grid changed or if the recorder is closed
+        """
+        if self.__file.closed:
+            raise ValueError("The trajectory recorder is closed.")
+        cells = self.__palette.encode_automaton(automaton)
+        states = self.__palette.values[self.__nb_states :]
+        if cells is None or not all(isinstance(state, State) for state in states):
+            raise ValueError("The cells of the automaton must be States.")
+        if self.__previous is None:
+            self.__file.write(TrajectoryFormat.HEADER.pack(MAGIC, VERSION, *automaton.grid_size))
+        elif cells.shape != self.__previous.shape:
+            raise ValueError("The size of the grid can't change during a recording.")
+        for state in states:
+            self.__write_record(TrajectoryFormat.NEW_STATE, 0, TrajectoryFormat.pack_state(state))
+        self.__nb_states = len(self.__palette)
+        self.__offsets.append(self.__file.tell())
+        flat = cells.reshape(-1)
+        itemsize = flat.dtype.itemsize
+        if self.__previous is not None and self.__since_keyframe < self.__keyframe_interval:
+            changed = np.flatnonzero(flat != self.__previous.reshape(-1))
+            index_type = TrajectoryFormat.index_type(flat.size)
+            if changed.size * (index_type.itemsize + itemsize) < flat.size * itemsize:
+                data = changed.astype(index_type).tobytes() + flat[changed].astype(f"<u{itemsize}").tobytes()
+                self.__write_record(TrajectoryFormat.DELTA_FRAME, itemsize, data)
+                self.__keyframes.append(0)
+                self.__since_keyframe += 1
+                self.__previous = cells
+                return
+        self.__write_record(TrajectoryFormat.KEY_FRAME, itemsize, flat.astype(f"<u{itemsize}").tobytes())
+        self.__keyframes.append(1)
+        self.__since_keyframe = 0
+        self.__previous = cells
+
+    def close(self) -> None:
+        """Write the index of the steps and close the file."""
+        if self.__file.closed:
+            return
+        if self.__previous is not None:
+            index = self.__file.tell()
+            self.__file.write(np.frombuffer(self.__offsets, dtype=np.uint64).astype("<u8").tobytes())
+            self.__file.write(self.__keyframes.tobytes())
+            self.__file.write(b"".join(TrajectoryFormat.pack_state(state) for state in self.__palette.values))
+            self.__file.write(TrajectoryFormat.FOOTER.pack(index, len(self.__offsets), len(self.__palette), MAGIC))
+        self.__file.close()
+
+    # Private methods
+
+    def __write_record(self, kind: int, itemsize: int, data: bytes) -> None:
+        if kind != TrajectoryFormat.NEW_STATE:
+            data = zlib.compress(data, self.__compression_level)
+        self.__file.write(TrajectoryFormat.RECORD.pack(kind, itemsize, len(data)))
+        self.__file.write(data)
+
+
+class TrajectoryReader:
+    """Reader of a trajectory file written by a TrajectoryRecorder.
+
+    A step is read from the last key frame before it, followed by the delta frames up to the step: at most
+    `keyframe_interval` of them whatever the length of the trajectory. The last step read is kept, so reading the
+    steps in order reads each frame once. The steps are returned as FrameView, which can be loaded in an automaton
+    with `Automaton.load_frame()`.
+    """
+
+    def __init__(self, path: str):
+        """Constructor
+
+        :param str path: the trajectory file
+        :raise ValueError: if the file is not a trajectory file
+        """
+        self.__path: str = path
+        self.__file: BinaryIO = open(path, "rb")
+        header = self.__file.read(TrajectoryFormat.HEADER.size)
+        if len(header) < TrajectoryFormat.HEADER.size or header[: len(MAGIC)] != MAGIC:
+            self.__file.close()
+            raise ValueError("Not a QMaton trajectory file.")
+        _, version, length, width = TrajectoryFormat.HEADER.unpack(header)
+        if version > VERSION:
+            self.__file.close()
+            raise ValueError(f"Unsupported version of the QMaton trajectory format: {version}")
+        self.__grid_size: tuple[int, int] = (length, width)
+        self.__offsets: np.ndarray = None
+        self.__keysteps: np.ndarray = None
+        self.__states: list[State] = []
+        if not self.__read_index():
+            self.__rebuild_index()
+        self.__step: int = -1
+        self.__cells: Optional[np.ndarray] = None
+
+    def __getitem__(self, step: int) -> FrameView:
+        """Return the given step, see `view()`."""
+        return self.view(step)
+
+    def __len__(self) -> int:
+        return len(self.__offsets)
+
+    # Properties
+
+    @property
+    def path(self) -> str:
+        """Return the path of the trajectory file."""
+        return self.__path
+
+    @property
+    def grid_size(self) -> tuple[int, int]:
+        """Return the size of the grid of the recorded automaton."""
+        return self.__grid_size
+
+    @property
+    def states(self) -> list[State]:
+        """Return the states of the cells of all the steps."""
+        return list(self.__states)
+
+    # Reading
+
+    def view(self, step: int) -> FrameView:
+        """Return a read-only view on the cells of the given step.
+
+        :raise IndexError: if the step is out of the trajectory
+        """
+        if step < 0:
+            step += len(self)
+        if not 0 <= step < len(self):
+            raise IndexError(f"Step {step} out of the trajectory of {len(self)} steps")
+        if step != self.__step:
+            keystep = self.__keysteps[np.searchsorted(self.__keysteps, step, side="right") - 1]
+            if keystep <= self.__step < step:
+                cells = self.__cells.copy()  # the previous view must not change
+                start = self.__step + 1
+            else:
+                cells = self.__read_frame(keystep)
+                start = keystep + 1
+            for delta_step in range(start, step + 1):
+                cells = self.__read_frame(delta_step, cells)
+            self.__step, self.__cells = step, cells
+        return FrameView(self.__cells.reshape(self.__grid_size), self.__states)
+
+    def close(self) -> None:
+        """Close the file."""
+        self.__file.close()
+
+    # Private methods
+
+    def __read_index(self) -> bool:
+        """Read the index written at the end of the file, return False if there is none."""
+        end = self.__file.seek(0, os.SEEK_END)
+        if end < TrajectoryFormat.HEADER.size + TrajectoryFormat.FOOTER.size:
+            return False
+        self.__file.seek(end - TrajectoryFormat.FOOTER.size)
+        index, nb_steps, nb_states, magic = TrajectoryFormat.FOOTER.unpack(
+            self.__file.read(TrajectoryFormat.FOOTER.size)
+        )
+        if magic != MAGIC or index + nb_steps * 9 > end - TrajectoryFormat.FOOTER.size:
+            return False
+        self.__file.seek(index)
+        self.__offsets = np.frombuffer(self.__file.read(nb_steps * 8), dtype="<u8").astype(np.int64)
+        keyframes = np.frombuffer(self.__file.read(nb_steps), dtype=np.uint8)
+        self.__keysteps = np.flatnonzero(keyframes)
+        data = self.__file.read(end - TrajectoryFormat.FOOTER.size - self.__file.tell())
+        offset = 0
+        for _ in range(nb_states):
+            state, offset = TrajectoryFormat.unpack_state(data, offset)
+            self.__states.append(state)
+        return True
+
+    def __rebuild_index(self) -> None:
+        """Read the headers of all the records, for a file that was not closed by its recorder."""
+        offsets, keyframes = [], []
+        file_size = os.fstat(self.__file.fileno()).st_size
+        offset = TrajectoryFormat.HEADER.size
+        while offset + TrajectoryFormat.RECORD.size <= file_size:
+            self.__file.seek(offset)
+            kind, _, size = TrajectoryFormat.RECORD.unpack(self.__file.read(TrajectoryFormat.RECORD.size))
+            end = offset + TrajectoryFormat.RECORD.size + size
+            if end > file_size:
+                break  # the last record is incomplete
+            if kind == TrajectoryFormat.NEW_STATE:
+                self.__states.append(TrajectoryFormat.unpack_state(self.__file.read(size), 0)[0])
+            else:
+                offsets.append(offset)
+                keyframes.append(kind == TrajectoryFormat.KEY_FRAME)
+            offset = end
+        self.__offsets = np.array(offsets, dtype=np.int64)
+        self.__keysteps = np.flatnonzero(keyframes)
+
+    def __read_frame(self, step: int, cells: np.ndarray = None) -> np.ndarray:
+        """Read the frame of the given step, a delta frame is applied on the cells of the previous step."""
+        self.__file.seek(self.__offsets[step])
+        kind, itemsize, size = TrajectoryFormat.RECORD.unpack(self.__file.read(TrajectoryFormat.RECORD.size))
+        try:
+            data = zlib.decompress(self.__file.read(size))
+        except zlib.error as e:
+            raise ValueError(f"Corrupted QMaton trajectory file at step {step}: {e}") from None
+        values_type = np.dtype(f"<u{itemsize}")
+        if kind == TrajectoryFormat.KEY_FRAME:
+            return np.frombuffer(data, dtype=values_type).astype(values_type.newbyteorder("="))
+        index_type = TrajectoryFormat.index_type(self.__grid_size[0] * self.__grid_size[1])
+        nb_changed = len(data) // (index_type.itemsize + itemsize)
+        changed = np.frombuffer(data, dtype=index_type, count=nb_changed)
+        values = np.frombuffer(data, dtype=values_type, offset=nb_changed * index_type.itemsize)
+        if cells.dtype.itemsize < itemsize:
+            cells = cells.astype(values_type.newbyteorder("="))
+        cells[changed] = values
+        return cells
+
+
+class TrajectoryAutomaton(ArrayAutomaton):
+    """Automaton replaying a trajectory: an iteration reads the next step of the trajectory instead of calculating it.
+
+    It can be run by an AutomatonRunner and shown by any visualizer, as any automaton. The last step of the
+    trajectory stays once it is reached.
+
+    Attributes:
+        reader the reader of the trajectory file
+    """
+
+    GRID_ONLY_RULE = False
+    """The next step is read from the trajectory file, which cannot be copied."""
+
+    def __init__(self, reader: TrajectoryReader):
+        """Constructor
+
+        :param TrajectoryReader reader: the reader of the trajectory to replay
+        """
+        super().__init__(*reader.grid_size)
+        self.states: list[State] = reader.states
+        self.reader: TrajectoryReader = reader
+        self.__step: int = 0
+        self.seek(0)
+
+    # Properties
+
+    @property
+    def step(self) -> int:
+        """Return the current step in the trajectory."""
+        return self.__step
+
+    # Run automaton
+
+    def seek(self, step: int) -> None:
+        """Set the grid to the given step of the trajectory."""
+        if len(self.reader):
+            self.load_frame(self.reader.view(step))
+            self.__step = step if step >= 0 else step + len(self.reader)
+
+    def apply_rule(self) -> None:
+        """Read the next step of the trajectory."""
+        if self.__step + 1 < len(self.reader):
+            self.seek(self.__step + 1)
@@ -25,9 +25,12 @@ from PyQt5.QtCore import Qt, pyqtSlot
 from PyQt5.QtGui import QIcon
 from PyQt5.QtWidgets import QFileDialog, QLabel, QMainWindow, QProgressBar
 from PyQt5.uic import loadUi
-from qmaton import Automaton, AutomatonHistory, AutomatonRunner
+from qmaton import Automaton, AutomatonHistory, AutomatonRunner, PatternFormat, PatternSerializer
 from qtui import resources, settings  # noqa: F401
 
+FILE_FILTERS = "QMaton Automaton (*.qmaton);;JSON Automaton (*.json);;Life Pattern (*.rle *.cells *.lif *.life)"
+"""The filters of the open / save file dialogs."""
+
 
 class MainWindow(QMainWindow):
     """Main window for QMaton UI.
@@ -39,7 +42,8 @@ class MainWindow(QMainWindow):
         super().__init__(parent)
         loadUi(path.join(path.dirname(__file__), "MainWindow.ui"), self)
         self.stateEditor.set_visualizer(self.wautomaton)
-        self._history = AutomatonHistory()
+        self.wautomaton.max_fps = settings.max_fps
+        self._history = AutomatonHistory(None, max_bytes=settings.history_max_bytes)
         self._automaton = None
         self._automaton_type = automaton_type
         self.__is_running = False
@@ -105,32 +109,61 @@ class MainWindow(QMainWindow):
 
     @pyqtSlot()
     def _open_file(self):
-        filename, _ = QFileDialog.getOpenFileName(
-            self, "Select open file", settings.save_path, "JSON Automaton (*.json)"
-        )
+        filename, _ = QFileDialog.getOpenFileName(self, "Select open file", settings.save_path, FILE_FILTERS)
         if not filename:
             return
-        with open(filename, "r") as file:
-            self.set_automaton(self._automaton_type.fromJSON(file.read()))
+        pattern_format = PatternFormat.from_filename(filename)
+        try:
+            if pattern_format is not None:
+                with open(filename, "r") as file:
+                    automaton = self.__paste_pattern(PatternSerializer.load(file, pattern_format))
+            elif filename.endswith(".json"):
+                with open(filename, "r") as file:
+                    automaton = self._automaton_type.readJSON(file)
+            else:
+                with open(filename, "rb") as file:
+                    automaton = self._automaton_type.fromBinary(file.read())
+        except ValueError as e:
+            self.statusbar.showMessage(f"Can't open file '{filename}': {e}", 5000)
+            return
+        self.set_automaton(automaton)
         settings.save_path = filename
         self.statusbar.showMessage(f"File open: '{filename}'", 2500)
 
     @pyqtSlot()
     def _save_file(self):
-        filename, _ = QFileDialog.getSaveFileName(
-            self, "Select save file", settings.save_path, "JSON Automaton (*.json)"
+        filename, selected_filter = QFileDialog.getSaveFileName(
+            self, "Select save file", settings.save_path, FILE_FILTERS
         )
         if not filename:
             return
-        with open(filename, "w") as file:
-            file.write(self._automaton.toJSON())
+        pattern_format = PatternFormat.from_filename(filename)
+        if (
+            pattern_format is None
+            and selected_filter.startswith("Life")
+            and not filename.endswith((".qmaton", ".json"))
+        ):
+            filename += PatternFormat.RLE.value
+            pattern_format = PatternFormat.RLE
+        if pattern_format is not None:
+            if not hasattr(self._automaton, "write_pattern"):
+                self.statusbar.showMessage(f"Can't save a {type(self._automaton).__name__} as a Life pattern", 5000)
+                return
+            with open(filename, "w") as file:
+                self._automaton.write_pattern(file, pattern_format)
+        elif filename.endswith(".json") or (selected_filter.startswith("JSON") and not filename.endswith(".qmaton")):
+            with open(filename, "w") as file:
+                self._automaton.writeJSON(file)
+        else:
+            with open(filename, "wb") as file:
+                file.write(self._automaton.toBinary())
         settings.save_path = filename
         self.statusbar.showMessage(f"Saved to file: '{filename}'", 2500)
 
     @pyqtSlot()
     def _reset_grid(self):
         self._automaton_started()
-        self._automaton.grid = self._history.move_to(0)
+        self._automaton.load_frame(self._history.move_to(0, view=True))
         self.__clear_history()
         self.__draw_automaton()
 
@@ -164,7 +197,7 @@ class MainWindow(QMainWindow):
     def _run_backward(self):
         if self._history.current_index > 0:
             self._automaton_started()
-            self._automaton.grid = self._history.move_backward()
+            self._automaton.load_frame(self._history.move_backward(view=True))
             self.__update_slider()
             self.__draw_automaton()
 
@@ -174,14 +207,14 @@ class MainWindow(QMainWindow):
         if not self._history.remaining_steps:
             self.wautomaton.run_seq(AutomatonRunner(1, history=self._history))
         else:
-            self._automaton.grid = self._history.move_forward()
+            self._automaton.load_frame(self._history.move_forward(view=True))
             self.__update_slider()
             self.__draw_automaton()
 
     @pyqtSlot(int)
     def _set_step(self, step):
         self._automaton_started()
-        self._automaton.grid = self._history.move_to(step)
+        self._automaton.load_frame(self._history.move_to(step, view=True))
         self.__update_slider()
         self.__draw_automaton()
 
@@ -202,6 +235,20 @@ class MainWindow(QMainWindow):
 
     # Private methods
 
+    def __paste_pattern(self, pattern):
+        """Place the pattern in the middle of the grid, the grid is enlarged if the pattern doesn't fit."""
+        if not hasattr(self._automaton_type, "paste_pattern"):
+            raise ValueError(f"{self._automaton_type.__name__} can't read Life patterns")
+        automaton = self._automaton
+        length, width = pattern["alive"].shape
+        if automaton is None or automaton.length < length or automaton.width < width:
+            grid_size = automaton.grid_size if automaton is not None else (0, 0)
+            automaton = self._automaton_type(max(grid_size[0], length), max(grid_size[1], width))
+        automaton.paste_pattern(
+            pattern["alive"], (automaton.length - length) // 2, (automaton.width - width) // 2, pattern["rule"]
+        )
+        return automaton
+
     def __draw_automaton(self):
         self._automaton_started()
         self.wautomaton.draw()
@@ -22,10 +22,7 @@
 Settings are saved in an .ini file
 """
 
-import json
-
 from PyQt5.QtCore import QByteArray, QSettings
-from qmaton import AutomatonSerializer
 
 organization = "remileduc"
 """The organization used to store the settings."""
@@ -36,6 +33,12 @@ application = "QMaton"
 save_path = ""
 """The last path used to open / save file."""
 
+history_max_bytes = 256 * 1024 * 1024
+"""The memory budget of the history, older steps are calculated again when needed."""
+
+max_fps = 30
+"""The maximum number of steps drawn per second while the automaton is running."""
+
 
 def save_settings(main_window):
     settings = __get_settings(main_window)
@@ -45,7 +48,10 @@ def save_settings(main_window):
     settings.setValue("save_path", save_path)
 
     settings.beginGroup("automaton")
-    settings.setValue("dump", json.dumps(main_window._automaton, cls=AutomatonSerializer))
+    if main_window._automaton is not None:
+        settings.setValue("dump", main_window._automaton.toJSON())
+    else:
+        settings.remove("dump")
     settings.endGroup()
 
     settings.beginGroup("window")
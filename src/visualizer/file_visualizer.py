@@ -19,28 +19,115 @@
 
 """Print the steps in the console, or save it in a file."""
 
-
+import gzip
 import os
+import sys
+from time import monotonic
+from typing import TextIO
 
-from qmaton import Automaton
+import numpy as np
+from qmaton import ArrayAutomaton, Automaton, State
 
 
 class FileVisualizer:
     """Print the steps in the console, or save it in a file.
 
+    The file is opened on the first step and stays open. The steps are rendered with a cached text per state and
+    kept in a buffer, written in the file once it holds `buffer_size` characters, or when a step is drawn more than
+    `flush_interval` seconds after the last write: there is no timer, a step stays in the buffer while no other step
+    is drawn. Call `flush()` or `close()` to write the remaining steps, e.g. give `flush` as the `finished` callback
+    of the AutomatonRunner, or use the visualizer as a context manager, which closes the file on exit.
+
     Attributes
         file the file where to write results. If not set, print on console.
+        compress if the file is compressed with gzip
+        buffer_size the number of characters buffered before writing them in the file
+        flush_interval the maximum number of seconds a step stays in the buffer
     """
 
-    def __init__(self, file: str = ""):
+    def __init__(self, file: str = "", compress: bool = None, buffer_size: int = 1 << 20, flush_interval: float = 1.0):
+        """Constructor
+
+        :param str file: the file where to write results, print on console if not set
+        :param bool compress: compress the file with gzip, by default if the name of the file ends with ".gz"
+        :param int buffer_size: the number of characters buffered before writing them in the file
+        :param float flush_interval: the maximum number of seconds a step stays in the buffer
+        """
         self.file: str = file
+        self.compress: bool = str(file).endswith(".gz") if compress is None else compress
+        self.buffer_size: int = buffer_size
+        self.flush_interval: float = flush_interval
+        self.__handle: TextIO = None
+        self.__pending: list[str] = []
+        self.__pending_size: int = 0
+        self.__last_flush: float = monotonic()
+        self.__tokens_key: tuple[State, ...] = None
+        self.__tokens: np.ndarray = None
         if file and os.path.exists(file):
             os.remove(file)
 
+    def __enter__(self) -> "FileVisualizer":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def __del__(self) -> None:
+        self.close()
+
     def draw(self, automaton: Automaton) -> None:
         """Callback for the AutomatonRunner."""
+        text = self.render(automaton) + "\n"
         if not self.file:
-            print(automaton)
+            sys.stdout.write(text)
             return
-        with open(self.file, "a") as f:
-            f.write(str(automaton) + "\n")
+        self.__pending.append(text)
+        self.__pending_size += len(text)
+        if self.__pending_size >= self.buffer_size or monotonic() - self.__last_flush >= self.flush_interval:
+            self.flush()
+
+    def render(self, automaton: Automaton) -> str:
+        """Return the text of a step, the same as `str(automaton)`."""
+        tokens = self.__get_tokens(automaton.states)
+        if isinstance(automaton, ArrayAutomaton) and automaton.states:
+            return "".join(["".join(line) + "\n" for line in tokens[automaton.cells].tolist()])
+        names = dict(zip(automaton.states, tokens.tolist()))
+        try:
+            return "".join(["".join([names[cell] for cell in line]) + "\n" for line in automaton.grid])
+        except KeyError:  # a cell contains a state that is not in states
+            return str(automaton)
+
+    def flush(self) -> None:
+        """Write the buffered steps in the file.
+
+        A compressed file is not flushed, to not reset the compression at each write: the end of the compressed
+        stream is written by `close()`.
+        """
+        self.__last_flush = monotonic()
+        if not self.__pending:
+            return
+        if self.__handle is None:
+            self.__handle = gzip.open(self.file, "at") if self.compress else open(self.file, "a")
+        self.__handle.write("".join(self.__pending))
+        if not self.compress:
+            self.__handle.flush()
+        self.__pending.clear()
+        self.__pending_size = 0
+
+    def close(self) -> None:
+        """Write the buffered steps and close the file. It is opened again by the next step."""
+        self.flush()
+        if self.__handle is not None:
+            self.__handle.close()
+            self.__handle = None
+
+    # Private methods
+
+    def __get_tokens(self, states: list[State]) -> np.ndarray:
+        """Return the text of each state, cached as long as the states don't change."""
+        key = tuple(states)
+        if key != self.__tokens_key:
+            self.__tokens = np.empty(len(key), dtype=object)
+            self.__tokens[:] = [state.name + " " for state in key]
+            self.__tokens_key = key
+        return self.__tokens
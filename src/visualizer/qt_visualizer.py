@@ -20,10 +20,11 @@
 """Show the automaton in a UI window."""
 
 
-from PyQt5.QtCore import QObject, QPoint, Qt, QThread, pyqtSignal, pyqtSlot
-from PyQt5.QtGui import QColor, QIcon, QPixmap
-from PyQt5.QtWidgets import QGridLayout, QLabel, QMenu, QWidget
-from qmaton import Automaton, AutomatonRunner, State
+import numpy as np
+from PyQt5.QtCore import QObject, QPoint, QPointF, QRect, QRectF, QSize, Qt, QThread, QTimer, pyqtSignal, pyqtSlot
+from PyQt5.QtGui import QColor, QIcon, QImage, QPainter, QPixmap, QRegion
+from PyQt5.QtWidgets import QMenu, QSizePolicy, QVBoxLayout, QWidget
+from qmaton import ArrayAutomaton, Automaton, AutomatonRunner, FrameView, State, TrajectoryAutomaton, TrajectoryReader
 
 
 class QtVisualizerWorker(QObject):
@@ -45,15 +46,390 @@ class QtVisualizerWorker(QObject):
         self.finished.emit()
 
 
+class QtGridCanvas(QWidget):
+    """Widget painting the grid of an automaton.
+
+    The widget shows a viewport on the grid, `view`, which is the whole grid by default. It is zoomed with the mouse
+    wheel and panned by dragging with the middle button. Only the cells in the viewport are rasterized into an image,
+    which is scaled to the size of the widget when painted. When a pixel of the widget covers several cells, each
+    pixel of the image shows the dominant state of a block of cells, estimated from at most SAMPLES x SAMPLES of its
+    cells, so the cost of a step depends on the size of the widget and not on the size of the grid. When zoomed, a
+    minimap shows the whole grid and the viewport.
+
+    With at most 256 colors, the image is indexed: its pixels are the indices of the states and its color table holds
+    their colors, so a step only copies the array of state indices.
+
+    When each cell has its own pixel, the visible cells are compared to the last drawn ones: only the changed pixels
+    are written, and only the tiles of TILE_SIZE cells containing them are repainted.
+    """
+
+    TILE_SIZE = 16
+    """Size, in cells, of the square tiles repainted when some of their cells changed."""
+    MAX_DIRTY_TILES = 64
+    """Above this number of changed tiles, the rectangle bounding all the changed cells is repainted."""
+    SAMPLES = 3
+    """Maximum number of cells read per line and per column of a block, to find its dominant state."""
+    MAX_DOMINANT_STATES = 16
+    """Above this number of states, a block shows the state of its top left cell."""
+    MINIMAP_SIZE = 128
+    """Size, in pixels, of the longest side of the minimap."""
+    ZOOM_FACTOR = 1.25
+    """Factor applied to the size of the viewport by a step of the mouse wheel."""
+
+    def __init__(self, parent: QWidget = None):
+        super().__init__(parent)
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.__image: QImage = QImage()
+        self.__image_format: QImage.Format = QImage.Format_Indexed8
+        self.__minimap: QImage = QImage()
+        self.__palette: dict[State, int] = {}
+        self.__colors: np.ndarray = None
+        self.__cells: np.ndarray = None
+        self.__cells_owned: bool = False
+        self.__view: QRectF = None
+        self.__area: tuple[int, int, int, int, int] = None
+        self.__drawn_cells: np.ndarray = None
+        self.__drag_pos: QPoint = None
+
+    # Properties
+
+    @property
+    def image(self) -> QImage:
+        """Return the image of the cells in the viewport, one pixel per cell or per block of cells."""
+        return self.__image
+
+    @property
+    def view(self) -> QRectF:
+        """Return the part of the grid shown, in cells: the columns horizontally and the lines vertically."""
+        if self.__view is not None:
+            return QRectF(self.__view)
+        if self.__cells is None:
+            return QRectF()
+        return QRectF(0, 0, self.__cells.shape[1], self.__cells.shape[0])
+
+    @property
+    def block_size(self) -> int:
+        """Return the number of cells per line and per column shown by a pixel of the image."""
+        view = self.view
+        if view.isEmpty() or self.width() <= 0 or self.height() <= 0:
+            return 1
+        return max(1, int(max(view.width() / self.width(), view.height() / self.height())))
+
+    # Grid management
+
+    def set_grid(self, automaton: Automaton | FrameView) -> QRegion:
+        """Update the image from the grid of the automaton, or from a snapshot, and repaint the changed cells.
+
+        :return: the region of the widget to repaint
+        """
+        palette, cells = self.__read_cells(automaton)
+        if self.__cells is None or palette != self.__palette or cells.shape != self.__cells.shape:
+            if self.__cells is None or cells.shape != self.__cells.shape:
+                self.__view = None
+            self.__palette = palette
+            self.__set_colors()
+            self.__area = None
+        self.__cells = cells
+        self.__cells_owned = False
+        return self.__repaint()
+
+    def set_cell(self, x: int, y: int, state: State) -> bool:
+        """Change the color of a single cell, and repaint it.
+
+        :return: False if the state is not in the palette of the image, the whole grid must be set again
+        """
+        if state not in self.__palette or self.__cells is None:
+            return False
+        if not self.__cells_owned:
+            # the cells of the automaton are not modified
+            self.__cells = self.__cells.copy()
+            self.__cells_owned = True
+        self.__cells[x, y] = self.__palette[state]
+        self.__repaint()
+        return True
+
+    # Viewport
+
+    def set_view(self, view: QRectF = None) -> None:
+        """Show the given part of the grid, in cells, the whole grid if None.
+
+        The viewport is kept inside the grid.
+        """
+        if self.__cells is None or view is None:
+            self.__view = None
+        else:
+            length, width = self.__cells.shape
+            view = QRectF(view.x(), view.y(), min(view.width(), width), min(view.height(), length))
+            if view.width() >= width and view.height() >= length:
+                self.__view = None
+            else:
+                view.moveLeft(min(max(view.left(), 0), width - view.width()))
+                view.moveTop(min(max(view.top(), 0), length - view.height()))
+                self.__view = view
+        self.__area = None
+        self.__repaint()
+
+    def zoom(self, factor: float, pos: QPoint = None) -> None:
+        """Multiply the size of the viewport by the given factor, the cell at the given position doesn't move.
+
+        A factor lower than 1 zooms in, the viewport shows at least a cell. By default, the center of the widget
+        doesn't move.
+        """
+        view = self.view
+        if view.isEmpty():
+            return
+        pos = QPointF(pos) if pos is not None else QRectF(self.rect()).center()
+        ratio_x, ratio_y = pos.x() / max(self.width(), 1), pos.y() / max(self.height(), 1)
+        anchor = QPointF(view.left() + ratio_x * view.width(), view.top() + ratio_y * view.height())
+        width, height = max(view.width() * factor, 1), max(view.height() * factor, 1)
+        self.set_view(QRectF(anchor.x() - ratio_x * width, anchor.y() - ratio_y * height, width, height))
+
+    def pan(self, dx: int, dy: int) -> None:
+        """Move the grid by the given number of pixels of the widget."""
+        view = self.view
+        if self.__view is None or self.width() <= 0 or self.height() <= 0:
+            return
+        view.translate(-dx * view.width() / self.width(), -dy * view.height() / self.height())
+        self.set_view(view)
+
+    # Coordinates
+
+    def cell_at(self, pos: QPoint) -> QPoint:
+        """Return the position (x, y) in the grid of the cell at the given position of the widget, None if none."""
+        if self.__cells is None or self.__image.isNull() or not self.rect().contains(pos):
+            return None
+        view = self.view
+        x = int(view.top() + pos.y() * view.height() / self.height())
+        y = int(view.left() + pos.x() * view.width() / self.width())
+        return QPoint(min(x, self.__cells.shape[0] - 1), min(y, self.__cells.shape[1] - 1))
+
+    def cells_rect(self, x0: int, y0: int, x1: int = None, y1: int = None) -> QRect:
+        """Return the area of the widget where the cells from (x0, y0) to (x1, y1) included are painted.
+
+        By default, the area of the single cell (x0, y0).
+        """
+        x1 = x0 if x1 is None else x1
+        y1 = y0 if y1 is None else y1
+        area = self.__to_widget(QRectF(y0, x0, y1 + 1 - y0, x1 + 1 - x0))
+        # one pixel more, the scaled image may be rounded the other way
+        left, top = int(np.floor(area.left())), int(np.floor(area.top()))
+        return QRect(left, top, int(np.floor(area.right())) - left + 1, int(np.floor(area.bottom())) - top + 1)
+
+    # Override
+
+    def paintEvent(self, event):
+        if self.__image.isNull():
+            return
+        painter = QPainter(self)
+        top, left, bottom, right, block = self.__area
+        target = self.__to_widget(QRectF(left, top, self.__image.width() * block, self.__image.height() * block))
+        painter.drawImage(target, self.__image)
+        if self.__view is not None and not self.__minimap.isNull():
+            minimap = self.__minimap_rect()
+            painter.drawImage(minimap, self.__minimap)
+            painter.setPen(Qt.gray)
+            painter.drawRect(minimap.adjusted(-1, -1, 0, 0))
+            # the viewport in the minimap
+            scale = minimap.width() / self.__cells.shape[1], minimap.height() / self.__cells.shape[0]
+            painter.setPen(Qt.red)
+            painter.drawRect(
+                QRectF(
+                    minimap.left() + self.__view.left() * scale[0],
+                    minimap.top() + self.__view.top() * scale[1],
+                    max(self.__view.width() * scale[0], 1),
+                    max(self.__view.height() * scale[1], 1),
+                )
+            )
+
+    def resizeEvent(self, event):
+        self.__area = None
+        if self.__cells is not None:
+            self.__repaint()
+
+    def wheelEvent(self, event):
+        if self.__cells is None or not event.angleDelta().y():
+            event.ignore()
+            return
+        self.zoom(self.ZOOM_FACTOR ** (-event.angleDelta().y() / 120), event.pos())
+
+    def mousePressEvent(self, event):
+        if event.button() != Qt.MiddleButton:
+            super().mousePressEvent(event)
+            return
+        self.__drag_pos = event.pos()
+
+    def mouseMoveEvent(self, event):
+        if self.__drag_pos is None:
+            super().mouseMoveEvent(event)
+            return
+        delta = event.pos() - self.__drag_pos
+        self.__drag_pos = event.pos()
+        self.pan(delta.x(), delta.y())
+
+    def mouseReleaseEvent(self, event):
+        if event.button() != Qt.MiddleButton:
+            super().mouseReleaseEvent(event)
+            return
+        self.__drag_pos = None
+
+    # Private methods
+
+    @staticmethod
+    def __read_cells(automaton: Automaton | FrameView) -> tuple[dict[State, int], np.ndarray]:
+        """Return the palette of the states and the array of their indices."""
+        if isinstance(automaton, FrameView):
+            return {state: i for i, state in enumerate(automaton.palette)}, automaton.cells
+        palette = {state: i for i, state in enumerate(automaton.states)}
+        if isinstance(automaton, ArrayAutomaton) and palette:
+            try:
+                return palette, automaton.cells
+            except ValueError:  # a cell contains a state that is not in states
+                pass
+        # states not in `states` are added to the palette
+        cells = np.array(
+            [[palette.setdefault(cell, len(palette)) for cell in line] for line in automaton.grid], dtype=np.intp
+        ).reshape(automaton.grid_size)
+        return palette, cells
+
+    def __set_colors(self) -> None:
+        """Set the colors of the images from the palette."""
+        self.__colors = np.array([QColor(state.color).rgb() for state in self.__palette], dtype=np.uint32)
+        self.__image_format = QImage.Format_Indexed8 if len(self.__colors) <= 256 else QImage.Format_RGB32
+
+    def __repaint(self) -> QRegion:
+        """Rasterize the cells in the viewport, and repaint what changed."""
+        length, width = self.__cells.shape
+        view, block = self.view, self.block_size
+        # the blocks are aligned on the grid, they don't change when the viewport moves
+        top, left = int(view.top()) // block * block, int(view.left()) // block * block
+        bottom, right = min(int(np.ceil(view.bottom())), length), min(int(np.ceil(view.right())), width)
+        area = (top, left, bottom, right, block)
+        if block == 1 and area == self.__area and self.__drawn_cells is not None:
+            cells = self.__cells[top:bottom, left:right]
+            changed = np.flatnonzero(cells.reshape(-1) != self.__drawn_cells.reshape(-1))
+            x, y = np.divmod(changed, cells.shape[1])
+            self.__write_pixels(self.__image, x, y, cells[x, y])
+            np.copyto(self.__drawn_cells, cells, casting="unsafe")
+            region = self.__cells_region(x + top, y + left)
+        else:
+            self.__area = area
+            cells = self.__downsample(self.__cells[top:bottom, left:right], block)
+            self.__image = self.__fit_image(self.__image, cells.shape)
+            self.__write_pixels(self.__image, slice(None), slice(None), cells)
+            self.__drawn_cells = cells.copy() if block == 1 else None
+            region = QRegion(self.rect())
+        if self.__view is not None:
+            self.__update_minimap()
+            region = region.united(self.__minimap_rect().adjusted(-1, -1, 1, 1))
+        if not region.isEmpty():
+            self.update(region)
+        return region
+
+    def __update_minimap(self) -> None:
+        """Rasterize the whole grid in the minimap."""
+        block = -(-max(self.__cells.shape) // self.MINIMAP_SIZE)
+        cells = self.__downsample(self.__cells, block)
+        self.__minimap = self.__fit_image(self.__minimap, cells.shape)
+        self.__write_pixels(self.__minimap, slice(None), slice(None), cells)
+
+    def __minimap_rect(self) -> QRect:
+        """Return the area of the widget where the minimap is painted, in the bottom right corner."""
+        length, width = self.__cells.shape
+        scale = self.MINIMAP_SIZE / max(length, width)
+        size = QSize(max(round(width * scale), 1), max(round(length * scale), 1))
+        return QRect(QPoint(self.width() - size.width() - 8, self.height() - size.height() - 8), size)
+
+    def __downsample(self, cells: np.ndarray, block: int) -> np.ndarray:
+        """Return the dominant state of each block of block x block cells, estimated on a sample of its cells.
+
+        With more than MAX_DOMINANT_STATES states, the top left cell of each block is used instead.
+        """
+        if block == 1 or not cells.size:
+            return cells
+        nb_states = len(self.__palette)
+        if nb_states > self.MAX_DOMINANT_STATES:
+            return cells[::block, ::block]
+        offsets = range(0, block, -(-block // self.SAMPLES))
+        counts = np.zeros((nb_states, -(-cells.shape[0] // block), -(-cells.shape[1] // block)), dtype=np.uint8)
+        for x in offsets:
+            for y in offsets:
+                # the blocks on the edge may have fewer cells
+                sample = cells[x::block, y::block]
+                for state in range(nb_states):
+                    counts[state, : sample.shape[0], : sample.shape[1]] += sample == state
+        return counts.argmax(axis=0)
+
+    def __fit_image(self, image: QImage, shape: tuple[int, int]) -> QImage:
+        """Return the image, created again if it doesn't have the given shape and the format of the palette."""
+        if image.format() != self.__image_format or image.height() != shape[0] or image.width() != shape[1]:
+            image = QImage(shape[1], shape[0], self.__image_format)
+        if self.__image_format == QImage.Format_Indexed8:
+            image.setColorTable(self.__colors.tolist())
+        return image
+
+    def __write_pixels(self, image: QImage, x, y, cells: np.ndarray) -> None:
+        """Write the state indices of the cells at the given coordinates (indices or slices) in the image."""
+        if image.isNull():
+            return
+        bits = image.bits()
+        bits.setsize(image.sizeInBytes())
+        lines = np.frombuffer(bits, dtype=np.uint8).reshape(image.height(), image.bytesPerLine())
+        if image.format() == QImage.Format_Indexed8:
+            lines[:, : image.width()][x, y] = cells
+        else:
+            lines.view(np.uint32)[:, : image.width()][x, y] = self.__colors[cells]
+
+    def __to_widget(self, area: QRectF) -> QRectF:
+        """Convert an area of the grid, in cells, to an area of the widget."""
+        view = self.view
+        scale_x, scale_y = self.width() / view.width(), self.height() / view.height()
+        return QRectF(
+            (area.left() - view.left()) * scale_x,
+            (area.top() - view.top()) * scale_y,
+            area.width() * scale_x,
+            area.height() * scale_y,
+        )
+
+    def __cells_region(self, x: np.ndarray, y: np.ndarray) -> QRegion:
+        """Return the region of the widget covering the tiles of the given cells."""
+        region = QRegion()
+        if not x.size:
+            return region
+        length, width = self.__cells.shape
+        tiles = np.zeros((-(-length // self.TILE_SIZE), -(-width // self.TILE_SIZE)), dtype=bool)
+        tiles[x // self.TILE_SIZE, y // self.TILE_SIZE] = True
+        tiles = np.argwhere(tiles)
+        if len(tiles) > self.MAX_DIRTY_TILES:
+            return region.united(self.cells_rect(x.min(), y.min(), x.max(), y.max())).intersected(self.rect())
+        for tile_x, tile_y in (tiles * self.TILE_SIZE).tolist():
+            rect = self.cells_rect(
+                tile_x, tile_y, min(tile_x + self.TILE_SIZE, length) - 1, min(tile_y + self.TILE_SIZE, width) - 1
+            )
+            region = region.united(rect)
+        return region.intersected(self.rect())
+
+
 class QtVisualizer(QWidget):
-    """Show the automaton in a UI window."""
+    """Show the automaton in a UI window.
+
+    When running in a separate thread, the steps are not drawn as they are calculated: a timer draws at most
+    `max_fps` steps per second, and the steps calculated in between are skipped. `step_calculated` is only emitted
+    for the drawn steps.
+
+    The automaton is never read by the GUI while it is running. Once a step is drawn, the next one is requested: the
+    thread of the runner answers with a snapshot (`Automaton.snapshot()`) of the following step, which the timer
+    draws. Neither thread waits for the other, and the grid is only handed over when it is drawn.
+
+    Attributes:
+        max_fps the maximum number of steps drawn per second while running in a separate thread
+    """
 
     started = pyqtSignal()
     """Emitted when we start running the automaton, or when we change the automaton."""
     finished = pyqtSignal()
     """Emitted when the running or the change of automaton is finished."""
     step_calculated = pyqtSignal(Automaton)
-    """Emitted during automaton running, at each step."""
+    """Emitted during automaton running, at each drawn step."""
     grid_changed = pyqtSignal()
     """Emitted when th grid is editted."""
     automaton_has_changed = pyqtSignal(Automaton)
@@ -67,9 +443,17 @@ class QtVisualizer(QWidget):
         self._worker: QtVisualizerWorker = None
         self._automaton: Automaton = None
         self.__automaton_runner: AutomatonRunner = None
-        self.__layout: QGridLayout = QGridLayout(self)
-        self.__layout.setSpacing(1)
+        self._canvas: QtGridCanvas = QtGridCanvas(self)
+        self._canvas.setContextMenuPolicy(Qt.CustomContextMenu)
+        self._canvas.customContextMenuRequested.connect(self.__canvas_contextual_menu)
+        self.__layout: QVBoxLayout = QVBoxLayout(self)
+        self.__layout.addWidget(self._canvas)
         self.__is_running: bool = False
+        self.max_fps: float = 30
+        self.__frame: FrameView = None
+        self.__frame_requested: bool = False
+        self.__frame_timer: QTimer = QTimer(self)
+        self.__frame_timer.timeout.connect(self.__publish_frame)
 
     def set_automaton(self, automaton: Automaton) -> None:
         """Reset the widget to show the given automaton.
@@ -79,17 +463,6 @@ class QtVisualizer(QWidget):
         """
         self.__start()
         self._automaton = automaton
-        self.__clear_layout()
-
-        label = None
-        for line in range(self._automaton.length):
-            for cell in range(self._automaton.width):
-                label = QLabel(self)
-                label.setContextMenuPolicy(Qt.CustomContextMenu)
-                label.customContextMenuRequested.connect(
-                    lambda pos, lbl=label, x=line, y=cell: self.__label_contextual_menu(lbl.mapToGlobal(pos), x, y)
-                )
-                self.__layout.addWidget(label, line, cell)
         self.draw()
         self.__stop()
         self.automaton_has_changed.emit(self._automaton)
@@ -99,8 +472,23 @@ class QtVisualizer(QWidget):
         return self.__is_running
 
     def set_cell_state(self, pos: QPoint, state: State) -> None:
-        self._automaton.grid[pos.x()][pos.y()] = state
-        self.__change_label_color(pos.x(), pos.y(), state.color)
+        x, y = pos.x(), pos.y()
+        automaton = self._automaton
+        if isinstance(automaton, ArrayAutomaton) and state in automaton.states:
+            # write in the array of cells, decoding the grid would cost as much as a whole iteration
+            try:
+                cells = automaton.cells
+            except ValueError:  # a cell contains a state that is not in `states`
+                automaton.grid[x][y] = state
+            else:
+                if not cells.flags.writeable:
+                    cells = cells.copy()
+                cells[x, y] = automaton.state_index(state)
+                automaton.cells = cells
+        else:
+            automaton.grid[x][y] = state
+        if not self._canvas.set_cell(pos.x(), pos.y(), state):
+            self._canvas.set_grid(self._automaton)
         self.grid_changed.emit()
 
     # Slots
@@ -110,10 +498,7 @@ class QtVisualizer(QWidget):
         """Callback for the AutomatonRunner."""
         if not automaton:
             automaton = self._automaton
-        grid = automaton.grid
-        for i in range(automaton.length):
-            for j in range(automaton.width):
-                self.__change_label_color(i, j, grid[i][j].color)
+        self._canvas.set_grid(automaton)
 
     @pyqtSlot(AutomatonRunner)
     def run(self, automatonRunner: AutomatonRunner) -> QThread:
@@ -121,16 +506,29 @@ class QtVisualizer(QWidget):
         self.__initialize_worker(automatonRunner)
         self.__initialize_thread()
         # Start thread
+        self.__frame = None
+        self.__frame_requested = True
+        self.__frame_timer.start(max(1, round(1000 / self.max_fps)))
         self._thread.start()
         return self._thread
 
     @pyqtSlot(AutomatonRunner)
     def run_seq(self, automatonRunner: AutomatonRunner) -> None:
-        """Run the automaton through the given AutomatonRunner in the current thread (sequentially)."""
+        """Run the automaton through the given AutomatonRunner in the current thread (sequentially).
+
+        The event loop doesn't run meanwhile, so each step is drawn.
+        """
         self.__initialize_worker(automatonRunner)
+        self._worker.step_calculated.connect(self.step_calculated)
+        self._worker.step_calculated.connect(self.draw)
         # Start runner
         self._worker.run()
 
+    def replay(self, reader: TrajectoryReader, iter_per_second: float = 10) -> QThread:
+        """Replay a recorded trajectory in a separate thread, the steps are read instead of being calculated."""
+        self.set_automaton(TrajectoryAutomaton(reader))
+        return self.run(AutomatonRunner(len(reader) - 1, iter_per_second))
+
     @pyqtSlot()
     def stop(self) -> None:
         if self.__automaton_runner:
@@ -143,25 +541,12 @@ class QtVisualizer(QWidget):
     def mouseReleaseEvent(self, event):
         if self.is_running():
             return
-        w = self.childAt(event.pos())
-        if not w or not isinstance(w, QLabel):
-            return
-        # try to find the position of the label
-        for i in range(self.__layout.count()):
-            if self.__layout.itemAt(i).widget() is w:
-                (x, y, _, _) = self.__layout.getItemPosition(i)
-                self.cell_clicked.emit(QPoint(x, y))
-                return
+        cell = self._canvas.cell_at(self._canvas.mapFrom(self, event.pos()))
+        if cell is not None:
+            self.cell_clicked.emit(cell)
 
     # Private methods
 
-    def __clear_layout(self) -> None:
-        while self.__layout.count():
-            widget = self.__layout.takeAt(0).widget()
-            if widget:
-                widget.setParent(None)
-                widget.deleteLater()
-
     def __initialize_worker(self, automatonRunner: AutomatonRunner) -> None:
         self.__automaton_runner = automatonRunner
         # Create thread environment
@@ -169,9 +554,7 @@ class QtVisualizer(QWidget):
         # Connect everything
         self._worker.started.connect(self.__start)
         self._worker.finished.connect(self.__stop)
-        self._worker.step_calculated.connect(self.step_calculated)
         self._worker.finished.connect(self._worker.deleteLater)
-        self._worker.step_calculated.connect(self.draw)
 
     def __initialize_thread(self) -> None:
         # Create thread environment
@@ -180,13 +563,27 @@ class QtVisualizer(QWidget):
         # Connect everything
         self._thread.started.connect(self._worker.run)
         self._worker.finished.connect(self._thread.quit, Qt.DirectConnection)
+        # the steps are published from the thread of the worker, and drawn by the timer
+        self._worker.step_calculated.connect(self.__frame_calculated, Qt.DirectConnection)
+
+    def __frame_calculated(self, automaton: Automaton) -> None:
+        """Publish a snapshot of the step if one is requested, called from the thread of the worker."""
+        # the frame is only written when requested, and only requested once the previous one has been taken
+        if self.__frame_requested:
+            self.__frame_requested = False
+            self.__frame = automaton.snapshot()
 
-    def __label_contextual_menu(self, pos: QPoint, x: int, y: int) -> None:
+    def __canvas_contextual_menu(self, pos: QPoint) -> None:
         if self._thread and self._thread.isRunning():
             return
+        cell = self._canvas.cell_at(pos)
+        if cell is None:
+            return
+        x, y = cell.x(), cell.y()
+        pos = self._canvas.mapToGlobal(pos)
 
         state = None
-        oldState = self._automaton.grid[x][y]
+        oldState = self.__cell_state(x, y)
 
         def __set_state(newState: State) -> None:
             nonlocal state
@@ -209,8 +606,15 @@ class QtVisualizer(QWidget):
         if state is not None and state != oldState:
             self.set_cell_state(QPoint(x, y), state)
 
-    def __change_label_color(self, x: int, y: int, color: str):
-        self.__layout.itemAtPosition(x, y).widget().setStyleSheet(f"QLabel {{ background-color : {color} }}")
+    def __cell_state(self, x: int, y: int) -> State:
+        """Return the state of a cell, read in the array of cells if possible."""
+        automaton = self._automaton
+        if isinstance(automaton, ArrayAutomaton):
+            try:
+                return automaton.states[automaton.cells[x, y]]
+            except ValueError:  # a cell contains a state that is not in `states`
+                pass
+        return automaton.grid[x][y]
 
     # Private slots
 
@@ -219,7 +623,25 @@ class QtVisualizer(QWidget):
         self.__is_running = True
         self.started.emit()
 
+    @pyqtSlot()
+    def __publish_frame(self):
+        """Draw the snapshot published by the worker, if any, and request the next one."""
+        frame = self.__frame
+        if frame is None:
+            return
+        self.__frame = None
+        self._canvas.set_grid(frame)
+        self.step_calculated.emit(self._automaton)
+        self.__frame_requested = True
+
     @pyqtSlot()
     def __stop(self):
+        if self.__frame_timer.isActive():
+            # the worker is finished, the last step is always drawn
+            self.__frame_timer.stop()
+            self.__frame_requested = False
+            self.__frame = None
+            self.draw()
+            self.step_calculated.emit(self._automaton)
         self.__is_running = False
         self.finished.emit()
@@ -23,7 +23,7 @@ from copy import deepcopy
 from unittest.mock import MagicMock
 
 from automaton import GameOfLife
-from pytest import fixture, mark
+from pytest import fixture, mark, raises
 from qmaton import MooreNeighborhood
 
 # Base test
@@ -79,6 +79,7 @@ def test_init():
     gol = GameOfLife(2, 3)
     assert gol.grid_size == (2, 3)
     assert gol.rule == gol.main_rule
+    assert gol.rule_table is GameOfLife.RULE_TABLE
     assert isinstance(gol.neighborhood, MooreNeighborhood)
     # states
     assert len(gol.states) == 2
@@ -124,3 +125,32 @@ def test_apply_rule(gollum, golres):
     for i in range(3):
         gollum.apply_rule()
     assert gollum == golres
+
+
+def test_rule_table():
+    gol = GameOfLife(20, 30)
+    gol.random_initialize()
+    reference = deepcopy(gol)
+    reference.rule_table = None
+    for _ in range(5):
+        gol.apply_rule()
+        reference.apply_rule()
+        assert gol == reference
+
+
+def test_read_write_pattern(gollum):
+    import io
+
+    file = io.StringIO()
+    gollum.write_pattern(file)
+    assert file.getvalue() == "x = 5, y = 7, rule = B3/S23\n$b2o$b2o2$b2o$4bo$o2b2o!\n"
+    gol = GameOfLife(7, 5)
+    file.seek(0)
+    gol.read_pattern(file)
+    assert gol == gollum
+    gol = GameOfLife(7, 5)
+    gol.read_pattern(io.StringIO("#Life 1.06\n0 0\n1 0"), 6, 4)
+    assert gol.grid[6][4] == L
+    assert sum(line.count(L) for line in gol.grid) == 1
+    with raises(ValueError):
+        gol.read_pattern(io.StringIO("x = 1, y = 1, rule = B36/S23\no!"))
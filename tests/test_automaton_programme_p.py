@@ -0,0 +1,45 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#    QMaton is a Python/Qt software used to run cellular automatons.
+#    Copyright (C) 2021  Rémi Ducceschi (remileduc) <remi.ducceschi@gmail.com>
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Test file for GameOfFire class"""
+
+from copy import deepcopy
+
+from automaton import GameOfFire
+
+
+def test_init():
+    gof = GameOfFire(2, 3)
+    assert gof.grid_size == (2, 3)
+    assert gof.rule == gof.main_rule
+    assert gof.rule_table is GameOfFire.RULE_TABLE
+    assert len(gof.states) == 7
+    assert all(s is GameOfFire.VIDE for line in gof.grid for s in line)
+
+
+def test_rule_table():
+    gof = GameOfFire(20, 30)
+    gof.random_initialize()
+    reference = deepcopy(gof)
+    reference.rule_table = None
+    for _ in range(8):
+        gof.apply_rule()
+        reference.apply_rule()
+        assert gof == reference
@@ -0,0 +1,279 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#    QMaton is a Python/Qt software used to run cellular automatons.
+#    Copyright (C) 2021  Rémi Ducceschi (remileduc) <remi.ducceschi@gmail.com>
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Test file for ArrayAutomaton class"""
+
+import numpy as np
+from automaton import GameOfLife
+from pytest import mark, raises
+from qmaton import (
+    ArrayAutomaton,
+    EdgeRule,
+    FrameView,
+    HexagonalNeighborhood,
+    MooreNeighborhood,
+    RadialNeighborhood,
+    RuleTable,
+    State,
+    Transition,
+    VonNeumannNeighborhood,
+)
+
+
+class DumbAutomaton(ArrayAutomaton):
+    ON = State("on", "#000")
+    OFF = State("off", "#FFF")
+
+    def __init__(self, width, length):
+        super().__init__(width, length, DumbAutomaton.OFF)
+        self.states = [DumbAutomaton.ON, DumbAutomaton.OFF]
+        self.rule = self.main_rule
+        self.array_rule = self.main_array_rule
+        self.rule_executed_cpt = 0
+
+    def main_rule(self, x, y):
+        self.rule_executed_cpt += 1
+        return DumbAutomaton.ON if self.grid[x][y] == DumbAutomaton.OFF else DumbAutomaton.OFF
+
+    def main_array_rule(self, cells):
+        return 1 - cells
+
+
+def test_init():
+    dab = DumbAutomaton(2, 3)
+    assert dab.grid_size == (2, 3)
+    assert dab.changed_cells is None
+    assert dab.cells.shape == (2, 3)
+    assert dab.cells.dtype == np.uint8
+    assert (dab.cells == 1).all()
+    assert all(s is DumbAutomaton.OFF for line in dab.grid for s in line)
+
+
+def test_grid_cells():
+    dab = DumbAutomaton(2, 3)
+    dab.grid[1][2] = DumbAutomaton.ON
+    assert dab.cells.tolist() == [[1, 1, 1], [1, 1, 0]]
+    dab.cells[0][0] = 0
+    assert dab.grid[0][0] is DumbAutomaton.ON
+    assert dab.grid[1][2] is DumbAutomaton.ON
+    dab.grid[0][1] = "unknown"
+    with raises(ValueError):
+        dab.cells
+
+
+def test_random_initialize():
+    dab = DumbAutomaton(20, 30)
+    dab.random_initialize()
+    assert dab.cells.shape == (20, 30)
+    assert set(np.unique(dab.cells)) == {0, 1}
+
+
+def test_apply_rule():
+    dab = DumbAutomaton(2, 3)
+    dab.apply_rule()
+    assert dab.rule_executed_cpt == 0
+    assert all(s is DumbAutomaton.ON for line in dab.grid for s in line)
+    dab.array_rule = None
+    dab.apply_rule()
+    assert dab.rule_executed_cpt == 6
+    assert (dab.cells == 1).all()
+
+
+@mark.parametrize("radius", (1, 2))
+def test_edge_mask(radius):
+    dab = DumbAutomaton(5, 6)
+    mask = dab.edge_mask(radius)
+    assert mask.tolist() == [[dab.is_on_edge(x, y, radius) for y in range(6)] for x in range(5)]
+
+
+@mark.parametrize(
+    "neighborhood",
+    (
+        MooreNeighborhood(),
+        MooreNeighborhood(EdgeRule.IGNORE_MISSING_NEIGHBORS_OF_EDGE_CELLS),
+        MooreNeighborhood(EdgeRule.FIRST_AND_LAST_CELL_OF_DIMENSION_ARE_NEIGHBORS),
+        VonNeumannNeighborhood(EdgeRule.IGNORE_MISSING_NEIGHBORS_OF_EDGE_CELLS, radius=2),
+        RadialNeighborhood(EdgeRule.FIRST_AND_LAST_CELL_OF_DIMENSION_ARE_NEIGHBORS, radius=2),
+        HexagonalNeighborhood(EdgeRule.IGNORE_MISSING_NEIGHBORS_OF_EDGE_CELLS),
+        HexagonalNeighborhood(EdgeRule.FIRST_AND_LAST_CELL_OF_DIMENSION_ARE_NEIGHBORS, radius=2),
+    ),
+)
+def test_count_neighbors_array(neighborhood):
+    dab = DumbAutomaton(7, 6)
+    dab.random_initialize()
+    counts = dab.count_neighbors_array(neighborhood, dab.cells, (DumbAutomaton.ON,))
+    assert counts.tolist() == [
+        [dab.count_neighbors(neighborhood, x, y, (DumbAutomaton.ON,)) for y in range(6)] for x in range(7)
+    ]
+
+
+@mark.parametrize(
+    "neighborhood",
+    (
+        MooreNeighborhood(),
+        VonNeumannNeighborhood(EdgeRule.IGNORE_MISSING_NEIGHBORS_OF_EDGE_CELLS, radius=2),
+        HexagonalNeighborhood(EdgeRule.FIRST_AND_LAST_CELL_OF_DIMENSION_ARE_NEIGHBORS),
+    ),
+)
+def test_active_cells(neighborhood):
+    # ON cells spread to OFF cells with exactly one ON neighbor, then turn OFF: only a few cells change at each step
+    table = RuleTable(
+        ((DumbAutomaton.ON,),),
+        (Transition(DumbAutomaton.OFF, DumbAutomaton.ON, (1,)), Transition(DumbAutomaton.ON, DumbAutomaton.OFF)),
+    )
+    dab = DumbAutomaton(20, 22)
+    dab.rule_table = table
+    dab.array_rule = None
+    dab.neighborhood = neighborhood
+    dab.grid[10][11] = DumbAutomaton.ON
+    reference = DumbAutomaton(20, 22)
+    reference.rule_table = table
+    reference.array_rule = None
+    reference.neighborhood = neighborhood
+    reference.active_threshold = 0
+    reference.cells = dab.cells.copy()
+    for i in range(8):
+        if i == 4:
+            dab.grid[2][3] = DumbAutomaton.ON
+            reference.grid[2][3] = DumbAutomaton.ON
+        previous = dab.cells.copy()
+        dab.apply_rule()
+        reference.apply_rule()
+        assert (dab.cells == reference.cells).all()
+        assert dab.changed_cells.tolist() == np.flatnonzero(dab.cells != previous).tolist()
+    dab.array_rule = dab.main_array_rule
+    dab.apply_rule()
+    assert dab.changed_cells is None
+
+
+def test_double_buffer():
+    dab = DumbAutomaton(20, 22)
+    dab.rule_table = RuleTable(((DumbAutomaton.ON,),), (Transition(DumbAutomaton.OFF, DumbAutomaton.ON, (1,)),))
+    dab.array_rule = None
+    dab.neighborhood = MooreNeighborhood()
+    dab.active_threshold = 0
+    dab.grid[10][11] = DumbAutomaton.ON
+    front = dab.cells
+    dab.apply_rule()
+    back = dab.cells
+    assert back is not front
+    assert np.count_nonzero(back == 0) == 9
+    dab.apply_rule()
+    assert dab.cells is front
+    assert dab.cells[10][11] == 0
+
+
+def test_load_frame():
+    dab = DumbAutomaton(2, 3)
+    cells = np.array([[0, 1, 0], [1, 1, 0]], dtype=np.uint8)
+    # the palette is the list of states, the array is used without copy
+    dab.load_frame(FrameView(cells, dab.states))
+    assert np.shares_memory(dab.cells, cells)
+    assert not dab.cells.flags.writeable
+    dab.apply_rule()
+    assert dab.cells.tolist() == [[1, 0, 1], [0, 0, 1]]
+    assert cells.tolist() == [[0, 1, 0], [1, 1, 0]]
+    dab.load_frame(FrameView(cells, dab.states))
+    dab.grid[0][0] = DumbAutomaton.OFF
+    assert dab.cells.tolist() == [[1, 1, 0], [1, 1, 0]]
+    assert cells.tolist() == [[0, 1, 0], [1, 1, 0]]
+    # rule table, the back buffer is not the read-only array
+    dab.rule_table = RuleTable(((DumbAutomaton.ON,),), (Transition(DumbAutomaton.OFF, DumbAutomaton.ON, (1,)),))
+    dab.array_rule = None
+    dab.neighborhood = MooreNeighborhood(EdgeRule.IGNORE_MISSING_NEIGHBORS_OF_EDGE_CELLS)
+    dab.load_frame(FrameView(cells, dab.states))
+    dab.apply_rule()
+    dab.apply_rule()
+    assert cells.tolist() == [[0, 1, 0], [1, 1, 0]]
+    # the palette is mapped to the states
+    palette = ["lol", DumbAutomaton.OFF, DumbAutomaton.ON]
+    dab.load_frame(FrameView(np.array([[1, 2, 2], [2, 1, 1]]), palette))
+    assert dab.cells.tolist() == [[1, 0, 0], [0, 1, 1]]
+    assert dab.cells.flags.writeable
+    with raises(ValueError):
+        dab.load_frame(FrameView(np.array([[1, 2, 0], [2, 1, 1]]), palette))
+    grid = [[DumbAutomaton.ON] * 3, [DumbAutomaton.OFF] * 3]
+    dab.load_frame(grid)
+    assert dab.grid is grid
+
+
+def test_snapshot():
+    dab = DumbAutomaton(2, 3)
+    dab.rule_table = RuleTable(((DumbAutomaton.ON,),), (Transition(DumbAutomaton.OFF, DumbAutomaton.ON, (1,)),))
+    dab.array_rule = None
+    dab.neighborhood = MooreNeighborhood(EdgeRule.IGNORE_MISSING_NEIGHBORS_OF_EDGE_CELLS)
+    dab.cells = np.array([[0, 1, 1], [1, 1, 1]], dtype=np.uint8)
+    # the array is not copied, the next iterations are written in other arrays
+    cells = dab.cells
+    frame = dab.snapshot()
+    assert np.shares_memory(frame.cells, cells)
+    assert frame.palette == tuple(dab.states)
+    # the array of the automaton stays writeable, it is copied before being edited
+    assert not frame.cells.flags.writeable
+    assert dab.cells.flags.writeable
+    assert not np.shares_memory(frame.cells, dab.cells)
+    dab.apply_rule()
+    dab.apply_rule()
+    assert frame.cells.tolist() == [[0, 1, 1], [1, 1, 1]]
+    assert dab.cells.tolist() == [[0, 0, 1], [0, 0, 1]]
+    # as well as the next changes
+    frame = dab.snapshot()
+    dab.paste(np.ones((1, 1), dtype=np.uint8))
+    dab.grid[1][1] = DumbAutomaton.OFF
+    assert frame.cells.tolist() == [[0, 0, 1], [0, 0, 1]]
+    assert dab.cells.tolist() == [[1, 0, 1], [0, 1, 1]]
+    frame = dab.snapshot()
+    dab.cells[0, 0] = 0
+    assert dab.cells[0, 0] == 0
+    assert frame.cells[0, 0] == 1
+    # state not in states
+    dab.grid[0][0] = "lol"
+    assert dab.snapshot()[0, 0] == "lol"
+
+
+def test_snapshot_iterations():
+    gol = GameOfLife(20, 20)
+    gol.random_initialize()
+    frames, expected = [], []
+    for _ in range(2):
+        frames.append(gol.snapshot())
+        expected.append(frames[-1].cells.copy())
+        gol.apply_rule()
+    # the arrays of both snapshots are never used as back buffers
+    for _ in range(5):
+        gol.apply_rule()
+    for frame, cells in zip(frames, expected):
+        assert (frame.cells == cells).all()
+
+
+def test_paste():
+    dab = DumbAutomaton(4, 5)
+    dab.paste(np.zeros((2, 2), dtype=np.uint8), 1, 2)
+    assert dab.cells.tolist() == [[1, 1, 1, 1, 1], [1, 1, 0, 0, 1], [1, 1, 0, 0, 1], [1, 1, 1, 1, 1]]
+    # the part out of the grid is ignored
+    dab.paste(np.array([[0, 1, 0], [1, 0, 1]], dtype=np.uint8), -1, 3)
+    assert dab.cells.tolist() == [[1, 1, 1, 1, 0], [1, 1, 0, 0, 1], [1, 1, 0, 0, 1], [1, 1, 1, 1, 1]]
+    dab.paste(np.zeros((2, 2), dtype=np.uint8), 4, 0)
+    assert dab.cells[:, 0].tolist() == [1, 1, 1, 1]
+    # a read-only frame is copied
+    cells = np.ones((4, 5), dtype=np.uint8)
+    dab.load_frame(FrameView(cells, dab.states))
+    dab.paste(np.zeros((1, 1), dtype=np.uint8))
+    assert dab.cells[0, 0] == 0
+    assert cells[0, 0] == 1
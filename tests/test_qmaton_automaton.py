@@ -19,8 +19,9 @@
 
 """Test file for Automaton class"""
 
+import numpy as np
 from pytest import mark
-from qmaton import Automaton, EdgeRule, MooreNeighborhood, State
+from qmaton import Automaton, EdgeRule, FrameView, MooreNeighborhood, State
 
 
 class DumbAutomaton(Automaton):
@@ -85,6 +86,29 @@ def test_random_initialize():
     assert all(s is DumbAutomaton.STATE for line in dab.grid for s in line)
 
 
+def test_load_frame():
+    dab = DumbAutomaton(2, 3)
+    dab.load_frame(FrameView(np.array([[0, 1, 0], [1, 1, 0]]), [DumbAutomaton.STATE, None]))
+    assert dab.grid == [[DumbAutomaton.STATE, None, DumbAutomaton.STATE], [None, None, DumbAutomaton.STATE]]
+    dab.grid[0][0] = None
+    assert dab.grid[0][0] is None
+    grid = [[1, 2, 3], [4, 5, 6]]
+    dab.load_frame(grid)
+    assert dab.grid is grid
+
+
+def test_snapshot():
+    dab = DumbAutomaton(2, 3)
+    dab.grid[1][2] = None
+    frame = dab.snapshot()
+    assert frame == [[DumbAutomaton.STATE] * 3, [DumbAutomaton.STATE, DumbAutomaton.STATE, None]]
+    assert frame.palette == (DumbAutomaton.STATE, None)
+    dab.apply_rule()
+    dab.apply_rule()
+    assert frame[1, 2] is None
+    assert frame[0, 0] == DumbAutomaton.STATE
+
+
 def test_apply_rule():
     dab = DumbAutomaton(2, 3)
     dab.apply_rule()
@@ -92,6 +116,27 @@ def test_apply_rule():
     assert all(s == "lol" for line in dab.grid for s in line)
 
 
+def test_apply_rule_double_buffer():
+    dab = DumbAutomaton(2, 3)
+    # the rule shifts the states to the right, it must only read the previous grid
+    dab.rule = lambda x, y: dab.grid[x][y - 1] if y else x * 3
+    front = dab.grid
+    dab.apply_rule()
+    back = dab.grid
+    assert back is not front
+    assert back == [[0, DumbAutomaton.STATE, DumbAutomaton.STATE], [3, DumbAutomaton.STATE, DumbAutomaton.STATE]]
+    dab.apply_rule()
+    assert dab.grid is front
+    assert dab.grid == [[0, 0, DumbAutomaton.STATE], [3, 3, DumbAutomaton.STATE]]
+    # a new grid is not overwritten, the back buffer is used
+    dab.grid = [[1, 2, 3], [4, 5, 6]]
+    new_grid = dab.grid
+    dab.apply_rule()
+    assert dab.grid is back
+    assert new_grid == [[1, 2, 3], [4, 5, 6]]
+    assert dab.grid == [[0, 1, 2], [3, 4, 5]]
+
+
 @mark.parametrize(
     ("coordinate", "result"),
     (
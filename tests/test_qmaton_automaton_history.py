@@ -19,8 +19,13 @@
 
 """Test file for AutomatonHistory class"""
 
+from copy import deepcopy
+from threading import Lock
+
+import numpy as np
+from automaton import GameOfLife
 from pytest import raises
-from qmaton import Automaton, AutomatonHistory, State
+from qmaton import Automaton, AutomatonHistory, FrameView, HashLifeAutomaton, LifeLikeAutomaton, State
 
 
 class DumbAutomaton(Automaton):
@@ -38,6 +43,8 @@ class DumbAutomaton(Automaton):
 def test_init():
     ah = AutomatonHistory()
     assert ah.history_size == 10000
+    assert ah.keyframe_interval == 32
+    assert ah.nbytes == 0
     assert len(ah) == 0
     assert not ah
     assert ah.current_index == -1
@@ -264,3 +271,214 @@ def test_move_to():
         assert ah.move_to(i) == i
         assert ah.get() == i
     assert ah.current_index == 9
+
+
+def test_delta_frames():
+    ah = AutomatonHistory(keyframe_interval=4)
+    grids = []
+    grid = [[i * 10 + j for j in range(10)] for i in range(10)]
+    for i in range(10):
+        grid[i][i] = "changed"
+        grids.append(deepcopy(grid))
+        ah.append(grid)
+    # 3 keyframes of 100 cells, 7 change lists of 1 cell
+    assert ah.nbytes == 3 * 100 + 7 * 2
+    for i in (9, 0, 5, 6, 4, 3, 8, 1, 2, 7):
+        assert ah[i] == grids[i]
+        assert ah.move_to(i) == grids[i]
+    assert ah.move_to(2) == grids[2]
+    assert ah.move_forward() == grids[3]
+    assert ah.move_backward(2) == grids[1]
+    assert ah[-1] == grids[9]
+
+
+def test_delta_frames_objects():
+    ah = AutomatonHistory(keyframe_interval=4)
+    ah.append([[1, 2], [3, 4]])
+    ah.append([[1, 2], [3, 5]])
+    ah.append("lol")
+    ah.append([[1, 2], [3, [5]]])
+    ah.append([[1, True], [3, 5]])
+    ah.append([[1, 2, 3]])
+    assert ah[0] == [[1, 2], [3, 4]]
+    assert ah[1] == [[1, 2], [3, 5]]
+    assert ah[2] == "lol"
+    assert ah[3] == [[1, 2], [3, [5]]]
+    assert ah[4] == [[1, True], [3, 5]]
+    assert ah[4][0][1] is True
+    assert ah[5] == [[1, 2, 3]]
+
+
+def test_delta_frames_set():
+    ah = AutomatonHistory()
+    for i in range(5):
+        ah.append([[i, 0], [0, i]])
+    ah[2] = "lol"
+    ah[3] = [[7, 7], [7, 7]]
+    assert [ah[i] for i in range(5)] == [[[0, 0], [0, 0]], [[1, 0], [0, 1]], "lol", [[7, 7], [7, 7]], [[4, 0], [0, 4]]]
+
+
+def test_delta_frames_automaton():
+    gol = GameOfLife(30, 40)
+    gol.random_initialize()
+    ah = AutomatonHistory(keyframe_interval=8)
+    grids = []
+    for _ in range(20):
+        ah.append_automaton_state(gol)
+        grids.append(deepcopy(gol.grid))
+        gol.apply_rule()
+    assert ah.nbytes < 20 * 30 * 40
+    for i in reversed(range(20)):
+        assert ah[i] == grids[i]
+    assert all(s is GameOfLife.LIFE or s is GameOfLife.DEATH for line in ah[10] for s in line)
+    ah.clear_after(9)
+    ah.append(grids[0])
+    assert ah[10] == grids[0]
+    assert ah[9] == grids[9]
+
+
+def test_memory_budget():
+    gol = GameOfLife(30, 40)
+    gol.random_initialize()
+    ah = AutomatonHistory(None, keyframe_interval=8, max_bytes=16 * 30 * 40)
+    assert ah.history_size is None
+    assert ah.max_bytes == 16 * 30 * 40
+    grids = [deepcopy(gol.grid)]
+    ah.append_automaton_state(gol)
+    for _ in range(100):
+        gol.apply_rule()
+        grids.append(deepcopy(gol.grid))
+        ah.append_automaton_state(gol, iteration=True)
+        assert ah.nbytes <= ah.max_bytes
+    assert len(ah) == 101
+    for i in (100, 3, 50, 51, 99, 0, 27, 28, 12):
+        assert ah[i] == grids[i]
+        assert ah.move_to(i) == grids[i]
+    # the evicted steps are still valid after editing the history
+    ah[40] = grids[0]
+    assert ah[40] == grids[0]
+    assert ah[41] == grids[41]
+    assert ah[60] == grids[60]
+    ah.clear_after(70)
+    gol.grid = ah.move_to(70)
+    gol.apply_rule()
+    ah.append_automaton_state(gol, iteration=True)
+    assert ah[71] == grids[71]
+    assert ah[65] == grids[65]
+
+
+def test_memory_budget_lazy_copy():
+    gol = GameOfLife(10, 12)
+    gol.random_initialize()
+    # an automaton which cannot be copied
+    gol.lock = Lock()
+    ah = AutomatonHistory()
+    ah.append_automaton_state(gol)
+    for _ in range(10):
+        gol.apply_rule()
+        ah.append_automaton_state(gol, iteration=True)
+    assert len(ah) == 11
+    ah = AutomatonHistory(max_bytes=1)
+    ah.append_automaton_state(gol)
+    gol.apply_rule()
+    with raises(TypeError):
+        ah.append_automaton_state(gol, iteration=True)
+
+
+def test_memory_budget_hashlife():
+    hla = HashLifeAutomaton(16, 16)
+    hla.grid[1][2] = LifeLikeAutomaton.LIFE
+    hla.grid[2][3] = LifeLikeAutomaton.LIFE
+    for y in range(1, 4):
+        hla.grid[3][y] = LifeLikeAutomaton.LIFE
+    # the glider enters the grid from outside
+    hla.origin = (12, 12)
+    ah = AutomatonHistory(keyframe_interval=4, max_bytes=200)
+    assert not any(s is LifeLikeAutomaton.LIFE for line in hla.grid for s in line)
+    grids = [deepcopy(hla.grid)]
+    ah.append_automaton_state(hla)
+    for _ in range(60):
+        hla.apply_rule()
+        grids.append(deepcopy(hla.grid))
+        ah.append_automaton_state(hla, iteration=True)
+    assert sum(s is LifeLikeAutomaton.LIFE for line in hla.grid for s in line) == 5
+    for i in range(61):
+        assert ah.move_to(i, view=True) == grids[i]
+
+
+def test_memory_budget_not_iterations():
+    ah = AutomatonHistory(None, keyframe_interval=4, max_bytes=50)
+    grids = []
+    for i in range(20):
+        grids.append([[i, 0], [0, i]])
+        ah.append(grids[-1])
+    # the steps are not iterations of an automaton, they can't be evicted
+    assert ah.nbytes > ah.max_bytes
+    assert [ah[i] for i in range(20)] == grids
+
+    gol = GameOfLife(10, 10)
+    gol.random_initialize()
+    grids = []
+    ah = AutomatonHistory(None, keyframe_interval=4, max_bytes=100)
+    for _ in range(20):
+        grids.append(deepcopy(gol.grid))
+        # the grid is edited, it is not an iteration of the automaton
+        ah.append_automaton_state(gol)
+        gol.apply_rule()
+    assert ah.nbytes > ah.max_bytes
+    assert [ah[i] for i in range(20)] == grids
+
+
+def test_view():
+    ah = AutomatonHistory(keyframe_interval=4)
+    grids = [[[i, 0], [0, i]] for i in range(6)]
+    for grid in grids:
+        ah.append(grid)
+    ah.append("lol")
+    assert isinstance(ah.view(3), FrameView)
+    assert ah.view(3) == grids[3]
+    assert ah.view(-1) == "lol"
+    assert ah.move_to(2, view=True) == grids[2]
+    assert ah.move_forward(view=True) == grids[3]
+    assert ah.move_backward(3, view=True) == grids[0]
+    assert ah.current_index == 0
+    with raises(IndexError):
+        ah.view(7)
+
+    gol = GameOfLife(10, 12)
+    gol.random_initialize()
+    ah = AutomatonHistory()
+    ah.append_automaton_state(gol)
+    grid = deepcopy(gol.grid)
+    gol.apply_rule()
+    gol.load_frame(ah.view(0))
+    # the stored array is not copied
+    assert np.shares_memory(gol.cells, ah.view(0).cells)
+    assert gol.grid == grid
+
+
+def test_shared_frames():
+    ah = AutomatonHistory(keyframe_interval=4)
+    still = [[0] * 10 for _ in range(10)]
+    for _ in range(50):
+        ah.append(still)
+    # one keyframe, the other steps share it or are empty change lists
+    assert ah.nbytes == 100
+    assert ah[49] == still
+    assert np.shares_memory(ah.view(0).cells, ah.view(48).cells)
+
+    ah.clear()
+    blinker = [[[0] * 5 for _ in range(5)] for _ in range(2)]
+    for i in range(1, 4):
+        blinker[0][2][i] = blinker[1][i][2] = 1
+    for i in range(50):
+        ah.append(blinker[i % 2])
+    # a keyframe, a change list of 4 cells and a keyframe when the step is repeated, the next steps share them
+    assert ah.nbytes == 2 * 25 + 2 * 4
+    assert [ah[i] for i in range(50)] == [blinker[i % 2] for i in range(50)]
+    ah.clear_after(0)
+    assert ah.nbytes == 25
+    ah[0] = blinker[1]
+    ah.append(blinker[1])
+    assert ah.nbytes == 25
+    assert ah[1] == blinker[1]
@@ -22,7 +22,7 @@
 
 from time import sleep, time
 
-from qmaton import Automaton, AutomatonHistory, AutomatonRunner, State
+from qmaton import Automaton, AutomatonHistory, AutomatonRunner, CycleAction, CycleDetector, LifeLikeAutomaton, State
 
 
 class DumbAutomaton(Automaton):
@@ -52,6 +52,8 @@ def test_init():
     assert ar.nb_iter == 6
     assert ar.sleep_time == 1 / 3
     assert ar.history is None
+    assert ar.cycle_detector is None
+    assert ar.on_cycle == CycleAction.STOP
     ar = AutomatonRunner(history=AutomatonHistory())
     assert ar.history is not None
 
@@ -97,3 +99,51 @@ def test_launch_too_long(capsys):
     out = capsys.readouterr().out.splitlines()
     assert len(out) == 5
     assert all(s.startswith("Iteration took too long") for s in out)
+
+
+def test_launch_finished():
+    dab = DumbAutomaton(2, 3)
+    ar = AutomatonRunner(-1, 1000)
+    finished = []
+
+    def callback(automaton):
+        automaton.callback(automaton)
+        if automaton.callback_cpt == 3:
+            ar.stop()
+
+    ar.launch(dab, callback, lambda: finished.append(dab.callback_cpt))
+    assert finished == [3]
+    ar = AutomatonRunner(2, 1000)
+    ar.launch(dab, dab.callback, lambda: finished.append(dab.callback_cpt))
+    assert finished == [3, 5]
+
+
+def test_launch_with_cycle():
+    lla = LifeLikeAutomaton(6, 7)
+    for y in range(2, 5):
+        lla.grid[2][y] = LifeLikeAutomaton.LIFE
+    horizontal = lla.cells.copy()
+    grids = []
+    # the blinker has a period of 2, the runner stops after 2 iterations
+    ar = AutomatonRunner(100, 1000, cycle_detector=CycleDetector())
+    ar.launch(lla, lambda automaton: grids.append(automaton.cells.copy()))
+    assert len(grids) == 2
+    assert ar.cycle_detector.period == 2
+    assert (lla.cells == horizontal).all()
+
+    # go directly to the last iteration
+    grids.clear()
+    ar = AutomatonRunner(101, 1000, AutomatonHistory(), CycleDetector(), CycleAction.FAST_FORWARD)
+    ar.launch(lla, lambda automaton: grids.append(automaton.cells.copy()))
+    assert len(grids) == 3
+    assert len(ar.history) == 4
+    assert (lla.cells != horizontal).any()
+    ar.nb_iter = 99
+    ar.launch(lla)
+    assert (lla.cells == horizontal).all()
+
+    # only report the cycle
+    ar = AutomatonRunner(11, 1000, cycle_detector=CycleDetector(), on_cycle=CycleAction.CONTINUE)
+    ar.launch(lla, lambda automaton: grids.append(automaton.cells.copy()))
+    assert ar.cycle_detector.step == 11
+    assert ar.cycle_detector.equivalent_step(11) == 1
@@ -19,9 +19,12 @@
 
 """Test file for AutomatonSerializer class"""
 
+import io
 import json
 
-from qmaton import Automaton, AutomatonSerializer, State
+import numpy as np
+import pytest
+from qmaton import ArrayAutomaton, Automaton, AutomatonSerializer, FrameView, State
 
 
 class DumbAutomaton(Automaton):
@@ -53,3 +56,102 @@ def test_fromJSON():
     out = json.loads(json.dumps(dab, cls=AutomatonSerializer), object_hook=AutomatonSerializer.decode)
     assert out["grid_size"] == dab.grid_size
     assert out["grid"] == dab.grid
+
+
+LIFE = State("life", "#fff")
+DEATH = State("death", "#000")
+
+
+def test_dump():
+    automaton = ArrayAutomaton(3, 4)
+    automaton.states = [DEATH, LIFE]
+    automaton.cells = np.array([[0, 0, 1, 1], [1, 1, 1, 1], [0, 1, 0, 0]], dtype=np.uint8)
+    file = io.StringIO()
+    AutomatonSerializer.dump(automaton, file)
+    lines = file.getvalue().splitlines()
+    # one line per row
+    assert len(lines) == 5
+    assert lines[1:] == ["[2,0,2,1],", "[4,1],", "[1,0,1,1,2,0]", "]}"]
+    out = json.loads(file.getvalue())
+    assert out["version"] == 2
+    assert out["grid_size"] == [3, 4]
+    assert out["states"] == [["death", "#000"], ["life", "#fff"]]
+
+
+def test_dump_grid():
+    dab = DumbAutomaton(2, 3)
+    dab.grid[1][2] = LIFE
+    file = io.StringIO()
+    AutomatonSerializer.dump(dab, file)
+    out = json.loads(file.getvalue())
+    # the states missing from the list of states are added to the palette
+    assert out["states"] == [["state", "#000"], ["life", "#fff"]]
+    assert out["rows"] == [[3, 0], [2, 0, 1, 1]]
+
+    dab.grid[0][0] = "lol"
+    with pytest.raises(ValueError):
+        AutomatonSerializer.dump(dab, io.StringIO())
+
+
+def test_load():
+    automaton = ArrayAutomaton(50, 70)
+    automaton.states = [DEATH, LIFE, State("other", "#f00")]
+    automaton.random_initialize()
+    file = io.StringIO()
+    AutomatonSerializer.dump(automaton, file)
+    file.seek(0)
+    out = AutomatonSerializer.load(file)
+    assert out["version"] == 2
+    assert out["grid_size"] == (50, 70)
+    assert isinstance(out["grid"], FrameView)
+    assert out["grid"].palette == tuple(automaton.states)
+    assert np.array_equal(out["grid"].cells, automaton.cells)
+
+
+def test_load_stream(monkeypatch):
+    """Rows longer than the chunks are read in several times."""
+    import qmaton.automaton_serializer
+
+    monkeypatch.setattr(qmaton.automaton_serializer, "CHUNK_SIZE", 7)
+    automaton = ArrayAutomaton(20, 300)
+    automaton.states = [DEATH, LIFE]
+    automaton.random_initialize()
+    file = io.StringIO(automaton.toJSON())
+    out = AutomatonSerializer.load(file)
+    assert np.array_equal(out["grid"].cells, automaton.cells)
+
+
+def test_load_version_1():
+    dab = DumbAutomaton(3, 4)
+    out = AutomatonSerializer.load(io.StringIO(json.dumps(dab, indent=4, cls=AutomatonSerializer)))
+    assert out["version"] == 1
+    assert out["grid_size"] == dab.grid_size
+    assert out["grid"] == dab.grid
+
+
+def test_load_empty_grid():
+    automaton = ArrayAutomaton(0, 5)
+    automaton.states = [DEATH]
+    out = AutomatonSerializer.load(io.StringIO(automaton.toJSON()))
+    assert out["grid_size"] == (0, 5)
+    assert out["grid"].cells.shape == (0, 5)
+
+
+@pytest.mark.parametrize(
+    "rows",
+    [
+        "[2,0,1,1],\n[2,0]",  # too short
+        "[2,0,1,1],\n[3,2]",  # unknown state
+        "[2,0,1,1],\n[3]",  # not pairs
+        "[2,0,1,1]",  # missing row
+    ],
+)
+def test_load_corrupted(rows):
+    data = '{"version": 2, "grid_size": [2, 3], "states": [["death", "#000"], ["life", "#fff"]], "rows": [\n'
+    with pytest.raises(ValueError):
+        AutomatonSerializer.load(io.StringIO(data + rows + "\n]}"))
+
+
+def test_load_unknown_version():
+    with pytest.raises(ValueError):
+        AutomatonSerializer.load(io.StringIO('{"version": 3, "grid_size": [0, 0], "states": [], "rows": []}'))
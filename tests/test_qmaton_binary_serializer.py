@@ -0,0 +1,107 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#    QMaton is a Python/Qt software used to run cellular automatons.
+#    Copyright (C) 2021  Rémi Ducceschi (remileduc) <remi.ducceschi@gmail.com>
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Test file for BinarySerializer class"""
+
+import numpy as np
+from automaton import GameOfFire
+from pytest import mark, raises
+from qmaton import Automaton, BinarySerializer, Compression, LifeLikeAutomaton, State
+
+
+class DumbAutomaton(Automaton):
+    STATES = [State(f"state {i}", f"#{i:03}") for i in range(300)]
+
+    def __init__(self, width, length):
+        super().__init__(width, length, DumbAutomaton.STATES[0])
+        self.states = DumbAutomaton.STATES[:3]
+
+
+@mark.parametrize("compression", list(Compression))
+def test_dumps(compression):
+    dab = DumbAutomaton(3, 4)
+    dab.grid[1][2] = DumbAutomaton.STATES[2]
+    data = BinarySerializer.dumps(dab, compression)
+    assert data.startswith(b"QMATON")
+    out = BinarySerializer.loads(data)
+    assert out["grid_size"] == (3, 4)
+    assert out["states"] == DumbAutomaton.STATES[:3]
+    assert out["cells"].tolist() == [[0, 0, 0, 0], [0, 0, 2, 0], [0, 0, 0, 0]]
+    if compression == Compression.NONE:
+        # header, 3 states of 7 + 4 characters with their sizes, 12 cells of 2 bits
+        assert len(data) == 20 + 3 * 15 + 3
+
+
+@mark.parametrize("nb_states", [1, 2, 3, 4, 5, 16, 17, 256, 257])
+def test_bits_per_cell(nb_states):
+    dab = DumbAutomaton(5, 7)
+    dab.states = DumbAutomaton.STATES[:nb_states]
+    dab.random_initialize()
+    out = BinarySerializer.loads(BinarySerializer.dumps(dab))
+    assert out["states"] == dab.states
+    assert [[out["states"][i] for i in line] for line in out["cells"]] == dab.grid
+
+
+def test_unknown_state():
+    dab = DumbAutomaton(2, 2)
+    # a state used in the grid but not in the list of states is saved too
+    dab.grid[0][0] = DumbAutomaton.STATES[10]
+    out = BinarySerializer.loads(BinarySerializer.dumps(dab))
+    assert out["states"] == DumbAutomaton.STATES[:3] + [DumbAutomaton.STATES[10]]
+    assert out["cells"].tolist() == [[3, 0], [0, 0]]
+    dab.grid[0][0] = "lol"
+    with raises(ValueError):
+        BinarySerializer.dumps(dab)
+
+
+def test_corrupted():
+    dab = DumbAutomaton(3, 4)
+    data = BinarySerializer.dumps(dab, Compression.NONE)
+    for corrupted in (b"", b"lol" + data[3:], data[:-1], data[:25], data[:8] + b"\x09" + data[9:]):
+        with raises(ValueError):
+            BinarySerializer.loads(corrupted)
+    with raises(ValueError):
+        BinarySerializer.loads(data[:6] + b"\x02" + data[7:])
+    with raises(ValueError):
+        BinarySerializer.loads(BinarySerializer.dumps(dab)[:-2])
+
+
+def test_toBinary():
+    dab = DumbAutomaton(3, 4)
+    dab.random_initialize()
+    loaded = DumbAutomaton.fromBinary(dab.toBinary())
+    assert loaded.grid == dab.grid
+    assert loaded.grid_size == dab.grid_size
+    assert len(dab.toBinary(Compression.LZMA)) > 0
+
+    gof = GameOfFire(50, 60)
+    gof.random_initialize()
+    loaded = GameOfFire.fromBinary(gof.toBinary())
+    # the cells are loaded as an array, without State per cell
+    assert isinstance(loaded.cells, np.ndarray)
+    assert (loaded.cells == gof.cells).all()
+    assert loaded.grid == gof.grid
+
+    lla = LifeLikeAutomaton(20, 70)
+    lla.random_initialize()
+    loaded = LifeLikeAutomaton.fromBinary(lla.toBinary(Compression.NONE))
+    assert (loaded.cells == lla.cells).all()
+    with raises(ValueError):
+        LifeLikeAutomaton.fromBinary(gof.toBinary())
@@ -0,0 +1,148 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#    QMaton is a Python/Qt software used to run cellular automatons.
+#    Copyright (C) 2021  Rémi Ducceschi (remileduc) <remi.ducceschi@gmail.com>
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Test file for CycleDetector class"""
+
+from automaton import GameOfLife
+from pytest import raises
+from qmaton import Automaton, CycleDetector, LifeLikeAutomaton, State
+
+
+class CountAutomaton(Automaton):
+    """Each cell counts modulo 3, after an offset of 2 steps."""
+
+    def __init__(self):
+        super().__init__(2, 3, -2)
+        self.rule = lambda x, y: self.grid[x][y] + 1 if self.grid[x][y] < 2 else 0
+
+
+def blinker():
+    lla = LifeLikeAutomaton(6, 7)
+    for y in range(2, 5):
+        lla.grid[2][y] = LifeLikeAutomaton.LIFE
+    return lla
+
+
+def test_init():
+    cd = CycleDetector()
+    assert cd.max_period == 1000
+    assert cd.step == -1
+    assert cd.start is None
+    assert cd.period is None
+    assert cd.equivalent_step(12) == 12
+
+
+def test_fixed_point():
+    lla = LifeLikeAutomaton(6, 7)
+    lla.grid[1][1] = lla.grid[1][2] = lla.grid[2][1] = LifeLikeAutomaton.LIFE
+    cd = CycleDetector()
+    assert not cd.update(lla)
+    lla.apply_rule()
+    # the corner becomes a block, which is a still life
+    assert not cd.update(lla)
+    lla.apply_rule()
+    assert cd.update(lla)
+    assert cd.step == 2
+    assert cd.start == 1
+    assert cd.period == 1
+    assert cd.equivalent_step(1000) == 1
+    assert cd.equivalent_step(0) == 0
+
+
+def test_oscillator():
+    lla = blinker()
+    cd = CycleDetector()
+    hashes = []
+    for _ in range(3):
+        cd.update(lla)
+        hashes.append(cd.hash)
+        lla.apply_rule()
+    assert hashes[0] == hashes[2]
+    assert hashes[0] != hashes[1]
+    assert cd.start == 0
+    assert cd.period == 2
+    assert cd.equivalent_step(7) == 1
+    # the hash is updated from the changed cells, it is the same as the hash of the whole grid
+    cd2 = CycleDetector()
+    cd2.update(lla)
+    assert cd2.hash == hashes[1]
+    cd.reset()
+    assert cd.step == -1
+    assert cd.period is None
+
+
+def test_changed_cells():
+    gol = GameOfLife(20, 20)
+    gol.random_initialize()
+    cd = CycleDetector()
+    cd.update(gol)
+    for _ in range(30):
+        gol.apply_rule()
+        assert gol.changed_cells is not None
+        cd.update(gol)
+        reference = CycleDetector()
+        reference.update(gol)
+        assert cd.hash == reference.hash
+    # only the changed cells given by the automaton are compared, not the whole grid
+    gol.apply_rule()
+    gol.cells[0, 0] = 1 - gol.cells[0, 0]
+    cd.update(gol)
+    reference = CycleDetector()
+    reference.update(gol)
+    assert cd.hash != reference.hash
+    # the whole grid is compared once the cells were set
+    gol.apply_rule()
+    gol.cells = gol.cells.copy()
+    assert gol.changed_cells is None
+    cd.reset()
+    cd.update(gol)
+    gol.cells = 1 - gol.cells
+    cd.update(gol)
+    reference = CycleDetector()
+    reference.update(gol)
+    assert cd.hash == reference.hash
+
+
+def test_grid():
+    ca = CountAutomaton()
+    cd = CycleDetector()
+    for step in range(5):
+        assert cd.update(ca) == (step == 5)
+        ca.apply_rule()
+    assert cd.update(ca)
+    assert cd.start == 2
+    assert cd.period == 3
+    assert cd.equivalent_step(10) == 4
+    ca.grid[0][0] = [0]
+    with raises(ValueError):
+        cd.update(ca)
+
+
+def test_max_period():
+    lla = blinker()
+    cd = CycleDetector(1)
+    for _ in range(10):
+        assert not cd.update(lla)
+        lla.apply_rule()
+    ca = CountAutomaton()
+    ca.states = [State("lol", "#000")]
+    cd = CycleDetector(3)
+    assert not any(cd.update(ca) or ca.apply_rule() for _ in range(5))
+    assert cd.update(ca)
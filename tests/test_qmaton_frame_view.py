@@ -0,0 +1,70 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#    QMaton is a Python/Qt software used to run cellular automatons.
+#    Copyright (C) 2021  Rémi Ducceschi (remileduc) <remi.ducceschi@gmail.com>
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Test file for FrameView class"""
+
+import numpy as np
+from pytest import raises
+from qmaton import FrameView
+
+
+def test_init():
+    cells = np.array([[0, 1, 2], [2, 1, 0]], dtype=np.uint8)
+    fv = FrameView(cells, ["a", "b", "c"])
+    assert fv.shape == (2, 3)
+    assert fv.palette == ("a", "b", "c")
+    assert len(fv) == 2
+    assert np.shares_memory(fv.cells, cells)
+    assert not fv.cells.flags.writeable
+    assert cells.flags.writeable
+    with raises(ValueError):
+        fv.cells[0, 0] = 1
+
+
+def test_read():
+    cells = np.array([[0, 1, 2], [2, 1, 0]], dtype=np.uint8)
+    fv = FrameView(cells, ["a", "b", "c"])
+    assert fv[0][1] == "b"
+    assert fv[1, 0] == "c"
+    assert fv[-1][-1] == "a"
+    assert len(fv[0]) == 3
+    assert list(fv[1]) == ["c", "b", "a"]
+    assert fv[0][1:] == ["b", "c"]
+    assert [list(line) for line in fv] == [["a", "b", "c"], ["c", "b", "a"]]
+    assert fv[1:] == [["c", "b", "a"]]
+    assert "c" in fv[0]
+    with raises(IndexError):
+        fv[2]
+    with raises(TypeError):
+        fv[0][0] = "c"
+
+
+def test_copy():
+    cells = np.array([[0, 1], [1, 1]], dtype=np.uint8)
+    fv = FrameView(cells, ["a", "b"])
+    grid = fv.copy()
+    assert grid == [["a", "b"], ["b", "b"]]
+    grid[0][0] = "b"
+    assert fv[0][0] == "a"
+    assert fv == [["a", "b"], ["b", "b"]]
+    assert fv != grid
+    assert fv == FrameView(np.array([[1, 0], [0, 0]]), ["b", "a"])
+    assert fv[0] == ["a", "b"]
+    assert fv[0] == fv[0]
@@ -0,0 +1,204 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#    QMaton is a Python/Qt software used to run cellular automatons.
+#    Copyright (C) 2021  Rémi Ducceschi (remileduc) <remi.ducceschi@gmail.com>
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Test file for HashLife and HashLifeAutomaton classes"""
+
+import numpy as np
+from pytest import fixture, mark, raises
+from qmaton import (
+    AutomatonRunner,
+    EdgeRule,
+    HashLife,
+    HashLifeAutomaton,
+    LifeLikeAutomaton,
+    LifeLikeRule,
+    MooreNeighborhood,
+)
+
+L = LifeLikeAutomaton.LIFE
+D = LifeLikeAutomaton.DEATH
+GLIDER = np.array([[0, 1, 0], [0, 0, 1], [1, 1, 1]], dtype=bool)
+R_PENTOMINO = np.array([[0, 1, 1], [1, 1, 0], [0, 1, 0]], dtype=bool)
+
+
+@fixture
+def universe():
+    u = HashLife(LifeLikeRule.parse("B3/S23"))
+    u.set_region(-1, -1, R_PENTOMINO)
+    return u
+
+
+def test_init():
+    u = HashLife(LifeLikeRule.parse("B3/S23"))
+    assert u.population == 0
+    assert u.generation == 0
+    assert u.root is u.empty(3)
+    with raises(ValueError):
+        HashLife(LifeLikeRule.parse("B0/S8"))
+
+
+def test_nodes():
+    u = HashLife(LifeLikeRule.parse("B3/S23"))
+    e = u.empty(2)
+    assert e.level == 2
+    assert u.node(e, e, e, e) is u.empty(3)
+    assert u.node(e, e, e, e) is u.node(e, e, e, e)
+
+
+def test_region(universe):
+    assert universe.population == 5
+    assert universe.get_cell(-1, 0)
+    assert not universe.get_cell(-1, -1)
+    assert not universe.get_cell(1000, 1000)
+    assert (universe.get_region(-1, -1, 3, 3) == R_PENTOMINO).all()
+    assert universe.bounding_box() == (-1, -1, 3, 3)
+    universe.set_region(100, -200, GLIDER)
+    assert universe.population == 10
+    assert (universe.get_region(100, -200, 3, 3) == GLIDER).all()
+    assert universe.bounding_box() == (-1, -200, 104, 202)
+
+
+def test_advance_glider():
+    u = HashLife(LifeLikeRule.parse("B3/S23"))
+    u.set_region(0, 0, GLIDER)
+    u.advance(4)
+    assert u.generation == 4
+    assert (u.get_region(1, 1, 3, 3) == GLIDER).all()
+    u.advance(4 * 1000 - 4)
+    assert u.population == 5
+    assert u.bounding_box() == (1000, 1000, 3, 3)
+
+
+def test_advance_r_pentomino(universe):
+    # the R-pentomino stabilizes at generation 1103 with 116 cells
+    universe.advance(1103)
+    assert universe.population == 116
+    universe.advance(2**20)
+    assert universe.population == 116
+    with raises(ValueError):
+        universe.advance(-1)
+
+
+@mark.parametrize("rulestring", ("B3/S23", "B36/S23", "B2/S"))
+@mark.parametrize("nb_generations", (1, 2, 7, 16))
+def test_advance_life_like(rulestring, nb_generations):
+    soup = np.random.default_rng().random((16, 16)) < 0.4
+    size = 16 + 2 * nb_generations + 2
+    reference = LifeLikeAutomaton(size, size, rulestring)
+    reference.neighborhood = MooreNeighborhood(EdgeRule.IGNORE_MISSING_NEIGHBORS_OF_EDGE_CELLS)
+    alive = np.zeros((size, size), dtype=bool)
+    alive[nb_generations + 1 : nb_generations + 17, nb_generations + 1 : nb_generations + 17] = soup
+    reference.cells = np.where(alive, 0, 1).astype(reference.dtype)
+    u = HashLife(LifeLikeRule.parse(rulestring))
+    u.set_region(0, 0, alive)
+    for _ in range(nb_generations):
+        reference.apply_rule()
+    u.advance(nb_generations)
+    assert (u.get_region(0, 0, size, size) == (reference.cells == 0)).all()
+
+
+def test_collect_nodes():
+    reference = HashLife(LifeLikeRule.parse("B3/S23"))
+    reference.set_region(-1, -1, R_PENTOMINO)
+    u = HashLife(LifeLikeRule.parse("B3/S23"), max_nodes=2000)
+    u.set_region(-1, -1, R_PENTOMINO)
+    for _ in range(200):
+        reference.advance(1)
+        u.advance(1)
+        assert u.nb_nodes <= 2000
+    assert reference.nb_nodes > 2000
+    assert u.population == reference.population
+    x, y, length, width = reference.bounding_box()
+    assert u.bounding_box() == (x, y, length, width)
+    assert (u.get_region(x, y, length, width) == reference.get_region(x, y, length, width)).all()
+    # the nodes are still unique
+    e = u.empty(3)
+    assert u.node(e, e, e, e) is u.empty(4)
+    u.advance(1103 - 200)
+    assert u.population == 116
+
+
+def test_macrocell(universe):
+    universe.advance(1000)
+    text = universe.to_macrocell()
+    assert text.startswith("[M2]")
+    assert "#R B3/S23\n" in text
+    assert "#G 1000\n" in text
+    u = HashLife.from_macrocell(text)
+    assert u.generation == 1000
+    assert u.population == universe.population
+    assert u.bounding_box() == universe.bounding_box()
+    x, y, length, width = u.bounding_box()
+    assert (u.get_region(x, y, length, width) == universe.get_region(x, y, length, width)).all()
+
+
+def test_read_macrocell():
+    # a glider in a 16x16 node
+    u = HashLife.from_macrocell("[M2] (golly 4.0)\n#R B36/S23\n.*$..*$***$\n4 0 0 0 1\n")
+    assert u.rule == LifeLikeRule.parse("B36/S23")
+    assert u.root.level == 4
+    assert (u.get_region(0, 0, 3, 3) == GLIDER).all()
+    with raises(ValueError):
+        HashLife.from_macrocell("[M2]\n4 0 0 0 1\n")
+
+
+def test_automaton():
+    hla = HashLifeAutomaton(6, 6)
+    assert hla.generation == 0
+    assert hla.step == 1
+    assert hla.origin == (0, 0)
+    hla.grid[1][2] = L
+    hla.grid[2][3] = L
+    for y in range(1, 4):
+        hla.grid[3][y] = L
+    hla.apply_rule()
+    assert hla.generation == 1
+    assert hla.universe.population == 5
+    # the glider leaves the grid but keeps living in the universe
+    hla.advance_to(40)
+    assert not any(s is L for line in hla.grid for s in line)
+    assert hla.universe.population == 5
+    hla.origin = (11, 11)
+    assert sum(s is L for line in hla.grid for s in line) == 5
+    with raises(ValueError):
+        hla.advance_to(10)
+    hla.clear_grid()
+    assert hla.universe.population == 0
+
+
+def test_automaton_runner():
+    hla = HashLifeAutomaton(10, 10)
+    hla.cells = np.where(np.pad(R_PENTOMINO, ((4, 3), (4, 3))), 0, 1).astype(hla.dtype)
+    hla.step = 64
+    AutomatonRunner(2, 1000).launch(hla)
+    assert hla.generation == 128
+
+
+def test_automaton_macrocell():
+    hla = HashLifeAutomaton(5, 5, "B36/S23")
+    hla.grid[0][0] = L
+    hla.grid[0][1] = L
+    hla.grid[1][1] = L
+    text = hla.to_macrocell()
+    other = HashLifeAutomaton(5, 5)
+    other.read_macrocell(text)
+    assert str(other.life_rule) == "B36/S23"
+    assert other.origin == (0, 0)
+    assert other == hla
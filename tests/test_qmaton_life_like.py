@@ -0,0 +1,141 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#    QMaton is a Python/Qt software used to run cellular automatons.
+#    Copyright (C) 2021  Rémi Ducceschi (remileduc) <remi.ducceschi@gmail.com>
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Test file for LifeLikeAutomaton class"""
+
+from copy import deepcopy
+
+import numpy as np
+from automaton import GameOfLife
+from pytest import mark, raises
+from qmaton import EdgeRule, LifeLikeAutomaton, LifeLikeRule, MooreNeighborhood, VonNeumannNeighborhood
+
+L = LifeLikeAutomaton.LIFE
+D = LifeLikeAutomaton.DEATH
+
+
+@mark.parametrize(
+    ("rulestring", "births", "survivals"),
+    (("B3/S23", {3}, {2, 3}), ("b36s23", {3, 6}, {2, 3}), ("23/3", {3}, {2, 3}), ("B/S", set(), set())),
+)
+def test_parse(rulestring, births, survivals):
+    rule = LifeLikeRule.parse(rulestring)
+    assert rule.births == births
+    assert rule.survivals == survivals
+    assert LifeLikeRule.parse(str(rule)) == rule
+
+
+@mark.parametrize("rulestring", ("B9/S23", "B3S23X", "life", "3/2/3"))
+def test_parse_invalid(rulestring):
+    with raises(ValueError):
+        LifeLikeRule.parse(rulestring)
+
+
+def test_init():
+    lla = LifeLikeAutomaton(3, 70, "B36/S23")
+    assert lla.grid_size == (3, 70)
+    assert lla.states == [L, D]
+    assert str(lla.life_rule) == "B36/S23"
+    assert isinstance(lla.neighborhood, MooreNeighborhood)
+    assert lla.bits.shape == (3, 2)
+    assert lla.bits.dtype == np.uint64
+    assert not lla.bits.any()
+    assert all(s is D for line in lla.grid for s in line)
+
+
+def test_bits():
+    lla = LifeLikeAutomaton(3, 70)
+    lla.grid[1][0] = L
+    lla.grid[2][65] = L
+    assert lla.bits.tolist() == [[0, 0], [1, 0], [0, 2]]
+    lla.bits[0][1] = 1 << 5
+    assert lla.grid[0][69] is L
+    assert lla.cells[0][69] == 0
+    lla.random_initialize()
+    assert lla.bits[:, 1].max() < 1 << 6
+    assert (lla.pack(lla.unpack(lla.bits)) == lla.bits).all()
+
+
+def test_snapshot():
+    lla = LifeLikeAutomaton(3, 70)
+    lla.random_initialize()
+    bits = lla.bits
+    frame = lla.snapshot()
+    assert frame == lla.grid
+    # the automaton is still stored as bits
+    lla.bits = bits
+    lla.snapshot()
+    assert lla.bits is bits
+    lla.apply_rule()
+    assert frame.cells.tolist() == lla.unpack(bits).tolist()
+
+
+def test_game_of_life():
+    gol = GameOfLife(20, 70)
+    gol.random_initialize()
+    lla = LifeLikeAutomaton(20, 70)
+    lla.grid = gol.grid
+    for _ in range(5):
+        gol.apply_rule()
+        lla.apply_rule()
+        assert lla.grid == gol.grid
+
+
+@mark.parametrize("edge_rule", tuple(EdgeRule))
+@mark.parametrize("rulestring", ("B3/S23", "B0/S8", "B1357/S02468"))
+@mark.parametrize("grid_size", ((7, 5), (10, 64), (9, 129)))
+def test_apply_rule(edge_rule, rulestring, grid_size):
+    lla = LifeLikeAutomaton(*grid_size, rulestring)
+    lla.neighborhood = MooreNeighborhood(edge_rule)
+    lla.random_initialize()
+    reference = deepcopy(lla)
+    for _ in range(3):
+        lla.apply_rule()
+        reference.grid = [[reference.main_rule(x, y) for y in range(reference.width)] for x in range(reference.length)]
+        assert lla == reference
+
+
+def test_apply_rule_other_neighborhood():
+    lla = LifeLikeAutomaton(10, 12, "B2/S")
+    lla.neighborhood = VonNeumannNeighborhood(EdgeRule.IGNORE_MISSING_NEIGHBORS_OF_EDGE_CELLS)
+    lla.random_initialize()
+    reference = deepcopy(lla)
+    lla.apply_rule()
+    reference.grid = [[reference.main_rule(x, y) for y in range(reference.width)] for x in range(reference.length)]
+    assert lla == reference
+
+
+def test_read_pattern():
+    import io
+
+    lla = LifeLikeAutomaton(5, 6)
+    lla.read_pattern(io.StringIO("x = 3, y = 2, rule = B36/S23\n3o$obo!"), 1, 2)
+    assert str(lla.life_rule) == "B36/S23"
+    L, D = lla.state_index(LifeLikeAutomaton.LIFE), lla.state_index(LifeLikeAutomaton.DEATH)
+    expected = np.full((5, 6), D)
+    expected[1, 2:5] = L
+    expected[2, 2:5] = [L, D, L]
+    assert lla.cells.tolist() == expected.tolist()
+    # the pattern is clipped by the grid
+    lla.read_pattern(io.StringIO(".O\nOO"), 4, 4)
+    assert lla.cells[4, 5] == L
+    file = io.StringIO()
+    lla.write_pattern(file)
+    assert file.getvalue() == "x = 6, y = 5, rule = B36/S23\n$2b3o$2bobo2$5bo!\n"
@@ -0,0 +1,143 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#    QMaton is a Python/Qt software used to run cellular automatons.
+#    Copyright (C) 2021  Rémi Ducceschi (remileduc) <remi.ducceschi@gmail.com>
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Test file for MappedHistory class"""
+
+from copy import deepcopy
+from os import path
+
+from automaton import GameOfLife
+from pytest import raises
+from qmaton import AutomatonRunner, FrameView, MappedHistory
+
+
+def test_init():
+    mh = MappedHistory()
+    assert mh.path is None
+    assert mh.history_size is None
+    assert mh.nbytes == 0
+    assert len(mh) == 0
+    assert not mh
+    assert mh.current_index == -1
+    assert mh.remaining_steps == 0
+    mh.close()
+
+
+def test_append():
+    mh = MappedHistory(history_size=2000)
+    grids = [[[i % 7, 0, 1], [0, i % 5, 2]] for i in range(1500)]
+    for grid in grids:
+        mh.append(grid)
+        assert mh.get() == grid
+    assert len(mh) == 1500
+    assert mh.current_index == 1499
+    assert mh.nbytes == 1500 * 6
+    for i in (0, 1499, 700, 3, 1024):
+        assert mh[i] == grids[i]
+        assert mh.move_to(i) == grids[i]
+    assert mh.move_backward(3) == grids[1021]
+    assert mh.move_forward(2) == grids[1023]
+    assert mh[-1] == grids[-1]
+    with raises(IndexError):
+        mh[1500]
+    mh.close()
+
+
+def test_objects():
+    mh = MappedHistory(history_size=3)
+    mh.append([[1, 2], [3, 4]])
+    mh.append("lol")
+    mh.append([[1, [2]], [3, 4]])
+    assert [mh[i] for i in range(3)] == [[[1, 2], [3, 4]], "lol", [[1, [2]], [3, 4]]]
+    assert mh.nbytes == 4
+    with raises(IndexError):
+        mh.append("dumb")
+    # a step is written over the previous one if it fits
+    mh[0] = [[5, 6, 7]]
+    assert mh.nbytes == 4
+    mh[1] = [[1, 2], [3, 4], [5, 6]]
+    assert mh.nbytes == 10
+    mh[2] = [[True]]
+    assert [mh[i] for i in range(3)] == [[[5, 6, 7]], [[1, 2], [3, 4], [5, 6]], [[True]]]
+    assert mh[2][0][0] is True
+    mh.close()
+    # the palette is widened over 256 values
+    mh = MappedHistory()
+    grids = [[[i, i + 1, i + 2]] for i in range(0, 900, 3)]
+    for grid in grids:
+        mh.append(grid)
+    assert mh.nbytes == 85 * 3 + 215 * 3 * 2
+    assert [mh[i] for i in range(300)] == grids
+    mh.close()
+
+
+def test_clear(tmp_path):
+    file = str(tmp_path / "history.bin")
+    mh = MappedHistory(file)
+    assert mh.path == file
+    for i in range(10):
+        mh.append([[i, i], [i, i]])
+    assert path.getsize(file) == 40
+    mh.move_to(3)
+    mh.append([[42]])
+    assert len(mh) == 5
+    assert mh[4] == [[42]]
+    assert mh[3] == [[3, 3], [3, 3]]
+    assert path.getsize(file) == 17
+    mh.clear_after(1)
+    assert mh.nbytes == 8
+    assert mh.current_index == 1
+    mh.clear()
+    assert len(mh) == 0
+    assert path.getsize(file) == 0
+    mh.append([[7]])
+    assert mh.get() == [[7]]
+    mh.close()
+    assert path.exists(file)
+
+
+def test_runner():
+    gol = GameOfLife(10, 20)
+    gol.random_initialize()
+    grids = [deepcopy(gol.grid)]
+    mh = MappedHistory()
+    ar = AutomatonRunner(30, 1000, history=mh)
+    ar.launch(gol, lambda automaton: grids.append(deepcopy(automaton.grid)))
+    assert len(mh) == 31
+    assert [mh[i] for i in range(31)] == grids
+    mh.close()
+
+
+def test_view():
+    h = MappedHistory()
+    h.append([[1, 2], [3, 4]])
+    h.append([[5, 6], [7, 8]])
+    h.append("lol")
+    view = h.view(1)
+    assert isinstance(view, FrameView)
+    assert view == [[5, 6], [7, 8]]
+    assert h.view(-1) == "lol"
+    assert h.move_to(0, view=True) == [[1, 2], [3, 4]]
+    assert h.move_forward(view=True) == [[5, 6], [7, 8]]
+    assert h.move_backward(view=True) == [[1, 2], [3, 4]]
+    # the view is not changed by the history
+    h[1] = [[0, 0], [0, 0]]
+    assert view == [[5, 6], [7, 8]]
+    h.close()
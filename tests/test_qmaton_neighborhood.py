@@ -19,7 +19,7 @@
 
 """Test file for Neighborhood classes"""
 
-
+import numpy as np
 from pytest import mark
 from qmaton import (
     EdgeRule,
@@ -329,3 +329,77 @@ def test_hexagonal(coordinate, expected_neighborhood):
 def test_get_neighbor_coordinates(dimension, expected):
     n = MooreNeighborhood(edge_rule=EdgeRule.FIRST_AND_LAST_CELL_OF_DIMENSION_ARE_NEIGHBORS)
     assert tuple(n.get_neighbors_coordinates((1,) * dimension, (3,) * dimension)) == expected
+
+
+def test_edge_mask():
+    mask = Neighborhood.edge_mask((5, 4), 1)
+    assert mask.tolist() == [[Neighborhood.is_on_edge((x, y), (5, 4), 1) for y in range(4)] for x in range(5)]
+    cells = np.array([0, 5, 6, 9, 19])
+    assert Neighborhood.edge_mask((5, 4), 1, cells).tolist() == mask.reshape(-1)[cells].tolist()
+
+
+def test_compile():
+    n = VonNeumannNeighborhood()
+    kernel = n.compile()
+    assert kernel is n.compile()
+    assert kernel.kernel.tolist() == [[0, 1, 0], [1, 0, 1], [0, 1, 0]]
+    assert n.compile(3).kernel.sum() == 6
+    hexagonal = HexagonalNeighborhood().compile()
+    assert hexagonal.kernels[0].tolist() == [[1, 1, 1], [1, 0, 1], [0, 1, 0]]
+    assert hexagonal.kernels[1].tolist() == [[0, 1, 0], [1, 0, 1], [1, 1, 1]]
+
+
+@mark.parametrize("edge_rule", tuple(EdgeRule))
+@mark.parametrize(
+    "neighborhood_type",
+    (MooreNeighborhood, VonNeumannNeighborhood, RadialNeighborhood, HexagonalNeighborhood),
+)
+@mark.parametrize("radius", (1, 2))
+@mark.parametrize("grid_size", ((9, 8), (3, 4)))
+def test_kernel_count(neighborhood_type, edge_rule, radius, grid_size):
+    neighborhood = neighborhood_type(edge_rule, radius=radius)
+    mask = np.random.default_rng(42).random(grid_size) < 0.5
+    counts = neighborhood.compile().count(mask)
+    cells = np.arange(0, mask.size, 3)
+    assert neighborhood.compile().count(mask, cells).tolist() == counts.reshape(-1)[cells].tolist()
+    assert counts.tolist() == [
+        [
+            sum(1 for n in neighborhood.get_neighbors_coordinates((x, y), grid_size) if mask[n])
+            for y in range(grid_size[1])
+        ]
+        for x in range(grid_size[0])
+    ]
+
+
+@mark.parametrize("edge_rule", tuple(EdgeRule))
+@mark.parametrize("neighborhood_type", (MooreNeighborhood, HexagonalNeighborhood))
+def test_neighbor_table(neighborhood_type, edge_rule):
+    neighborhood = neighborhood_type(edge_rule)
+    table = neighborhood.compile().table((5, 6))
+    assert table is neighborhood_type(edge_rule).compile().table((5, 6))
+    assert table.indices.shape == (30, 6 if neighborhood_type is HexagonalNeighborhood else 8)
+    for i, (indices, valid) in enumerate(zip(table.indices, table.valid)):
+        expected = neighborhood.get_neighbors_coordinates(divmod(i, 6), (5, 6))
+        assert sorted(indices[valid].tolist()) == sorted(x * 6 + y for x, y in expected)
+        assert (indices[~valid] == i).all()
+    assert table.border.tolist() == [i for i in range(30) if Neighborhood.is_on_edge(divmod(i, 6), (5, 6), 1)]
+    # the rows of the border are built on their own
+    assert (table.border_indices == table.indices[table.border]).all()
+    assert (table.border_valid == table.valid[table.border]).all()
+
+
+@mark.parametrize("edge_rule", tuple(EdgeRule))
+@mark.parametrize(
+    "neighborhood_type",
+    (MooreNeighborhood, VonNeumannNeighborhood, RadialNeighborhood, HexagonalNeighborhood),
+)
+@mark.parametrize("grid_size", ((6, 6), (6, 7)))
+def test_neighbor_table_symmetric(neighborhood_type, edge_rule, grid_size):
+    table = neighborhood_type(edge_rule, radius=2).compile().table(grid_size)
+    ignored = np.zeros(table.indices.shape[0], dtype=bool)
+    if edge_rule == EdgeRule.IGNORE_EDGE_CELLS:
+        ignored = Neighborhood.edge_mask(grid_size, 2).reshape(-1)
+    neighbors = {(i, j) for i, (indices, valid) in enumerate(zip(table.indices, table.valid)) for j in indices[valid]}
+    assert table.symmetric == all((j, i) in neighbors or ignored[j] for i, j in neighbors)
+    odd_torus = edge_rule == EdgeRule.FIRST_AND_LAST_CELL_OF_DIMENSION_ARE_NEIGHBORS and grid_size[1] % 2
+    assert table.symmetric != (neighborhood_type is HexagonalNeighborhood and odd_torus)
@@ -0,0 +1,146 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#    QMaton is a Python/Qt software used to run cellular automatons.
+#    Copyright (C) 2021  Rémi Ducceschi (remileduc) <remi.ducceschi@gmail.com>
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Test file for PatternSerializer class"""
+
+import io
+
+import numpy as np
+from pytest import mark, raises
+from qmaton import PatternFormat, PatternSerializer
+
+GLIDER = np.array([[0, 1, 0], [0, 0, 1], [1, 1, 1]], dtype=bool)
+
+GLIDER_RLE = """#N Glider
+#C A comment
+x = 3, y = 3, rule = B3/S23
+bo$2bo$3o!
+"""
+
+GLIDER_CELLS = """!Name: Glider
+.O
+..O
+OOO
+"""
+
+GLIDER_LIFE_106 = """#Life 1.06
+0 -1
+1 0
+-1 1
+0 1
+1 1
+"""
+
+
+@mark.parametrize(
+    "filename, pattern_format",
+    [
+        ("glider.rle", PatternFormat.RLE),
+        ("glider.CELLS", PatternFormat.PLAINTEXT),
+        ("glider.lif", PatternFormat.LIFE_106),
+        ("glider.life", PatternFormat.LIFE_106),
+        ("glider.json", None),
+        ("glider", None),
+    ],
+)
+def test_from_filename(filename, pattern_format):
+    assert PatternFormat.from_filename(filename) == pattern_format
+
+
+@mark.parametrize(
+    "text, rule",
+    [(GLIDER_RLE, "B3/S23"), (GLIDER_CELLS, None), (GLIDER_LIFE_106, None)],
+)
+def test_load(text, rule):
+    pattern = PatternSerializer.load(io.StringIO(text))
+    assert np.array_equal(pattern["alive"], GLIDER)
+    assert pattern["rule"] == rule
+
+
+def test_load_rle():
+    text = "x = 5, y = 4, rule = B36/S23:T10,10\n2o$\n\n2$b.A2o!\nignored"
+    pattern = PatternSerializer.load(io.StringIO(text), PatternFormat.RLE)
+    assert pattern["alive"].astype(int).tolist() == [
+        [1, 1, 0, 0, 0],
+        [0, 0, 0, 0, 0],
+        [0, 0, 0, 0, 0],
+        [0, 0, 1, 1, 1],
+    ]
+    assert pattern["rule"] == "B36/S23"
+
+
+@mark.parametrize(
+    "text, pattern_format",
+    [
+        ("x = 2, y = 2\n3o!", PatternFormat.RLE),
+        ("x = 2, y = 2\no3$o!", PatternFormat.RLE),
+        ("bo$2bo$3o!", PatternFormat.RLE),
+        (".O\n.X", PatternFormat.PLAINTEXT),
+        ("#Life 1.06\n0 1 2", PatternFormat.LIFE_106),
+        ("#Life 1.06\n0 a", PatternFormat.LIFE_106),
+        ("Hello", None),
+    ],
+)
+def test_load_invalid(text, pattern_format):
+    with raises(ValueError):
+        PatternSerializer.load(io.StringIO(text), pattern_format)
+
+
+@mark.parametrize("pattern_format", list(PatternFormat))
+def test_dump(pattern_format):
+    alive = np.random.default_rng(0).random((40, 150)) < 0.3
+    alive[5:12] = False  # empty lines
+    alive[:, -1] = False
+    file = io.StringIO()
+    PatternSerializer.dump(alive, file, pattern_format, "B3/S23")
+    file.seek(0)
+    pattern = PatternSerializer.load(file)
+    loaded = pattern["alive"]
+    if pattern_format == PatternFormat.LIFE_106:
+        # the pattern is cropped to the living cells
+        rows, columns = np.nonzero(alive)
+        alive = alive[rows.min() : rows.max() + 1, columns.min() : columns.max() + 1]
+    assert np.array_equal(loaded, alive)
+
+
+def test_dump_rle():
+    file = io.StringIO()
+    PatternSerializer.dump(GLIDER, file, PatternFormat.RLE, "B3/S23")
+    assert file.getvalue() == "x = 3, y = 3, rule = B3/S23\nbo$2bo$3o!\n"
+    file = io.StringIO()
+    PatternSerializer.dump(np.ones((2, 200), dtype=bool), file)
+    lines = file.getvalue().splitlines()
+    assert lines == ["x = 200, y = 2", "200o$200o!"]
+    file = io.StringIO()
+    alive = np.zeros((1, 200), dtype=bool)
+    alive[0, ::2] = True
+    PatternSerializer.dump(alive, file)
+    assert all(len(line) <= 70 for line in file.getvalue().splitlines())
+
+
+def test_load_rle_batches(monkeypatch):
+    """The runs are decoded by batches of lines, a count can be split on 2 lines."""
+    import qmaton.pattern_serializer
+
+    monkeypatch.setattr(qmaton.pattern_serializer, "CHUNK_SIZE", 1)
+    pattern = PatternSerializer.load(io.StringIO("x = 12, y = 2\n1\n2o$\n3\nbo\n2!"))
+    assert pattern["alive"].astype(int).tolist() == [[1] * 12, [0, 0, 0, 1] + [0] * 8]
+    with raises(ValueError):
+        PatternSerializer.load(io.StringIO("x = 12, y = 2\n1\n2o$\n3"))
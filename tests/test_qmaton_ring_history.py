@@ -0,0 +1,134 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#    QMaton is a Python/Qt software used to run cellular automatons.
+#    Copyright (C) 2021  Rémi Ducceschi (remileduc) <remi.ducceschi@gmail.com>
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Test file for RingHistory class"""
+
+from copy import deepcopy
+
+from automaton import GameOfLife
+from pytest import raises
+from qmaton import AutomatonRunner, FrameView, RingHistory
+
+
+def test_init():
+    rh = RingHistory()
+    assert rh.history_size == 1000
+    assert rh.first_step == 0
+    assert rh.nbytes == 0
+    assert len(rh) == 0
+    assert not rh
+    assert rh.current_index == -1
+    assert rh.remaining_steps == 0
+    with raises(ValueError):
+        RingHistory(0)
+
+
+def test_roll():
+    rh = RingHistory(5)
+    grids = [[[i, 0], [0, i]] for i in range(12)]
+    for i, grid in enumerate(grids):
+        rh.append(grid)
+        assert rh.current_index == min(i, 4)
+        assert rh.remaining_steps == 0
+    assert len(rh) == 5
+    assert rh.first_step == 7
+    assert [rh[i] for i in range(5)] == grids[7:]
+    assert rh[-1] == grids[11]
+    assert rh.nbytes == 5 * 4
+    with raises(IndexError):
+        rh[5]
+    assert rh.move_backward(2) == grids[9]
+    assert rh.remaining_steps == 2
+    assert rh.move_forward() == grids[10]
+    # appending in the past clears the following steps
+    rh.append(grids[0])
+    assert len(rh) == 5
+    assert rh.remaining_steps == 0
+    assert [rh[i] for i in range(5)] == grids[7:11] + [grids[0]]
+    rh.append(grids[1])
+    assert rh.first_step == 8
+    assert rh.current_index == 4
+    assert rh.get() == grids[1]
+
+
+def test_objects():
+    rh = RingHistory(3)
+    rh.append([[1, 2], [3, 4]])
+    rh.append("lol")
+    rh.append([[1, 2, 3]])
+    rh.append([[1, [2]], [3, 4]])
+    assert [rh[i] for i in range(3)] == ["lol", [[1, 2, 3]], [[1, [2]], [3, 4]]]
+    rh.append([[5, 6, 7]])
+    rh[0] = [[8, 9, 10]]
+    assert [rh[i] for i in range(3)] == [[[8, 9, 10]], [[1, [2]], [3, 4]], [[5, 6, 7]]]
+    tmp = [[1, 2, 3]]
+    rh[1] = tmp
+    tmp[0][0] = 0
+    assert rh[1] == [[1, 2, 3]]
+    # the palette is widened over 256 values
+    grids = [[[i, i + 1, i + 2]] for i in range(0, 600, 3)]
+    for grid in grids:
+        rh.append(grid)
+    assert [rh[i] for i in range(3)] == grids[-3:]
+
+
+def test_clear():
+    rh = RingHistory(3)
+    for i in range(5):
+        rh.append([[i]])
+    rh.clear_after(1)
+    assert len(rh) == 2
+    assert rh.current_index == 1
+    assert rh[1] == [[3]]
+    rh.clear()
+    assert len(rh) == 0
+    assert rh.first_step == 0
+    assert rh.current_index == -1
+    rh.append([[7]])
+    assert rh.get() == [[7]]
+
+
+def test_runner():
+    gol = GameOfLife(10, 20)
+    gol.random_initialize()
+    grids = [deepcopy(gol.grid)]
+    rh = RingHistory(10)
+    ar = AutomatonRunner(30, 1000, history=rh)
+    ar.launch(gol, lambda automaton: grids.append(deepcopy(automaton.grid)))
+    assert len(rh) == 10
+    assert rh.first_step == 21
+    assert [rh[i] for i in range(10)] == grids[21:]
+
+
+def test_view():
+    h = RingHistory(3)
+    h.append([[1, 2], [3, 4]])
+    h.append([[5, 6], [7, 8]])
+    h.append("lol")
+    view = h.view(1)
+    assert isinstance(view, FrameView)
+    assert view == [[5, 6], [7, 8]]
+    assert h.view(-1) == "lol"
+    assert h.move_to(0, view=True) == [[1, 2], [3, 4]]
+    assert h.move_forward(view=True) == [[5, 6], [7, 8]]
+    assert h.move_backward(view=True) == [[1, 2], [3, 4]]
+    # the view is not changed by the history
+    h[1] = [[0, 0], [0, 0]]
+    assert view == [[5, 6], [7, 8]]
@@ -0,0 +1,101 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#    QMaton is a Python/Qt software used to run cellular automatons.
+#    Copyright (C) 2021  Rémi Ducceschi (remileduc) <remi.ducceschi@gmail.com>
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Test file for RuleTable and Transition classes"""
+
+from pytest import mark
+from qmaton import (
+    ArrayAutomaton,
+    EdgeRule,
+    HexagonalNeighborhood,
+    MooreNeighborhood,
+    RuleTable,
+    State,
+    Transition,
+    VonNeumannNeighborhood,
+)
+
+A = State("a", "#000")
+B = State("b", "#888")
+C = State("c", "#FFF")
+
+# a becomes b with 2 or 3 b neighbors and no c neighbor, b becomes c with at least 2 c neighbors, c becomes a
+TABLE = RuleTable(
+    ((B,), (C,)),
+    (
+        Transition(A, B, ({2, 3}, 0)),
+        Transition(B, C, (None, lambda n: n >= 2)),
+        Transition(C, A),
+    ),
+)
+
+
+class DumbAutomaton(ArrayAutomaton):
+    def __init__(self, width, length, neighborhood):
+        super().__init__(width, length, A)
+        self.states = [A, B, C]
+        self.rule = self.main_rule
+        self.rule_table = TABLE
+        self.neighborhood = neighborhood
+
+    def main_rule(self, x, y):
+        return TABLE.next_state(self, x, y)
+
+
+@mark.parametrize(
+    ("counts", "result"),
+    (((0,), False), ((2,), True), ((2, 0), True), ((3, 0), True), ((2, 1), False), ((4, 0), False)),
+)
+def test_transition_accepts(counts, result):
+    assert TABLE.transitions[0].accepts(counts) is result
+    assert TABLE.transitions[2].accepts(counts)
+
+
+def test_compile():
+    lookup = TABLE.compile([A, B, C], 4)
+    assert lookup.shape == (3, 5, 5)
+    assert lookup is TABLE.compile([A, B, C], 4)
+    assert lookup[0, 2, 0] == 1
+    assert lookup[0, 2, 1] == 0
+    assert lookup[1, 0, 2] == 2
+    assert lookup[1, 4, 1] == 1
+    assert (lookup[2] == 0).all()
+    # the lookup array uses the order of the given states
+    assert TABLE.compile([C, B, A], 4)[2, 2, 0] == 1
+
+
+@mark.parametrize(
+    "neighborhood",
+    (
+        MooreNeighborhood(),
+        VonNeumannNeighborhood(EdgeRule.IGNORE_MISSING_NEIGHBORS_OF_EDGE_CELLS),
+        HexagonalNeighborhood(EdgeRule.FIRST_AND_LAST_CELL_OF_DIMENSION_ARE_NEIGHBORS),
+    ),
+)
+def test_apply(neighborhood):
+    dab = DumbAutomaton(12, 9, neighborhood)
+    dab.random_initialize()
+    reference = DumbAutomaton(12, 9, neighborhood)
+    reference.rule_table = None
+    reference.grid = dab.grid
+    for _ in range(4):
+        dab.apply_rule()
+        reference.apply_rule()
+        assert dab == reference
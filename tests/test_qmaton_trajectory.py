@@ -0,0 +1,181 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#    QMaton is a Python/Qt software used to run cellular automatons.
+#    Copyright (C) 2021  Rémi Ducceschi (remileduc) <remi.ducceschi@gmail.com>
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Test file for TrajectoryRecorder, TrajectoryReader and TrajectoryAutomaton classes"""
+
+import os
+
+import numpy as np
+from automaton import GameOfLife
+from pytest import fixture, raises
+from qmaton import (
+    Automaton,
+    AutomatonHistory,
+    AutomatonRunner,
+    State,
+    TrajectoryAutomaton,
+    TrajectoryReader,
+    TrajectoryRecorder,
+)
+
+ON = State("on", "#000")
+OFF = State("off", "#FFF")
+
+
+class DumbAutomaton(Automaton):
+    def __init__(self, width, length):
+        super().__init__(width, length, OFF)
+        self.states = [ON, OFF]
+        self.rule = self.main_rule
+
+    def main_rule(self, x, y):
+        return ON if self.grid[x][y] == OFF else OFF
+
+
+@fixture
+def path(tmp_path):
+    return str(tmp_path / "run.qmtraj")
+
+
+def record(path, automaton, nb_steps, keyframe_interval=4):
+    """Record the initial state and nb_steps iterations, return the cells of each step."""
+    recorder = TrajectoryRecorder(path, keyframe_interval)
+    steps = []
+
+    def callback(automaton):
+        recorder.record(automaton)
+        steps.append(automaton.cells.copy())
+
+    callback(automaton)
+    AutomatonRunner(nb_steps, 1000).launch(automaton, callback)
+    recorder.close()
+    return steps
+
+
+def test_record_read(path):
+    gol = GameOfLife(30, 40)
+    gol.random_initialize()
+    steps = record(path, gol, 20)
+    reader = TrajectoryReader(path)
+    assert len(reader) == 21
+    assert reader.grid_size == (30, 40)
+    assert reader.states == gol.states
+    # random access, forward and backward
+    for step in (20, 3, 4, 5, 0, 17, 9, -1):
+        frame = reader[step]
+        assert np.array_equal(frame.cells, steps[step])
+        assert frame.palette == tuple(gol.states)
+    # a view doesn't change when other steps are read
+    frame = reader[10]
+    reader.view(11)
+    assert np.array_equal(frame.cells, steps[10])
+    with raises(IndexError):
+        reader.view(21)
+    reader.close()
+
+
+def test_record_grid(path):
+    dab = DumbAutomaton(3, 4)
+    dab.grid[0][0] = ON
+    recorder = TrajectoryRecorder(path)
+    recorder.record(dab)
+    dab.apply_rule()
+    dab.grid[1][1] = State("new", "#F00")
+    recorder.record(dab)
+    recorder.close()
+    reader = TrajectoryReader(path)
+    assert reader.states == [ON, OFF, State("new", "#F00")]
+    assert reader[0] == [[ON, OFF, OFF, OFF]] + [[OFF] * 4] * 2
+    assert reader[1] == dab.grid
+    dab.grid[0][0] = "lol"
+    with raises(ValueError):
+        TrajectoryRecorder(path).record(dab)
+
+
+def test_deltas(path):
+    gol = GameOfLife(100, 100)
+    gol.paste_pattern(np.array([[0, 1, 0], [0, 0, 1], [1, 1, 1]], dtype=bool), 10, 10)
+    record(path, gol, 40, keyframe_interval=16)
+    # the glider only changes a few cells: 3 key frames and small delta frames
+    assert os.path.getsize(path) < 3 * 10000
+
+
+def test_not_closed(path):
+    gol = GameOfLife(10, 10)
+    gol.random_initialize()
+    recorder = TrajectoryRecorder(path, 4)
+    steps = []
+    for _ in range(10):
+        recorder.record(gol)
+        steps.append(gol.cells.copy())
+        gol.apply_rule()
+    del recorder  # the file is closed without index
+    with open(path, "ab") as file:
+        file.write(b"\x01\x01\xff")  # incomplete record
+    reader = TrajectoryReader(path)
+    assert len(reader) == 10
+    assert reader.states == gol.states
+    assert np.array_equal(reader[7].cells, steps[7])
+
+
+def test_invalid(path):
+    with open(path, "wb") as file:
+        file.write(b"not a trajectory")
+    with raises(ValueError):
+        TrajectoryReader(path)
+    recorder = TrajectoryRecorder(path)
+    recorder.record(GameOfLife(3, 3))
+    with raises(ValueError):
+        recorder.record(GameOfLife(3, 4))
+    recorder.close()
+    with raises(ValueError):
+        recorder.record(GameOfLife(3, 3))
+
+
+def test_trajectory_automaton(path):
+    gol = GameOfLife(20, 20)
+    gol.random_initialize()
+    steps = record(path, gol, 10)
+    replay = TrajectoryAutomaton(TrajectoryReader(path))
+    assert replay.grid_size == (20, 20)
+    assert replay.step == 0
+    assert np.array_equal(replay.cells, steps[0])
+    AutomatonRunner(5, 1000).launch(replay)
+    assert replay.step == 5
+    assert np.array_equal(replay.cells, steps[5])
+    replay.seek(-1)
+    assert replay.step == 10
+    # the last step stays
+    replay.apply_rule()
+    assert replay.step == 10
+    assert replay.grid == gol.grid
+
+
+def test_trajectory_automaton_history(path):
+    gol = GameOfLife(20, 20)
+    gol.random_initialize()
+    steps = record(path, gol, 10)
+    replay = TrajectoryAutomaton(TrajectoryReader(path))
+    history = AutomatonHistory(keyframe_interval=4, max_bytes=1000)
+    AutomatonRunner(10, 1000, history=history).launch(replay)
+    assert replay.step == 10
+    assert len(history) == 11
+    for i in range(11):
+        assert np.array_equal(history.view(i).cells, steps[i])
@@ -21,8 +21,9 @@
 
 from os import remove
 
+from automaton import GameOfLife
 from PyQt5.QtCore import QSettings
-from PyQt5.QtWidgets import QApplication
+from PyQt5.QtWidgets import QApplication, QFileDialog
 from pytest import fixture
 from qmaton import Automaton, State
 from qtui import MainWindow, settings
@@ -64,3 +65,30 @@ def test_MainWindow_set_automaton():
     m = MainWindow(DumbAutomaton)
     m.set_automaton(dab)
     assert m._automaton is dab
+
+
+def test_MainWindow_open_save_pattern(tmp_path, monkeypatch):
+    m = MainWindow(GameOfLife)
+    m.set_automaton(GameOfLife(5, 6))
+    filename = str(tmp_path / "glider.rle")
+    with open(filename, "w") as file:
+        file.write("x = 3, y = 3, rule = B3/S23\nbo$2bo$3o!\n")
+    monkeypatch.setattr(QFileDialog, "getOpenFileName", lambda *args: (filename, ""))
+    m._open_file()
+    # the pattern is placed in the middle of the grid
+    assert m._automaton.cells.tolist() == [
+        [1, 1, 1, 1, 1, 1],
+        [1, 1, 0, 1, 1, 1],
+        [1, 1, 1, 0, 1, 1],
+        [1, 0, 0, 0, 1, 1],
+        [1, 1, 1, 1, 1, 1],
+    ]
+    # the grid is enlarged if needed
+    m.set_automaton(GameOfLife(2, 2))
+    m._open_file()
+    assert m._automaton.grid_size == (3, 3)
+    filename = str(tmp_path / "saved.cells")
+    monkeypatch.setattr(QFileDialog, "getSaveFileName", lambda *args: (filename, ""))
+    m._save_file()
+    with open(filename) as file:
+        assert file.read() == ".O.\n..O\nOOO\n"
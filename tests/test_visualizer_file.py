@@ -19,10 +19,12 @@
 
 """Test file for FileVisualizer class"""
 
+import gzip
 import os
 from pathlib import Path
 
-from qmaton import Automaton, State
+import numpy as np
+from qmaton import ArrayAutomaton, Automaton, State
 from visualizer import FileVisualizer
 
 
@@ -60,5 +62,82 @@ def test_draw_withfile(tmp_path):
     fv = FileVisualizer(file)
     fv.draw(dab)
     fv.draw(dab)
+    fv.flush()
     with open(file, "r") as f:
         assert f.read() == (str(dab) + "\n") * 2
+    fv.close()
+
+
+def test_render():
+    dead, alive = State("dead", "#000"), State("alive", "#fff")
+    aa = ArrayAutomaton(3, 4)
+    aa.states = [dead, alive]
+    aa.cells = np.array([[0, 1, 0, 0], [1, 1, 0, 1], [0, 0, 0, 0]], dtype=np.uint8)
+    fv = FileVisualizer()
+    assert fv.render(aa) == str(aa)
+    # the text of the states is updated with the states
+    aa.states = [alive, dead]
+    assert fv.render(aa) == str(aa)
+    dab = DumbAutomaton(6, 3)
+    assert fv.render(dab) == str(dab)
+    # state not in states
+    dab.grid[1][2] = dead
+    assert fv.render(dab) == str(dab)
+
+
+def test_draw_buffered(tmp_path):
+    dab = DumbAutomaton(6, 3)
+    step = str(dab) + "\n"
+    file = tmp_path / "test_draw_buffered.tmp"
+    fv = FileVisualizer(file, buffer_size=len(step) * 3, flush_interval=3600)
+    fv.draw(dab)
+    fv.draw(dab)
+    assert not os.path.exists(file)
+    fv.draw(dab)  # buffer full
+    with open(file, "r") as f:
+        assert f.read() == step * 3
+    fv.draw(dab)
+    with open(file, "r") as f:
+        assert f.read() == step * 3
+    fv.close()
+    with open(file, "r") as f:
+        assert f.read() == step * 4
+    # time threshold
+    fv.flush_interval = 0
+    fv.draw(dab)
+    with open(file, "r") as f:
+        assert f.read() == step * 5
+    fv.close()
+
+
+def test_draw_compressed(tmp_path):
+    dab = DumbAutomaton(6, 3)
+    file = tmp_path / "test_draw_compressed.txt.gz"
+    fv = FileVisualizer(file)
+    assert fv.compress
+    fv.draw(dab)
+    fv.draw(dab)
+    fv.close()
+    fv.draw(dab)
+    fv.close()
+    with gzip.open(file, "rt") as f:
+        assert f.read() == (str(dab) + "\n") * 3
+    assert not FileVisualizer(tmp_path / "test.txt").compress
+    assert FileVisualizer(tmp_path / "test.txt", compress=True).compress
+
+
+def test_context_manager(tmp_path):
+    dab = DumbAutomaton(6, 3)
+    file = tmp_path / "test_context_manager.txt.gz"
+    with FileVisualizer(file, flush_interval=0) as fv:
+        fv.draw(dab)
+        fv.draw(dab)
+    with gzip.open(file, "rt") as f:
+        assert f.read() == (str(dab) + "\n") * 2
+    # the file is also closed when the visualizer is deleted
+    file = tmp_path / "test_context_manager.tmp"
+    fv = FileVisualizer(file, flush_interval=3600)
+    fv.draw(dab)
+    del fv
+    with open(file, "r") as f:
+        assert f.read() == str(dab) + "\n"
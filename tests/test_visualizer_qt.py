@@ -19,11 +19,22 @@
 
 """Test file for QtVisualizer and QtVisualizerWorker classes"""
 
-from PyQt5.QtCore import QObject, pyqtSlot
+import numpy as np
+from PyQt5.QtCore import QObject, QPoint, QRectF, Qt, pyqtSlot
+from PyQt5.QtGui import QColor, QImage
+from PyQt5.QtTest import QTest
 from PyQt5.QtWidgets import QApplication
 from pytest import fixture
-from qmaton import Automaton, AutomatonHistory, AutomatonRunner, State
-from visualizer.qt_visualizer import QtVisualizer, QtVisualizerWorker
+from qmaton import (
+    Automaton,
+    AutomatonHistory,
+    AutomatonRunner,
+    LifeLikeAutomaton,
+    State,
+    TrajectoryReader,
+    TrajectoryRecorder,
+)
+from visualizer.qt_visualizer import QtGridCanvas, QtVisualizer, QtVisualizerWorker
 
 
 class DumbAutomaton(Automaton):
@@ -89,6 +100,137 @@ def test_QtVisualizerWorker_run():
     assert s.finished_count == 1
 
 
+# QtGridCanvas
+
+
+def test_QtGridCanvas_set_grid(app):
+    canvas = QtGridCanvas()
+    assert canvas.image.isNull()
+    lla = LifeLikeAutomaton(3, 5)
+    lla.cells = np.array([[0, 1, 0, 0, 0], [0, 0, 1, 0, 0], [1, 1, 1, 0, 0]], dtype=lla.dtype)
+    canvas.set_grid(lla)
+    assert canvas.image.format() == QImage.Format_Indexed8
+    assert (canvas.image.width(), canvas.image.height()) == (5, 3)
+    for x in range(3):
+        for y in range(5):
+            assert canvas.image.pixelColor(y, x) == QColor(lla.grid[x][y].color)
+    # state not in states
+    other = State("other", "#123456")
+    dab = DumbAutomaton(3, 5)
+    dab.grid[2][1] = other
+    canvas.set_grid(dab)
+    assert canvas.image.pixelColor(1, 2) == QColor(other.color)
+    assert canvas.image.pixelColor(0, 0) == QColor(DumbAutomaton.STATE.color)
+
+
+def test_QtGridCanvas_set_grid_many_states(app):
+    dab = DumbAutomaton(2, 150)
+    dab.grid = [[State(str(i * 150 + j), f"#{i:02x}{j:04x}") for j in range(150)] for i in range(2)]
+    dab.states = [cell for line in dab.grid for cell in line]
+    canvas = QtGridCanvas()
+    canvas.set_grid(dab)
+    assert canvas.image.format() == QImage.Format_RGB32
+    assert canvas.image.pixelColor(149, 1) == QColor(dab.grid[1][149].color)
+    assert canvas.set_cell(0, 0, dab.grid[1][149])
+    assert canvas.image.pixelColor(0, 0) == QColor(dab.grid[1][149].color)
+
+
+def test_QtGridCanvas_set_grid_changes(app):
+    canvas = QtGridCanvas()
+    canvas.resize(200, 100)
+    lla = LifeLikeAutomaton(50, 100)
+    lla.random_initialize()
+    assert canvas.set_grid(lla).rects() == [canvas.rect()]
+    # nothing changed
+    assert canvas.set_grid(lla).isEmpty()
+    # a single cell changed, only its tile is repainted
+    cells = lla.cells.copy()
+    cells[20, 40] = 1 - cells[20, 40]
+    lla.cells = cells
+    region = canvas.set_grid(lla)
+    assert region.rects() == [canvas.cells_rect(16, 32, 31, 47)]
+    assert canvas.image.pixelColor(40, 20) == QColor(lla.grid[20][40].color)
+    # many tiles changed, the rectangle bounding the changes is repainted
+    lla.cells = 1 - lla.cells
+    assert len(canvas.set_grid(lla).rects()) == 1
+    # the image is the same as if drawn at once
+    lla.apply_rule()
+    canvas.set_grid(lla)
+    reference = QtGridCanvas()
+    reference.resize(200, 100)
+    reference.set_grid(lla)
+    assert canvas.grab().toImage() == reference.grab().toImage()
+
+
+def test_QtGridCanvas_cell_at(app):
+    canvas = QtGridCanvas()
+    assert canvas.cell_at(QPoint(0, 0)) is None
+    canvas.set_grid(DumbAutomaton(3, 5))
+    canvas.resize(50, 30)
+    assert canvas.cell_at(QPoint(0, 0)) == QPoint(0, 0)
+    assert canvas.cell_at(QPoint(25, 15)) == QPoint(1, 2)
+    assert canvas.cell_at(QPoint(49, 29)) == QPoint(2, 4)
+    assert canvas.cell_at(QPoint(50, 10)) is None
+    assert canvas.cells_rect(1, 2).contains(QPoint(25, 15))
+
+
+def test_QtGridCanvas_downsample(app):
+    canvas = QtGridCanvas()
+    canvas.resize(10, 10)
+    lla = LifeLikeAutomaton(40, 42)
+    cells = np.full((40, 42), lla.state_index(LifeLikeAutomaton.DEATH), dtype=lla.dtype)
+    cells[:20, :20] = lla.state_index(LifeLikeAutomaton.LIFE)
+    cells[21, 21] = lla.state_index(LifeLikeAutomaton.LIFE)
+    lla.cells = cells
+    canvas.set_grid(lla)
+    # the widget is smaller than the grid, a pixel shows the dominant state of 4 x 4 cells
+    assert canvas.block_size == 4
+    assert (canvas.image.width(), canvas.image.height()) == (11, 10)
+    assert canvas.image.pixelColor(0, 0) == QColor(LifeLikeAutomaton.LIFE.color)
+    assert canvas.image.pixelColor(4, 4) == QColor(LifeLikeAutomaton.LIFE.color)
+    assert canvas.image.pixelColor(5, 5) == QColor(LifeLikeAutomaton.DEATH.color)
+    assert canvas.image.pixelColor(10, 9) == QColor(LifeLikeAutomaton.DEATH.color)
+    assert canvas.cell_at(QPoint(9, 9)) == QPoint(36, 37)
+
+
+def test_QtGridCanvas_zoom_pan(app):
+    canvas = QtGridCanvas()
+    canvas.resize(100, 100)
+    lla = LifeLikeAutomaton(200, 300)
+    lla.random_initialize()
+    canvas.set_grid(lla)
+    assert canvas.view == QRectF(0, 0, 300, 200)
+    assert canvas.block_size == 3
+    # the cell under the position doesn't move
+    canvas.zoom(0.25, QPoint(0, 0))
+    assert canvas.view == QRectF(0, 0, 75, 50)
+    canvas.zoom(0.5, QPoint(100, 100))
+    assert canvas.view == QRectF(37.5, 25, 37.5, 25)
+    # only the cells in the viewport are rasterized
+    assert canvas.block_size == 1
+    assert (canvas.image.width(), canvas.image.height()) == (38, 25)
+    assert canvas.image.pixelColor(0, 0) == QColor(lla.grid[25][37].color)
+    assert canvas.cell_at(QPoint(0, 0)) == QPoint(25, 37)
+    assert canvas.cell_at(QPoint(99, 99)) == QPoint(49, 74)
+    # the minimap is repainted with the cells
+    lla.apply_rule()
+    region = canvas.set_grid(lla)
+    assert region.contains(QPoint(90, 90))
+    assert canvas.image.pixelColor(10, 10) == QColor(lla.grid[35][47].color)
+    canvas.grab()
+    # the viewport stays in the grid
+    canvas.pan(-100, 0)
+    assert canvas.view == QRectF(75, 25, 37.5, 25)
+    canvas.pan(1000, 1000)
+    assert canvas.view == QRectF(0, 0, 37.5, 25)
+    canvas.zoom(100)
+    assert canvas.view == QRectF(0, 0, 300, 200)
+    # the viewport is reset with the size of the grid
+    canvas.zoom(0.5)
+    canvas.set_grid(LifeLikeAutomaton(20, 20))
+    assert canvas.view == QRectF(0, 0, 20, 20)
+
+
 # QtVisualizer
 
 
@@ -131,6 +273,27 @@ def test_QtVisualizer_run(app):
     t.wait(500)
 
 
+def test_QtVisualizer_run_coalesced(app):
+    qv = QtVisualizer()
+    qv.max_fps = 20
+    lla = LifeLikeAutomaton(30, 30)
+    lla.random_initialize()
+    qv.set_automaton(lla)
+    s = SignalCounter()
+    s.connect(qv)
+    t = qv.run(AutomatonRunner(200, 2000))
+    while not t.wait(10):
+        QApplication.processEvents()
+    QApplication.processEvents()
+    assert s.started_count == 1
+    assert s.finished_count == 1
+    # the steps are coalesced, the last one is drawn
+    assert 1 <= s.step_count < 50
+    reference = QtGridCanvas()
+    reference.set_grid(lla)
+    assert qv._canvas.image == reference.image
+
+
 def test_QtVisualizer_is_running(app):
     qv = QtVisualizer()
     qv.set_automaton(DumbAutomaton(5, 5))
@@ -142,3 +305,48 @@ def test_QtVisualizer_is_running(app):
     qv.stop()
     t.wait(500)
     assert not qv.is_running()
+
+
+def test_QtVisualizer_replay(app, tmp_path):
+    path = str(tmp_path / "run.qmtraj")
+    dab = DumbAutomaton(3, 3)
+    recorder = TrajectoryRecorder(path)
+    recorder.record(dab)
+    AutomatonRunner(5, 1000).launch(dab, recorder.record)
+    recorder.close()
+    qv = QtVisualizer()
+    t = qv.replay(TrajectoryReader(path), 1000)
+    t.wait(500)
+    assert qv._automaton.step == 5
+    assert qv._automaton.grid == dab.grid
+
+
+def test_QtVisualizer_set_cell_state(app):
+    qv = QtVisualizer()
+    qv.set_automaton(LifeLikeAutomaton(4, 4))
+    qv.set_cell_state(QPoint(1, 2), LifeLikeAutomaton.LIFE)
+    assert qv._automaton.grid[1][2] == LifeLikeAutomaton.LIFE
+    assert qv._canvas.image.pixelColor(2, 1) == QColor(LifeLikeAutomaton.LIFE.color)
+    # state not in states
+    other = State("other", "#123456")
+    qv.set_cell_state(QPoint(3, 0), other)
+    assert qv._canvas.image.pixelColor(0, 3) == QColor(other.color)
+    assert qv._canvas.image.pixelColor(2, 1) == QColor(LifeLikeAutomaton.LIFE.color)
+    # the cell is written in the array of cells, the grid is not decoded
+    lla = LifeLikeAutomaton(4, 4)
+    qv.set_automaton(lla)
+    lla.decode = None
+    qv.set_cell_state(QPoint(2, 3), LifeLikeAutomaton.LIFE)
+    assert lla.cells[2, 3] == lla.state_index(LifeLikeAutomaton.LIFE)
+    assert qv._canvas.image.pixelColor(3, 2) == QColor(LifeLikeAutomaton.LIFE.color)
+    del lla.decode
+
+
+def test_QtVisualizer_cell_clicked(app):
+    qv = QtVisualizer()
+    qv.set_automaton(DumbAutomaton(3, 5))
+    qv._canvas.resize(50, 30)
+    clicked = []
+    qv.cell_clicked.connect(clicked.append)
+    QTest.mouseClick(qv._canvas, Qt.LeftButton, pos=QPoint(25, 15))
+    assert clicked == [QPoint(1, 2)]